@@ -0,0 +1,379 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from PyQt6.QtCore import Qt, QObject, QRect, QTimer
+from PyQt6.QtGui import QColor, QImage, QPainter, QPixmap
+from PyQt6.QtWidgets import QVBoxLayout, QWidget
+from playback_policy import FROZEN_STATES, PLAY, should_present
+
+# 可能包含动画的格式（APNG 使用 .png 扩展名）
+ANIMATED_EXTENSIONS = ('.gif', '.png', '.apng', '.webp')
+# 解码后的源帧占用的内存上限（字节），放得下时整段动画只解码一次
+ANIMATION_BUDGET = 128 * 1024 * 1024
+# 放不下时环形缓冲区至少保留的帧数
+MIN_RING_FRAMES = 8
+# 缩放到窗口尺寸的帧在统一缓存中的命名空间和上限（字节）
+ANIMATION_NAMESPACE = 'animation_frames'
+ANIMATION_PIXMAP_BUDGET = 128 * 1024 * 1024
+# 浏览器的约定：帧延迟不超过 10 毫秒时按 100 毫秒播放
+MIN_FRAME_DELAY = 20
+DEFAULT_FRAME_DELAY = 100
+# 解码跟不上播放时重试的间隔（毫秒）
+UNDERRUN_RETRY = 10
+# 转码为视频时的最高帧率
+MAX_TRANSCODE_FPS = 50
+
+
+def is_animated_file(path: str) -> bool:
+    """是否为多帧的 GIF / APNG / WebP"""
+    if not path or not path.lower().endswith(ANIMATED_EXTENSIONS):
+        return False
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            return bool(getattr(img, 'is_animated', False))
+    except Exception:
+        return False
+
+
+def _frame_delay(duration) -> int:
+    try:
+        duration = int(duration or 0)
+    except (TypeError, ValueError):
+        duration = 0
+    return DEFAULT_FRAME_DELAY if duration <= 10 else max(MIN_FRAME_DELAY, duration)
+
+
+def _decoded_size(size: Tuple[int, int], bounds: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """解码尺寸：只缩小到刚好铺满 bounds，不放大"""
+    width, height = size
+    if not bounds:
+        return width, height
+    scale = max(bounds[0] / width, bounds[1] / height)
+    if scale >= 1:
+        return width, height
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def animation_info(path: str, bounds: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
+    """帧数、解码尺寸和全部帧解码后的字节数（调色板索引，每像素一字节）"""
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            frame_count = getattr(img, 'n_frames', 1)
+            size = _decoded_size(img.size, bounds)
+    except Exception as e:
+        print(f"Error reading animation {path}: {e}")
+        return None
+    return {'frames': frame_count, 'size': size, 'nbytes': frame_count * size[0] * size[1]}
+
+
+def _to_qimage(frame, indexed: bool) -> QImage:
+    """把 RGB 帧转换为 QImage；indexed 时量化为 256 色调色板，每像素只占一字节"""
+    from PIL import Image
+    if indexed:
+        frame = frame.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        data = frame.tobytes()
+        qimage = QImage(data, frame.width, frame.height, frame.width, QImage.Format.Format_Indexed8)
+        palette = frame.getpalette()[:768]
+        qimage.setColorTable([0xFF000000 | (palette[i] << 16) | (palette[i + 1] << 8) | palette[i + 2]
+                              for i in range(0, len(palette), 3)])
+    else:
+        data = frame.tobytes()
+        qimage = QImage(data, frame.width, frame.height, frame.width * 3, QImage.Format.Format_RGB888)
+    # QImage 不持有 data 的引用，复制一份
+    return qimage.copy()
+
+
+def iter_frames(path: str, bounds: Optional[Tuple[int, int]] = None):
+    """依次产生 (RGB 帧, 延迟毫秒)；透明区域合成到黑色背景上"""
+    from PIL import Image
+    with Image.open(path) as img:
+        size = _decoded_size(img.size, bounds)
+        for index in range(getattr(img, 'n_frames', 1)):
+            img.seek(index)
+            # seek 后的帧已按处置方式与前一帧合成
+            frame = img.convert('RGBA')
+            background = Image.new('RGB', frame.size, (0, 0, 0))
+            background.paste(frame, mask=frame.getchannel('A'))
+            if background.size != size:
+                background = background.resize(size, Image.BILINEAR, reducing_gap=2.0)
+            yield background, _frame_delay(img.info.get('duration'))
+
+
+class FrameRing:
+    """解码后帧的环形缓冲区
+
+    后台线程按顺序解码帧（可选量化为调色板索引）。全部帧放得下时只解码一遍，
+    之后循环播放不再解码；放不下时只保留固定数量的帧，解码线程循环读取文件补充。
+    """
+
+    def __init__(self, path: str, bounds: Optional[Tuple[int, int]] = None, indexed: bool = True,
+                 budget: int = ANIMATION_BUDGET):
+        self.path = path
+        self.bounds = bounds
+        self.indexed = indexed
+        info = animation_info(path, bounds) or {'frames': 1, 'size': (1, 1), 'nbytes': 1}
+        self.frame_count = info['frames']
+        self.size = info['size']
+        frame_bytes = self.size[0] * self.size[1] * (1 if indexed else 3)
+        # 全部帧放得下时常驻内存
+        self.resident = self.frame_count * frame_bytes <= budget
+        self.capacity = self.frame_count if self.resident else max(MIN_RING_FRAMES, budget // frame_bytes)
+        self._slots: List[Optional[Tuple[int, QImage, int]]] = [None] * self.capacity
+        self._cond = threading.Condition()
+        self._read = 0
+        self._written = 0
+        self._complete = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._decode, daemon=True)
+        self._thread.start()
+
+    @property
+    def complete(self) -> bool:
+        """常驻模式下是否已解码完全部帧"""
+        return self._complete
+
+    def _decode(self):
+        try:
+            while True:
+                for index, (frame, delay) in enumerate(iter_frames(self.path, self.bounds)):
+                    image = _to_qimage(frame, self.indexed)
+                    with self._cond:
+                        while not self._stopped and self._written - self._read >= self.capacity:
+                            self._cond.wait()
+                        if self._stopped:
+                            return
+                        self._slots[self._written % self.capacity] = (index, image, delay)
+                        self._written += 1
+                        self._cond.notify_all()
+                if self.resident:
+                    with self._cond:
+                        # 文件实际帧数可能比声明的少
+                        self.frame_count = self._written
+                        self._complete = True
+                    return
+        except Exception as e:
+            print(f"Error decoding animation {self.path}: {e}")
+            with self._cond:
+                self.frame_count = max(1, self._written)
+                self._complete = True
+
+    def next_frame(self) -> Optional[Tuple[int, QImage, int]]:
+        """下一帧 (帧序号, 图像, 延迟毫秒)；解码还没跟上时返回 None"""
+        with self._cond:
+            if self._complete and self.resident:
+                if self._written == 0:
+                    return None
+                frame = self._slots[self._read % self._written]
+            elif self._read < self._written:
+                frame = self._slots[self._read % self.capacity]
+            else:
+                return None
+            self._read += 1
+            self._cond.notify_all()
+            return frame
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
+class AnimationView(QWidget):
+    """在壁纸窗口中绘制当前帧（按比例铺满窗口，居中裁剪）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.frame = None
+
+    def set_frame(self, frame):
+        """frame 为 QPixmap 或 QImage；与窗口同尺寸的像素图直接复制，其他按比例缩放绘制"""
+        self.frame = frame
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        frame = self.frame
+        if isinstance(frame, QPixmap) and frame.size() == self.size():
+            painter.drawPixmap(0, 0, frame)
+        else:
+            painter.fillRect(self.rect(), QColor(0, 0, 0))
+            if isinstance(frame, QPixmap):
+                painter.drawPixmap(_fill_rect(frame, self.width(), self.height()), frame)
+            elif frame is not None:
+                painter.drawImage(_fill_rect(frame, self.width(), self.height()), frame)
+        painter.end()
+
+
+def _fill_rect(frame, width: int, height: int) -> QRect:
+    """按比例铺满 width x height 时帧所在的区域（超出部分被裁掉）"""
+    scale = max(width / frame.width(), height / frame.height())
+    w, h = round(frame.width() * scale), round(frame.height() * scale)
+    return QRect((width - w) // 2, (height - h) // 2, w, h)
+
+
+class AnimationPlayer(QObject):
+    """在一组壁纸窗口中播放动画
+
+    所有窗口共用一个帧缓冲区和一个定时器，按每帧自己的延迟切换。
+    常驻模式下第一遍播放时把每帧转换为像素图放入统一缓存，之后循环只是复制像素图，
+    不再解码、量化或转换格式：全部帧按窗口尺寸缩放后放得下时缓存缩放好的像素图，
+    否则缓存原尺寸的像素图，绘制时再缩放。
+    """
+
+    def __init__(self, path: str, windows: List[QWidget], cache=None, indexed: bool = True,
+                 parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.cache = cache
+        self.views: List[AnimationView] = []
+        for window in windows:
+            view = AnimationView(window)
+            layout = window.layout() or QVBoxLayout(window)
+            layout.setContentsMargins(0, 0, 0, 0)
+            layout.addWidget(view)
+            view.show()
+            self.views.append(view)
+        # 每个窗口的播放状态和上次绘制的时间（由播放策略设置）
+        self._view_states = [PLAY] * len(self.views)
+        self._last_present = [0.0] * len(self.views)
+        self.ring = FrameRing(path, self._largest_view_size(), indexed)
+        # 'window'：缓存缩放到窗口尺寸的帧；'source'：缓存原尺寸的帧；None：不缓存
+        self.cache_mode = self._choose_cache_mode()
+        if self.cache_mode:
+            self.cache.set_limit(ANIMATION_NAMESPACE, ANIMATION_PIXMAP_BUDGET)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    @staticmethod
+    def _view_size(view: AnimationView) -> Tuple[int, int]:
+        # 视图铺满所在的壁纸窗口，布局生效前按窗口尺寸计算
+        window = view.parentWidget() or view
+        return max(1, window.width()), max(1, window.height())
+
+    def _view_sizes(self) -> List[Tuple[int, int]]:
+        return [self._view_size(view) for view in self.views]
+
+    def _largest_view_size(self) -> Optional[Tuple[int, int]]:
+        sizes = self._view_sizes()
+        return max(sizes, key=lambda s: s[0] * s[1]) if sizes else None
+
+    def _choose_cache_mode(self) -> Optional[str]:
+        """缓存放得下全部帧时才缓存（放不下时循环访问会不停淘汰，不如不缓存）"""
+        if not self.ring.resident or self.cache is None:
+            return None
+        frame_count = self.ring.frame_count
+        if sum(w * h * 4 for w, h in set(self._view_sizes())) * frame_count <= ANIMATION_PIXMAP_BUDGET:
+            return 'window'
+        if self.ring.size[0] * self.ring.size[1] * 4 * frame_count <= ANIMATION_PIXMAP_BUDGET:
+            return 'source'
+        return None
+
+    def start(self):
+        self._tick()
+
+    def set_view_states(self, states: List[str]):
+        """按窗口顺序设置播放状态；所有窗口都停住时停止切换帧（环形缓冲区写满后解码也随之停下），
+        恢复时立即从下一帧继续"""
+        self._view_states = list(states) + [PLAY] * (len(self.views) - len(states))
+        if all(state in FROZEN_STATES for state in self._view_states):
+            self._timer.stop()
+        elif not self._timer.isActive():
+            self._tick()
+
+    def stop(self):
+        self._timer.stop()
+        self.ring.stop()
+        if self.cache is not None:
+            self.cache.clear(ANIMATION_NAMESPACE)
+        for view in self.views:
+            view.set_frame(None)
+
+    def _pixmap(self, index: int, image: QImage, size: Optional[Tuple[int, int]]) -> QPixmap:
+        """帧的像素图（size 为 None 时保持原尺寸），第一次用到时转换并缓存"""
+        key = (self.path, index, size)
+        pixmap = self.cache.get(ANIMATION_NAMESPACE, key)
+        if pixmap is not None:
+            return pixmap
+        if size is not None:
+            width, height = size
+            image = image.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+                                 Qt.TransformationMode.SmoothTransformation)
+            image = image.copy((image.width() - width) // 2, (image.height() - height) // 2, width, height)
+        pixmap = QPixmap.fromImage(image)
+        self.cache.put(ANIMATION_NAMESPACE, key, pixmap)
+        return pixmap
+
+    def _tick(self):
+        frame = self.ring.next_frame()
+        if frame is None:
+            if not self.ring.complete:
+                self._timer.start(UNDERRUN_RETRY)
+            return
+        index, image, delay = frame
+        # 只更新需要绘制的窗口（降低帧率的窗口跳过部分帧，停住的窗口保持当前帧）
+        now = time.monotonic()
+        views = []
+        for i, view in enumerate(self.views):
+            if should_present(self._view_states[i], self._last_present[i], now):
+                self._last_present[i] = now
+                views.append(view)
+        if self.cache_mode == 'window':
+            pixmaps = {}
+            for view in views:
+                size = self._view_size(view)
+                if size not in pixmaps:
+                    pixmaps[size] = self._pixmap(index, image, size)
+                view.set_frame(pixmaps[size])
+        elif self.cache_mode == 'source':
+            if views:
+                pixmap = self._pixmap(index, image, None)
+                for view in views:
+                    view.set_frame(pixmap)
+        else:
+            for view in views:
+                view.set_frame(image)
+        self._timer.start(delay)
+
+
+def transcode_to_video(path: str, output: str, bounds: Optional[Tuple[int, int]] = None) -> Optional[str]:
+    """把动画转码为循环播放的视频（交给 VLC 硬件解码），失败时返回 None
+
+    视频帧率固定，按最短的帧延迟选取帧率，每帧按自己的延迟重复写入若干次。
+    """
+    import cv2
+    import numpy as np
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            size = _decoded_size(img.size, bounds)
+            delays = []
+            for index in range(getattr(img, 'n_frames', 1)):
+                img.seek(index)
+                delays.append(_frame_delay(img.info.get('duration')))
+        fps = min(MAX_TRANSCODE_FPS, 1000 / min(delays))
+        # 编码器要求偶数尺寸
+        size = (size[0] - size[0] % 2 or 2, size[1] - size[1] % 2 or 2)
+        tmp_path = output + '.tmp.mp4'
+        writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+        if not writer.isOpened():
+            return None
+        try:
+            for frame, delay in iter_frames(path, bounds):
+                if frame.size != size:
+                    frame = frame.resize(size, Image.BILINEAR)
+                data = cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2BGR)
+                for _ in range(max(1, round(delay * fps / 1000))):
+                    writer.write(data)
+        finally:
+            writer.release()
+        os.replace(tmp_path, output)
+        return output
+    except Exception as e:
+        print(f"Error transcoding animation {path}: {e}")
+        return None
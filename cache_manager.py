@@ -0,0 +1,204 @@
+import os
+import sys
+import ctypes
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# 所有缓存合计的内存上限（字节）
+DEFAULT_BUDGET = 256 * 1024 * 1024
+# 系统内存占用超过这个百分比时视为内存紧张
+PRESSURE_LOAD = 85
+# 内存紧张时缓存缩减到当前大小的比例
+PRESSURE_SHRINK = 0.5
+
+
+def sizeof(value: Any) -> int:
+    """缓存对象实际占用的字节数"""
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        # numpy 数组、预览金字塔
+        return nbytes
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    size_in_bytes = getattr(value, 'sizeInBytes', None)
+    if callable(size_in_bytes):
+        # QImage
+        return size_in_bytes()
+    if hasattr(value, 'depth') and hasattr(value, 'width') and hasattr(value, 'height'):
+        # QPixmap
+        return value.width() * value.height() * max(8, value.depth()) // 8
+    return sys.getsizeof(value)
+
+
+def memory_load() -> Optional[int]:
+    """系统物理内存占用百分比，无法获取时返回 None"""
+    try:
+        if os.name == 'nt':
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ('dwLength', ctypes.c_ulong),
+                    ('dwMemoryLoad', ctypes.c_ulong),
+                    ('ullTotalPhys', ctypes.c_ulonglong),
+                    ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong),
+                    ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong),
+                    ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+                ]
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return int(status.dwMemoryLoad)
+            return None
+        info = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                info[key] = int(value.split()[0])
+        return round(100 - info['MemAvailable'] * 100 / info['MemTotal'])
+    except Exception:
+        return None
+
+
+class CacheManager:
+    """统一的内存缓存：所有像素图、图片和数组按实际字节数计入同一个上限
+
+    每个命名空间（缩略图、预览、视频缩略图等）各自按最近使用排序，
+    可以单独设置上限；超出总上限时淘汰所有命名空间中最久未用的条目。
+    记录每个命名空间的命中、未命中和淘汰次数，用于调整上限。
+    """
+
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        self.budget = budget
+        self.nbytes = 0
+        self._lock = threading.RLock()
+        self._tick = itertools.count()
+        # 命名空间 -> OrderedDict(键 -> (值, 字节数, 最近使用序号))
+        self._spaces: Dict[str, OrderedDict] = {}
+        self._limits: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _space(self, namespace: str) -> OrderedDict:
+        space = self._spaces.get(namespace)
+        if space is None:
+            space = self._spaces[namespace] = OrderedDict()
+            self._bytes[namespace] = 0
+            self._stats[namespace] = {'hits': 0, 'misses': 0, 'evictions': 0}
+        return space
+
+    def set_limit(self, namespace: str, limit: Optional[int]):
+        """设置单个命名空间的上限（None 表示只受总上限约束）"""
+        with self._lock:
+            self._space(namespace)
+            if limit is None:
+                self._limits.pop(namespace, None)
+            else:
+                self._limits[namespace] = limit
+                self._evict_namespace(namespace, limit)
+
+    def get(self, namespace: str, key: Hashable, default=None):
+        with self._lock:
+            space = self._space(namespace)
+            entry = space.get(key)
+            if entry is None:
+                self._stats[namespace]['misses'] += 1
+                return default
+            self._stats[namespace]['hits'] += 1
+            space[key] = (entry[0], entry[1], next(self._tick))
+            space.move_to_end(key)
+            return entry[0]
+
+    def __contains__(self, item) -> bool:
+        namespace, key = item
+        with self._lock:
+            return key in self._spaces.get(namespace, ())
+
+    def put(self, namespace: str, key: Hashable, value: Any, nbytes: Optional[int] = None):
+        """放入缓存，超出上限时淘汰最久未用的条目（刚放入的条目不会被淘汰）"""
+        if nbytes is None:
+            nbytes = sizeof(value)
+        with self._lock:
+            self.discard(namespace, key)
+            space = self._space(namespace)
+            space[key] = (value, nbytes, next(self._tick))
+            self._bytes[namespace] += nbytes
+            self.nbytes += nbytes
+            limit = self._limits.get(namespace)
+            if limit is not None:
+                self._evict_namespace(namespace, limit)
+            self._evict_global(self.budget, keep=(namespace, key))
+
+    def discard(self, namespace: str, key: Hashable):
+        with self._lock:
+            space = self._spaces.get(namespace)
+            entry = space.pop(key, None) if space is not None else None
+            if entry is not None:
+                self._bytes[namespace] -= entry[1]
+                self.nbytes -= entry[1]
+
+    def clear(self, namespace: Optional[str] = None):
+        with self._lock:
+            for name in ([namespace] if namespace else list(self._spaces)):
+                space = self._spaces.get(name)
+                if space is None:
+                    continue
+                self.nbytes -= self._bytes[name]
+                self._bytes[name] = 0
+                space.clear()
+
+    def _evict_one(self, namespace: str):
+        _key, (_value, nbytes, _tick) = self._spaces[namespace].popitem(last=False)
+        self._bytes[namespace] -= nbytes
+        self.nbytes -= nbytes
+        self._stats[namespace]['evictions'] += 1
+
+    def _evict_namespace(self, namespace: str, limit: int):
+        space = self._spaces[namespace]
+        while self._bytes[namespace] > limit and len(space) > 1:
+            self._evict_one(namespace)
+
+    def _evict_global(self, target: int, keep: Optional[tuple] = None):
+        while self.nbytes > target:
+            # 各命名空间中最久未用的条目里，选最早的一个淘汰
+            oldest, oldest_tick = None, None
+            for name, space in self._spaces.items():
+                if not space:
+                    continue
+                key, (_value, _nbytes, tick) = next(iter(space.items()))
+                if (name, key) == keep:
+                    continue
+                if oldest_tick is None or tick < oldest_tick:
+                    oldest, oldest_tick = name, tick
+            if oldest is None:
+                return
+            self._evict_one(oldest)
+
+    def shrink(self, fraction: float = PRESSURE_SHRINK):
+        """把缓存缩减到当前大小的 fraction"""
+        with self._lock:
+            self._evict_global(int(self.nbytes * fraction))
+
+    def check_pressure(self, threshold: int = PRESSURE_LOAD) -> bool:
+        """系统内存紧张时缩减缓存，返回是否进行了缩减"""
+        load = memory_load()
+        if load is None or load < threshold:
+            return False
+        self.shrink()
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """各命名空间及合计的命中、未命中、淘汰次数和占用"""
+        with self._lock:
+            result = {}
+            for name, counters in self._stats.items():
+                result[name] = dict(counters, bytes=self._bytes[name], items=len(self._spaces[name]))
+            total = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': self.nbytes, 'items': 0}
+            for counters in result.values():
+                for key in ('hits', 'misses', 'evictions', 'items'):
+                    total[key] += counters[key]
+            result['total'] = dict(total, budget=self.budget)
+            return result
@@ -0,0 +1,119 @@
+import os
+import json
+import tempfile
+import threading
+from typing import Callable, Dict
+
+# 合并连续修改的等待时间（秒）
+DEFAULT_DELAY = 0.5
+# 写入失败后重试的等待时间（秒）
+RETRY_DELAY = 5.0
+
+
+class DebouncedJsonWriter:
+    """延迟合并写入的 JSON 文件写入器
+
+    修改时在调用线程中序列化一份快照，短时间内的多次修改合并为一次写入（只写最新的快照），
+    写入线程不会读到正在被修改的配置；写入时先写临时文件并 fsync，再原子替换，
+    内容未变化时跳过写入，写入失败时稍后重试。
+    """
+
+    def __init__(self, file_path: str, get_data: Callable[[], Dict], delay: float = DEFAULT_DELAY):
+        self.file_path = file_path
+        self.get_data = get_data
+        self.delay = delay
+        self._lock = threading.Lock()
+        # 保证同一时间只有一个线程在写文件
+        self._write_lock = threading.Lock()
+        self._timer = None
+        # 尚未写入的最新快照
+        self._pending = None
+        self._last_written = self._read_existing()
+        self.stats = {
+            'requested': 0,   # 请求保存的次数
+            'written': 0,     # 实际写入磁盘的次数
+            'coalesced': 0,   # 被合并到同一次写入中的请求
+            'unchanged': 0,   # 内容未变化而跳过的写入
+        }
+
+    def _read_existing(self) -> bytes:
+        try:
+            with open(self.file_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return b''
+
+    @property
+    def _dirty(self) -> bool:
+        return self._pending is not None
+
+    def _schedule(self, delay: float):
+        # 调用时已持有 self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def mark_dirty(self):
+        """标记配置已修改：在修改配置的线程中立即序列化快照，稍后写入"""
+        with self._lock:
+            try:
+                data = json.dumps(self.get_data(), ensure_ascii=False, indent=2).encode('utf-8')
+            except Exception as e:
+                print(f"Error serializing config: {e}")
+                return
+            self.stats['requested'] += 1
+            if self._pending is not None:
+                self.stats['coalesced'] += 1
+            self._pending = data
+            self._schedule(self.delay)
+
+    def flush(self):
+        """立即写入未保存的修改"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                data, self._pending = self._pending, None
+            if data is None:
+                return
+            if data == self._last_written:
+                self.stats['unchanged'] += 1
+                return
+            try:
+                self._atomic_write(data)
+                self._last_written = data
+                self.stats['written'] += 1
+            except Exception as e:
+                print(f"Error saving config: {e}")
+                with self._lock:
+                    # 写入期间没有更新的快照时保留这一份，稍后重试
+                    if self._pending is None:
+                        self._pending = data
+                    self._schedule(RETRY_DELAY)
+
+    def _atomic_write(self, data: bytes):
+        directory = os.path.dirname(self.file_path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # POSIX 下同步目录项，保证重命名落盘
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    @property
+    def writes_avoided(self) -> int:
+        return self.stats['requested'] - self.stats['written']
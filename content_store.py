@@ -0,0 +1,208 @@
+import os
+import sys
+import stat
+import hashlib
+import tempfile
+import threading
+from typing import Callable, Optional, Tuple
+
+# 流式读写的块大小
+CHUNK_SIZE = 1024 * 1024
+# 部分哈希读取的头尾字节数
+PARTIAL_SIZE = 64 * 1024
+# Linux 下 FICLONE ioctl 编号，用于 btrfs/xfs 等文件系统的 reflink
+FICLONE = 0x40049409
+
+
+# 进度回调：参数为本次新处理的字节数
+ProgressCallback = Callable[[int], None]
+
+
+class ImportCancelled(Exception):
+    """导入被取消"""
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+
+def _read_chunks(f, progress: Optional[ProgressCallback], cancel: Optional[threading.Event]):
+    """按块读取文件，每块检查取消标记并报告进度"""
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        if cancel is not None and cancel.is_set():
+            raise ImportCancelled()
+        yield chunk
+        if progress is not None:
+            progress(len(chunk))
+
+
+class ContentStore:
+    """按内容寻址的壁纸存储
+
+    文件以内容哈希命名保存在 objects/<前两位>/<哈希><扩展名>，
+    同一份内容无论导入多少次都只占用一份磁盘空间。
+    """
+
+    def __init__(self, root: str, allow_hardlink: bool = True):
+        self.root = os.path.join(root, 'objects')
+        self.allow_hardlink = allow_hardlink
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+        self._device = os.stat(self.root).st_dev
+
+    def object_path(self, digest: str, ext: str) -> str:
+        """根据哈希和扩展名得到对象路径"""
+        return os.path.join(self.root, digest[:2], f"{digest}{ext.lower()}")
+
+    def is_object(self, path: str) -> bool:
+        """判断路径是否位于对象目录中"""
+        try:
+            return os.path.commonpath([os.path.abspath(path), self.root]) == self.root
+        except ValueError:
+            return False
+
+    @staticmethod
+    def partial_hash(path: str, size: Optional[int] = None) -> str:
+        """只读取文件头尾各64KB计算的快速哈希，用于排除重复"""
+        if size is None:
+            size = os.path.getsize(path)
+        h = _new_hash()
+        h.update(str(size).encode())
+        with open(path, 'rb') as f:
+            h.update(f.read(PARTIAL_SIZE))
+            if size > PARTIAL_SIZE * 2:
+                f.seek(-PARTIAL_SIZE, os.SEEK_END)
+                h.update(f.read(PARTIAL_SIZE))
+        return h.hexdigest()
+
+    @staticmethod
+    def full_hash(path: str, progress: Optional[ProgressCallback] = None,
+                  cancel: Optional[threading.Event] = None) -> str:
+        """计算整个文件的内容哈希"""
+        h = _new_hash()
+        with open(path, 'rb') as f:
+            for chunk in _read_chunks(f, progress, cancel):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def ingest(self, src: str, ext: str, digest: Optional[str] = None,
+               progress: Optional[ProgressCallback] = None,
+               cancel: Optional[threading.Event] = None) -> Tuple[str, str]:
+        """把文件放入存储，返回 (对象路径, 内容哈希)
+
+        同一文件系统上优先使用 reflink，源文件只读时也可以用硬链接，不占用额外空间；
+        否则一边复制一边计算哈希，只读一遍源文件。
+        可写的源文件不做硬链接：用户原地修改原文件会连带改变对象，使其内容与哈希不符。
+        progress 按字节报告进度，cancel 被设置时抛出 ImportCancelled。
+        """
+        size = os.path.getsize(src)
+        if self._same_device(src):
+            if digest is None:
+                digest = self.full_hash(src, progress, cancel)
+            target = self.object_path(digest, ext)
+            if self._intact(target, size):
+                return target, digest
+            self._ensure_parent(target)
+            if self._link(src, target):
+                return target, digest
+
+        if digest is not None:
+            target = self.object_path(digest, ext)
+            if self._intact(target, size):
+                return target, digest
+        return self._copy(src, ext, progress, cancel)
+
+    @staticmethod
+    def _intact(target: str, size: int) -> bool:
+        """已有对象的大小与源文件一致时可以直接复用
+
+        旧版本硬链接的对象可能随原文件被原地修改，大小不符时返回 False，由调用方原子替换。
+        """
+        try:
+            return os.path.getsize(target) == size
+        except OSError:
+            return False
+
+    def _link(self, src: str, target: str) -> bool:
+        """reflink 或硬链接到临时文件再重命名为对象，不会写穿已存在的旧对象"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        os.close(fd)
+        try:
+            linked = self._reflink(src, tmp_path)
+            if not linked:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                linked = self._hardlink(src, tmp_path)
+            if linked:
+                os.replace(tmp_path, target)
+            return linked
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _copy(self, src: str, ext: str, progress: Optional[ProgressCallback] = None,
+              cancel: Optional[threading.Event] = None) -> Tuple[str, str]:
+        """流式复制到临时文件并同时计算哈希，完成后原子重命名"""
+        h = _new_hash()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as dst, open(src, 'rb') as f:
+                for chunk in _read_chunks(f, progress, cancel):
+                    h.update(chunk)
+                    dst.write(chunk)
+            digest = h.hexdigest()
+            target = self.object_path(digest, ext)
+            if self._intact(target, os.path.getsize(tmp_path)):
+                # 内容已存在，丢弃刚复制的文件
+                os.remove(tmp_path)
+            else:
+                self._ensure_parent(target)
+                os.replace(tmp_path, target)
+            return target, digest
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _same_device(self, src: str) -> bool:
+        try:
+            return os.stat(src).st_dev == self._device
+        except OSError:
+            return False
+
+    def _reflink(self, src: str, target: str) -> bool:
+        """尝试写时复制克隆（仅 Linux 支持的文件系统）"""
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            import fcntl
+            with open(src, 'rb') as s, open(target, 'wb') as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except (OSError, ImportError):
+            if os.path.exists(target):
+                os.remove(target)
+            return False
+
+    def _hardlink(self, src: str, target: str) -> bool:
+        """源文件只读时尝试创建硬链接"""
+        if not self.allow_hardlink:
+            return False
+        try:
+            if os.stat(src).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+                return False
+            os.link(src, target)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _ensure_parent(path: str):
+        parent = os.path.dirname(path)
+        if not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+
+    def release(self, path: str):
+        """删除对象文件，存储目录之外的路径不受影响"""
+        if self.is_object(path) and os.path.exists(path):
+            os.remove(path)
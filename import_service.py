@@ -0,0 +1,185 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+from PyQt6.QtCore import QObject, pyqtSignal
+from content_store import ImportCancelled
+from media_scanner import scan_media
+
+# 并行复制的线程数（磁盘通常是瓶颈，不宜过多）
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# 进度信号的最小发送间隔（秒），避免信号过多拖慢界面
+PROGRESS_INTERVAL = 0.1
+
+
+class ImportService(QObject):
+    """在后台线程池中导入壁纸，通过信号向界面报告进度
+
+    信号从工作线程发出，Qt 会自动排队到界面线程处理，界面不会被阻塞。
+    """
+
+    # 单个文件进度：源路径, 已处理字节, 文件总字节
+    file_progress = pyqtSignal(str, int, int)
+    # 单个文件完成：源路径, 库中路径
+    file_finished = pyqtSignal(str, str)
+    # 单个文件失败：源路径, 错误信息
+    file_failed = pyqtSignal(str, str)
+    # 批次进度：已完成文件数, 文件总数(未知为-1), 已处理字节, 总字节(未知为-1), 速度(字节/秒)
+    batch_progress = pyqtSignal(int, int, 'qint64', 'qint64', float)
+    # 批次结束：成功数, 失败数, 是否被取消
+    batch_finished = pyqtSignal(int, int, bool)
+
+    def __init__(self, wallpaper_manager, parent=None, max_workers: int = DEFAULT_WORKERS):
+        super().__init__(parent)
+        self.wallpaper_manager = wallpaper_manager
+        self.max_workers = max_workers
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # 补全元数据的线程独立于导入批次，补全期间可以开始新的导入
+        self._backfill_thread: Optional[threading.Thread] = None
+        self._backfill_again = False
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self._files_done = 0
+        self._files_total = -1
+        self._bytes_done = 0
+        self._bytes_total = -1
+        self._imported = 0
+        self._failed = 0
+        self._started = time.monotonic()
+        self._last_emit = 0.0
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def import_files(self, paths: Iterable[str]) -> bool:
+        """开始导入一批文件；paths 可以是列表，也可以是逐个产生路径的生成器"""
+        if self.is_running():
+            return False
+        self._cancel.clear()
+        self._reset_counters()
+        if isinstance(paths, (list, tuple)):
+            self._files_total = len(paths)
+            self._bytes_total = sum(self._file_size(p) for p in paths)
+        self._thread = threading.Thread(target=self._run, args=(iter(paths),), daemon=True)
+        self._thread.start()
+        return True
+
+    def import_folder(self, root: str) -> bool:
+        """递归导入文件夹，边扫描边导入，已在库中的文件直接跳过"""
+        return self.import_files(self._scan_folder(root))
+
+    def _scan_folder(self, root: str):
+        for path, _media_type, stat in scan_media(root):
+            if self._cancel.is_set():
+                return
+            if self.wallpaper_manager.is_known_file(path, stat):
+                continue
+            yield path
+
+    def cancel(self):
+        """取消当前批次，正在复制的文件会在下一个数据块处停止"""
+        self._cancel.set()
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _run(self, paths):
+        # 限制同时排队的任务数，生成器输入时内存占用保持有界
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        try:
+            with self.wallpaper_manager.batch(), \
+                    ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for path in paths:
+                    if self._cancel.is_set():
+                        break
+                    slots.acquire()
+                    future = pool.submit(self._import_one, path)
+                    future.add_done_callback(lambda _f: slots.release())
+        except Exception as e:
+            print(f"Error running import batch: {e}")
+        finally:
+            self._emit_batch_progress(force=True)
+            self.batch_finished.emit(self._imported, self._failed, self._cancel.is_set())
+        # 导入完成后在进程池中提取新壁纸的元数据和感知哈希
+        if not self._cancel.is_set():
+            self.start_backfill()
+
+    def start_backfill(self):
+        """在单独的线程中补全元数据；正在补全时，结束后再补一次以包含新导入的壁纸"""
+        with self._lock:
+            if self._backfill_thread is not None:
+                self._backfill_again = True
+                return
+            self._backfill_again = False
+            self._backfill_thread = threading.Thread(target=self._run_backfill, daemon=True)
+            self._backfill_thread.start()
+
+    def _run_backfill(self):
+        while True:
+            try:
+                self.wallpaper_manager.backfill()
+            except Exception as e:
+                print(f"Error backfilling library: {e}")
+            with self._lock:
+                if not self._backfill_again:
+                    self._backfill_thread = None
+                    return
+                self._backfill_again = False
+
+    def _import_one(self, path: str):
+        if self._cancel.is_set():
+            return
+        total = self._file_size(path)
+        done = 0
+        last_emit = 0.0
+
+        def on_progress(nbytes):
+            nonlocal done, last_emit
+            done += nbytes
+            with self._lock:
+                self._bytes_done += nbytes
+            now = time.monotonic()
+            if now - last_emit >= PROGRESS_INTERVAL:
+                last_emit = now
+                self.file_progress.emit(path, done, total)
+            self._emit_batch_progress()
+
+        try:
+            # 工作线程加入批量模式，数据库修改随批次分块提交
+            with self.wallpaper_manager.db.batch():
+                target = self.wallpaper_manager.add_wallpaper(path, progress=on_progress, cancel=self._cancel)
+            with self._lock:
+                # 重复文件不会读取全部内容，补齐剩余字节
+                self._bytes_done += max(0, total - done)
+                self._imported += 1
+            self.file_progress.emit(path, total, total)
+            self.file_finished.emit(path, target)
+        except ImportCancelled:
+            return
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            self.file_failed.emit(path, str(e))
+        finally:
+            with self._lock:
+                self._files_done += 1
+            self._emit_batch_progress()
+
+    def _emit_batch_progress(self, force: bool = False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_emit < PROGRESS_INTERVAL:
+                return
+            self._last_emit = now
+            elapsed = max(now - self._started, 1e-6)
+            values = (self._files_done, self._files_total, self._bytes_done,
+                      self._bytes_total, self._bytes_done / elapsed)
+        self.batch_progress.emit(*values)
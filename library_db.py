@@ -0,0 +1,495 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, List, Dict, Optional, Iterable, Tuple
+from media_scanner import VIDEO_EXTENSIONS
+
+# 每个版本对应一组建表/升级语句，按 PRAGMA user_version 依次执行
+_MIGRATIONS = [
+    """
+    CREATE TABLE wallpapers (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        hash TEXT,
+        partial TEXT,
+        size INTEGER,
+        mtime INTEGER,
+        added_at REAL NOT NULL,
+        last_used REAL
+    );
+    CREATE INDEX idx_wallpapers_hash ON wallpapers(hash);
+    CREATE INDEX idx_wallpapers_size ON wallpapers(size);
+    CREATE INDEX idx_wallpapers_added ON wallpapers(added_at);
+    CREATE INDEX idx_wallpapers_last_used ON wallpapers(last_used);
+
+    CREATE TABLE tags (
+        tag TEXT NOT NULL,
+        wallpaper_id INTEGER NOT NULL REFERENCES wallpapers(id) ON DELETE CASCADE,
+        PRIMARY KEY (tag, wallpaper_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_tags_wallpaper ON tags(wallpaper_id);
+
+    CREATE TABLE sources (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime INTEGER NOT NULL,
+        hash TEXT NOT NULL
+    ) WITHOUT ROWID;
+    """,
+    # 媒体元数据（分辨率、时长、帧率、编码），probed_at 为空表示尚未提取
+    """
+    ALTER TABLE wallpapers ADD COLUMN width INTEGER;
+    ALTER TABLE wallpapers ADD COLUMN height INTEGER;
+    ALTER TABLE wallpapers ADD COLUMN aspect REAL;
+    ALTER TABLE wallpapers ADD COLUMN duration REAL;
+    ALTER TABLE wallpapers ADD COLUMN fps REAL;
+    ALTER TABLE wallpapers ADD COLUMN codec TEXT;
+    ALTER TABLE wallpapers ADD COLUMN probed_at REAL;
+    CREATE INDEX idx_wallpapers_unprobed ON wallpapers(id) WHERE probed_at IS NULL;
+    """,
+    # 感知哈希：图片一个，视频每个采样帧一个；phashed_at 为空表示尚未计算
+    """
+    ALTER TABLE wallpapers ADD COLUMN phashed_at REAL;
+    CREATE INDEX idx_wallpapers_unphashed ON wallpapers(id) WHERE phashed_at IS NULL;
+    CREATE TABLE phashes (
+        wallpaper_id INTEGER NOT NULL REFERENCES wallpapers(id) ON DELETE CASCADE,
+        phash INTEGER NOT NULL
+    );
+    CREATE INDEX idx_phashes_wallpaper ON phashes(wallpaper_id);
+    """,
+    # 查询接口的排序和筛选索引（排序键都带 id，支持游标分页）
+    """
+    DROP INDEX idx_wallpapers_added;
+    DROP INDEX idx_wallpapers_last_used;
+    CREATE INDEX idx_wallpapers_added ON wallpapers(added_at, id);
+    CREATE INDEX idx_wallpapers_last_used ON wallpapers(ifnull(last_used, 0), id);
+    CREATE INDEX idx_wallpapers_name ON wallpapers(name COLLATE NOCASE, id);
+    CREATE INDEX idx_wallpapers_type ON wallpapers(type);
+    CREATE INDEX idx_wallpapers_resolution ON wallpapers(width, height);
+    CREATE INDEX idx_wallpapers_aspect ON wallpapers(aspect);
+    """,
+]
+
+# 排序方式 -> 排序键表达式
+_SORT_KEYS = {
+    'name': 'w.name COLLATE NOCASE',
+    'added': 'w.added_at',
+    'last_used': 'ifnull(w.last_used, 0)',
+}
+
+# 批量模式下每提交一次包含的修改数
+BATCH_COMMIT_SIZE = 200
+
+_COLUMNS = (
+    'path', 'name', 'type', 'hash', 'partial', 'size', 'mtime', 'added_at', 'last_used',
+    'width', 'height', 'aspect', 'duration', 'fps', 'codec', 'probed_at', 'phashed_at'
+)
+
+
+class LibraryDB:
+    """基于 SQLite 的壁纸库索引
+
+    所有查询都走索引，单条修改在各自的事务中完成，不再整体重写配置文件。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        # 每个线程各自的批量嵌套层数；有批次未结束的线程数；尚未提交的修改数
+        self._local = threading.local()
+        self._open_batches = 0
+        self._pending = 0
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self._migrate()
+        # 更新查询规划器的统计信息
+        self.conn.execute('PRAGMA optimize')
+
+    def _migrate(self):
+        """按版本号升级表结构"""
+        with self._lock:
+            version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+            for index in range(version, len(_MIGRATIONS)):
+                with self.conn:
+                    self.conn.executescript(_MIGRATIONS[index])
+                    self.conn.execute(f'PRAGMA user_version = {index + 1}')
+
+    @property
+    def _batch_depth(self) -> int:
+        return getattr(self._local, 'depth', 0)
+
+    @contextmanager
+    def _transaction(self):
+        """单条修改的事务，出错时只回滚这一条
+
+        当前线程不在批量模式时立即提交；批量模式下每 BATCH_COMMIT_SIZE 条修改提交一次。
+        """
+        with self._lock:
+            if self._batch_depth and not self.conn.in_transaction:
+                # 没有外层事务时释放保存点就会提交，批量模式下先开启事务
+                self.conn.execute('BEGIN')
+            self.conn.execute('SAVEPOINT change')
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute('ROLLBACK TO change')
+                self.conn.execute('RELEASE change')
+                raise
+            self.conn.execute('RELEASE change')
+            if self._batch_depth == 0:
+                self._commit()
+            else:
+                self._pending += 1
+                if self._pending >= BATCH_COMMIT_SIZE:
+                    self._commit()
+
+    def _commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    @contextmanager
+    def batch(self):
+        """批量模式：当前线程的修改分块提交，最后一个批次结束时提交剩余部分
+
+        批量模式只对进入它的线程生效，其他线程（例如界面）的修改仍然立即提交。
+        批次因异常结束时回滚尚未提交的部分，已提交的块保留。
+        """
+        with self._lock:
+            self._local.depth = self._batch_depth + 1
+            if self._local.depth == 1:
+                self._open_batches += 1
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self._leave_batch()
+                if self._open_batches == 0:
+                    self.conn.rollback()
+                    self._pending = 0
+            raise
+        else:
+            with self._lock:
+                self._leave_batch()
+                if self._open_batches == 0:
+                    self._commit()
+
+    def _leave_batch(self):
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            self._open_batches -= 1
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict:
+        wallpaper = {key: row[key] for key in _COLUMNS}
+        wallpaper['id'] = row['id']
+        tags = row['tags'] if 'tags' in row.keys() else None
+        wallpaper['tags'] = tags.split('\x1f') if tags else []
+        return wallpaper
+
+    def _select(self, where: str = '', params: Iterable = ()) -> List[Dict]:
+        sql = (
+            "SELECT w.*, (SELECT group_concat(tag, char(31)) FROM tags t "
+            "WHERE t.wallpaper_id = w.id) AS tags FROM wallpapers w " + where
+        )
+        with self._lock:
+            rows = self.conn.execute(sql, tuple(params)).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def get(self, path: str) -> Optional[Dict]:
+        """按路径查找壁纸"""
+        rows = self._select('WHERE w.path = ?', (path,))
+        return rows[0] if rows else None
+
+    def get_by_hash(self, digest: str) -> Optional[Dict]:
+        """按内容哈希查找壁纸"""
+        rows = self._select('WHERE w.hash = ? LIMIT 1', (digest,))
+        return rows[0] if rows else None
+
+    def find_by_size(self, size: int) -> List[Dict]:
+        """查找大小相同且已有哈希的壁纸，用于查重"""
+        return self._select('WHERE w.size = ? AND w.hash IS NOT NULL', (size,))
+
+    def all(self) -> List[Dict]:
+        """按添加顺序返回所有壁纸"""
+        return self._select('ORDER BY w.added_at, w.id')
+
+    def unprobed_paths(self, limit: int = 1000) -> List[str]:
+        """尚未提取元数据的壁纸路径"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT path FROM wallpapers WHERE probed_at IS NULL LIMIT ?', (limit,)
+            ).fetchall()
+        return [row['path'] for row in rows]
+
+    def unphashed_paths(self, limit: int = 1000) -> List[str]:
+        """尚未计算感知哈希的壁纸路径"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT path FROM wallpapers WHERE phashed_at IS NULL LIMIT ?', (limit,)
+            ).fetchall()
+        return [row['path'] for row in rows]
+
+    def set_phashes(self, path: str, hashes: Iterable[int]):
+        """保存壁纸的感知哈希（有符号 64 位整数）"""
+        with self._transaction():
+            row = self.conn.execute('SELECT id FROM wallpapers WHERE path = ?', (path,)).fetchone()
+            if row is None:
+                return
+            self.conn.execute('DELETE FROM phashes WHERE wallpaper_id = ?', (row['id'],))
+            self.conn.executemany(
+                'INSERT INTO phashes (wallpaper_id, phash) VALUES (?, ?)',
+                ((row['id'], value) for value in hashes)
+            )
+            self.conn.execute(
+                'UPDATE wallpapers SET phashed_at = ? WHERE id = ?', (time.time(), row['id'])
+            )
+
+    def all_phashes(self) -> List[tuple]:
+        """所有 (壁纸路径, 感知哈希)"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT w.path, p.phash FROM phashes p JOIN wallpapers w ON w.id = p.wallpaper_id'
+            ).fetchall()
+
+    def get_phashes(self, path: str) -> List[int]:
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT p.phash FROM phashes p JOIN wallpapers w ON w.id = p.wallpaper_id '
+                'WHERE w.path = ?', (path,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def rotation_candidates(self) -> List[tuple]:
+        """轮换用的 (路径, 最近使用时间)，按添加顺序"""
+        with self._lock:
+            return [tuple(row) for row in self.conn.execute(
+                'SELECT path, last_used FROM wallpapers ORDER BY added_at, id'
+            )]
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT count(*) FROM wallpapers').fetchone()[0]
+
+    @staticmethod
+    def _build_filters(media_type: Optional[str] = None, min_width: Optional[int] = None,
+                       min_height: Optional[int] = None, aspect: Optional[Tuple[float, float]] = None,
+                       orientation: Optional[str] = None, tag: Optional[str] = None,
+                       added_after: Optional[float] = None, added_before: Optional[float] = None,
+                       ) -> Tuple[List[str], List[Any]]:
+        """把筛选条件转换为 WHERE 子句和参数"""
+        clauses, params = [], []
+        if media_type == 'video':
+            clauses.append(f"w.type IN ({', '.join('?' for _ in VIDEO_EXTENSIONS)})")
+            params.extend(VIDEO_EXTENSIONS)
+        elif media_type == 'image':
+            clauses.append(f"w.type NOT IN ({', '.join('?' for _ in VIDEO_EXTENSIONS)})")
+            params.extend(VIDEO_EXTENSIONS)
+        elif media_type:
+            # 具体扩展名，如 '.png'
+            clauses.append('w.type = ?')
+            params.append(media_type.lower())
+        if min_width is not None:
+            clauses.append('w.width >= ?')
+            params.append(min_width)
+        if min_height is not None:
+            clauses.append('w.height >= ?')
+            params.append(min_height)
+        if aspect is not None:
+            clauses.append('w.aspect BETWEEN ? AND ?')
+            params.extend(aspect)
+        if orientation == 'landscape':
+            clauses.append('w.width > w.height')
+        elif orientation == 'portrait':
+            clauses.append('w.width < w.height')
+        elif orientation == 'square':
+            clauses.append('w.width = w.height')
+        if tag:
+            clauses.append('w.id IN (SELECT wallpaper_id FROM tags WHERE tag = ?)')
+            params.append(tag)
+        if added_after is not None:
+            clauses.append('w.added_at >= ?')
+            params.append(added_after)
+        if added_before is not None:
+            clauses.append('w.added_at < ?')
+            params.append(added_before)
+        return clauses, params
+
+    @staticmethod
+    def _encode_cursor(key, row_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([key, row_id]).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[Any, int]:
+        key, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return key, row_id
+
+    def query(self, sort: str = 'added', descending: bool = False, limit: int = 100,
+              cursor: Optional[str] = None, **filters) -> Tuple[List[Dict], Optional[str]]:
+        """按条件筛选、排序并分页，返回 (本页壁纸, 下一页游标)
+
+        使用游标（键集）分页：下一页从上一页最后一行的排序键之后开始，
+        任何一页的耗时都只与页大小有关，与翻到第几页无关。
+        """
+        if sort not in _SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        key_expr = _SORT_KEYS[sort]
+        clauses, params = self._build_filters(**filters)
+        if cursor:
+            key, row_id = self._decode_cursor(cursor)
+            op = '<' if descending else '>'
+            clauses.append(f"({key_expr}, w.id) {op} (?, ?)")
+            params.extend((key, row_id))
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ''
+        direction = 'DESC' if descending else 'ASC'
+        sql = (
+            f"SELECT w.*, {key_expr} AS sort_key, (SELECT group_concat(tag, char(31)) FROM tags t "
+            f"WHERE t.wallpaper_id = w.id) AS tags FROM wallpapers w {where}"
+            f"ORDER BY {key_expr} {direction}, w.id {direction} LIMIT ?"
+        )
+        with self._lock:
+            rows = self.conn.execute(sql, (*params, limit)).fetchall()
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = self._encode_cursor(rows[-1]['sort_key'], rows[-1]['id'])
+        return [self._row_to_dict(row) for row in rows], next_cursor
+
+    def query_ids(self, sort: str = 'added', descending: bool = False, **filters) -> List[int]:
+        """按条件筛选、排序，只返回 id 列表；列表视图据此按需读取可见的行"""
+        if sort not in _SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        key_expr = _SORT_KEYS[sort]
+        clauses, params = self._build_filters(**filters)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ''
+        direction = 'DESC' if descending else 'ASC'
+        sql = f"SELECT w.id FROM wallpapers w {where}ORDER BY {key_expr} {direction}, w.id {direction}"
+        with self._lock:
+            return [row[0] for row in self.conn.execute(sql, params)]
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, Dict]:
+        """按 id 批量读取壁纸，返回 {id: 壁纸}，已删除的 id 不在结果中"""
+        ids = list(ids)
+        if not ids:
+            return {}
+        rows = self._select(f"WHERE w.id IN ({', '.join('?' for _ in ids)})", ids)
+        return {row['id']: row for row in rows}
+
+    def count_matching(self, **filters) -> int:
+        """满足筛选条件的壁纸数量"""
+        clauses, params = self._build_filters(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            return self.conn.execute(f"SELECT count(*) FROM wallpapers w {where}", params).fetchone()[0]
+
+    def insert(self, wallpaper: Dict):
+        """插入一条壁纸记录，路径已存在时覆盖"""
+        values = {key: wallpaper.get(key) for key in _COLUMNS}
+        if values['added_at'] is None:
+            values['added_at'] = time.time()
+        placeholders = ', '.join('?' for _ in _COLUMNS)
+        updates = ', '.join(f"{key} = excluded.{key}" for key in _COLUMNS if key != 'path')
+        with self._transaction():
+            self.conn.execute(
+                f"INSERT INTO wallpapers ({', '.join(_COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(path) DO UPDATE SET {updates}",
+                tuple(values[key] for key in _COLUMNS)
+            )
+            if wallpaper.get('tags'):
+                self._set_tags(wallpaper['path'], wallpaper['tags'])
+
+    def update(self, path: str, **fields) -> bool:
+        """更新单条记录的部分字段"""
+        fields = {key: value for key, value in fields.items() if key in _COLUMNS and key != 'path'}
+        if not fields:
+            return False
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        with self._transaction():
+            cursor = self.conn.execute(
+                f"UPDATE wallpapers SET {assignments} WHERE path = ?",
+                (*fields.values(), path)
+            )
+            return cursor.rowcount > 0
+
+    def touch(self, path: str) -> bool:
+        """记录最近使用时间"""
+        return self.update(path, last_used=time.time())
+
+    def delete(self, path: str) -> bool:
+        with self._transaction():
+            cursor = self.conn.execute('DELETE FROM wallpapers WHERE path = ?', (path,))
+            return cursor.rowcount > 0
+
+    def delete_many(self, paths: Iterable[str]) -> int:
+        with self._transaction():
+            cursor = self.conn.executemany(
+                'DELETE FROM wallpapers WHERE path = ?', ((p,) for p in paths)
+            )
+            return cursor.rowcount
+
+    def set_tags(self, path: str, tags: Iterable[str]):
+        """替换壁纸的标签"""
+        with self._transaction():
+            self._set_tags(path, tags)
+
+    def _set_tags(self, path: str, tags: Iterable[str]):
+        row = self.conn.execute('SELECT id FROM wallpapers WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute('DELETE FROM tags WHERE wallpaper_id = ?', (row['id'],))
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO tags (tag, wallpaper_id) VALUES (?, ?)',
+            ((tag, row['id']) for tag in tags if tag)
+        )
+
+    def get_source(self, path: str) -> Optional[sqlite3.Row]:
+        """查找源文件缓存（大小、修改时间、内容哈希）"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT size, mtime, hash FROM sources WHERE path = ?', (path,)
+            ).fetchone()
+
+    def set_source(self, path: str, size: int, mtime: int, digest: str):
+        with self._transaction():
+            self.conn.execute(
+                'INSERT OR REPLACE INTO sources (path, size, mtime, hash) VALUES (?, ?, ?, ?)',
+                (path, size, mtime, digest)
+            )
+
+    def migrate_from_config(self, wallpapers: List[Dict], sources: Dict[str, list]):
+        """从旧版 config.json 一次性导入壁纸列表和源文件缓存"""
+        now = time.time()
+        with self._transaction():
+            for order, wallpaper in enumerate(wallpapers):
+                path = wallpaper['path']
+                values = {key: wallpaper.get(key) for key in _COLUMNS}
+                values['name'] = values['name'] or os.path.basename(path)
+                values['type'] = values['type'] or os.path.splitext(path)[1].lower()
+                # 保持原有顺序
+                values['added_at'] = values['added_at'] or now + order * 1e-6
+                if values['size'] is None or values['mtime'] is None:
+                    try:
+                        stat = os.stat(path)
+                        values['size'] = values['size'] if values['size'] is not None else stat.st_size
+                        values['mtime'] = stat.st_mtime_ns
+                    except OSError:
+                        pass
+                self.conn.execute(
+                    f"INSERT OR IGNORE INTO wallpapers ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    tuple(values[key] for key in _COLUMNS)
+                )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO sources (path, size, mtime, hash) VALUES (?, ?, ?, ?)',
+                ((path, s[0], s[1], s[2]) for path, s in sources.items())
+            )
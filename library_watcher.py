@@ -0,0 +1,383 @@
+import os
+import sys
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Dict, Optional, Tuple
+
+# 文件快照信息：(大小, 修改时间纳秒)
+FileInfo = Tuple[int, int]
+
+# 轮询模式下检查目录变化的间隔（秒）
+POLL_INTERVAL = 2.0
+# 轮询模式下每次检查状态的文件数：原地修改文件不改变目录的修改时间，需要逐个检查，
+# 轮流检查，所有文件在 文件数 / POLL_FILES 次轮询内都会被检查一遍
+POLL_FILES = 500
+
+
+class DirectorySnapshot:
+    """壁纸目录快照，按目录保存 文件名 -> (大小, 修改时间)"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.dirs: Dict[str, Dict[str, FileInfo]] = {}
+        self.dir_mtimes: Dict[str, int] = {}
+
+    def scan(self):
+        """用 os.scandir 对整个目录树做一次完整扫描"""
+        self.dirs.clear()
+        self.dir_mtimes.clear()
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            stack.extend(self.scan_dir(directory))
+
+    def scan_dir(self, directory: str):
+        """重新扫描单个目录，返回其中的子目录"""
+        files = {}
+        subdirs = []
+        try:
+            self.dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            files[entry.name] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            self.dirs.pop(directory, None)
+            self.dir_mtimes.pop(directory, None)
+            return []
+        self.dirs[directory] = files
+        return subdirs
+
+    def get(self, path: str) -> Optional[FileInfo]:
+        directory, name = os.path.split(os.path.abspath(path))
+        return self.dirs.get(directory, {}).get(name)
+
+    def contains_dir(self, path: str) -> bool:
+        """路径是否在快照覆盖的目录树内"""
+        path = os.path.abspath(path)
+        try:
+            return os.path.commonpath([path, self.root]) == self.root
+        except ValueError:
+            return False
+
+    def refresh_path(self, path: str) -> Tuple[Optional[FileInfo], Optional[FileInfo]]:
+        """重新读取单个文件的状态，返回 (旧状态, 新状态)"""
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        files = self.dirs.setdefault(directory, {})
+        old = files.get(name)
+        try:
+            st = os.stat(path)
+            new = (st.st_size, st.st_mtime_ns) if not os.path.isdir(path) else None
+        except OSError:
+            new = None
+        if new is None:
+            files.pop(name, None)
+        else:
+            files[name] = new
+        return old, new
+
+    def refresh_dir(self, directory: str, recursive: bool = False) -> Dict[str, Tuple[Optional[FileInfo], Optional[FileInfo]]]:
+        """重新扫描目录，返回有变化的文件
+
+        默认只进入新出现的子目录，recursive 为 True 时重扫整个子树。
+        """
+        changes = {}
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            old_files = dict(self.dirs.get(current, {}))
+            for subdir in self.scan_dir(current):
+                if recursive or subdir not in self.dirs:
+                    stack.append(subdir)
+            new_files = self.dirs.get(current, {})
+            for name in old_files.keys() | new_files.keys():
+                if old_files.get(name) != new_files.get(name):
+                    changes[os.path.join(current, name)] = (old_files.get(name), new_files.get(name))
+        return changes
+
+
+class _InotifyBackend:
+    """Linux inotify 监视器（通过 ctypes 调用 libc）"""
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+            IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    def __init__(self, snapshot: DirectorySnapshot, on_path, on_dir):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.on_path = on_path
+        self.on_dir = on_dir
+        self.watches = {}
+        self._stop_r, self._stop_w = os.pipe()
+        for directory in list(snapshot.dirs):
+            self._add_watch(directory)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _add_watch(self, directory: str):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd >= 0:
+            self.watches[wd] = directory
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        os.write(self._stop_w, b'x')
+
+    def _run(self):
+        header = struct.Struct('iIII')
+        try:
+            while True:
+                ready, _, _ = select.select([self.fd, self._stop_r], [], [])
+                if self._stop_r in ready:
+                    break
+                data = os.read(self.fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _cookie, length = header.unpack_from(data, offset)
+                    offset += header.size
+                    name = data[offset:offset + length].rstrip(b'\0')
+                    offset += length
+                    directory = self.watches.get(wd)
+                    if mask & self.IN_Q_OVERFLOW:
+                        # 事件队列溢出，退回到整体重扫
+                        self.on_dir(None)
+                        continue
+                    if mask & self.IN_IGNORED:
+                        self.watches.pop(wd, None)
+                        continue
+                    if directory is None or not name:
+                        continue
+                    path = os.path.join(directory, os.fsdecode(name))
+                    if mask & self.IN_ISDIR:
+                        if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                            self._add_watch(path)
+                        self.on_dir(path)
+                    else:
+                        self.on_path(path)
+        finally:
+            os.close(self.fd)
+            os.close(self._stop_r)
+            os.close(self._stop_w)
+
+
+class _WindowsBackend:
+    """Windows ReadDirectoryChangesW 监视器（递归监视整个目录树）"""
+
+    FILE_LIST_DIRECTORY = 0x0001
+
+    def __init__(self, snapshot: DirectorySnapshot, on_path, on_dir):
+        import win32file
+        import win32con
+        self.win32file = win32file
+        self.root = snapshot.root
+        self.on_path = on_path
+        self.on_dir = on_dir
+        self.handle = win32file.CreateFile(
+            self.root,
+            self.FILE_LIST_DIRECTORY,
+            win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+            None,
+            win32con.OPEN_EXISTING,
+            win32con.FILE_FLAG_BACKUP_SEMANTICS,
+            None
+        )
+        self.flags = (
+            win32con.FILE_NOTIFY_CHANGE_FILE_NAME |
+            win32con.FILE_NOTIFY_CHANGE_DIR_NAME |
+            win32con.FILE_NOTIFY_CHANGE_SIZE |
+            win32con.FILE_NOTIFY_CHANGE_LAST_WRITE
+        )
+        self._running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._running = False
+        try:
+            self.handle.Close()
+        except Exception:
+            pass
+
+    def _run(self):
+        while self._running:
+            try:
+                results = self.win32file.ReadDirectoryChangesW(
+                    self.handle, 64 * 1024, True, self.flags, None, None
+                )
+            except Exception:
+                break
+            if not results:
+                # 缓冲区溢出，退回到整体重扫
+                self.on_dir(None)
+                continue
+            for _action, name in results:
+                path = os.path.join(self.root, name)
+                if os.path.isdir(path):
+                    self.on_dir(path)
+                else:
+                    self.on_path(path)
+
+
+class _PollingBackend:
+    """轮询兜底：目录修改时间变化的目录重新扫描；文件轮流检查大小和修改时间，发现原地修改"""
+
+    def __init__(self, snapshot: DirectorySnapshot, on_path, on_dir, interval: float = POLL_INTERVAL,
+                 files_per_poll: int = POLL_FILES):
+        self.snapshot = snapshot
+        self.on_path = on_path
+        self.on_dir = on_dir
+        self.interval = interval
+        self.files_per_poll = files_per_poll
+        self._files = []
+        self._cursor = 0
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        for directory, mtime in list(self.snapshot.dir_mtimes.items()):
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    self.on_dir(directory)
+            except OSError:
+                self.on_dir(directory)
+        self._check_files()
+
+    def _check_files(self):
+        """检查下一批文件的大小和修改时间，一轮检查完后按当前快照重新开始"""
+        if self._cursor >= len(self._files):
+            self._files = [os.path.join(directory, name)
+                           for directory, files in list(self.snapshot.dirs.items()) for name in list(files)]
+            self._cursor = 0
+        batch = self._files[self._cursor:self._cursor + self.files_per_poll]
+        self._cursor += len(batch)
+        for path in batch:
+            try:
+                st = os.stat(path)
+                current = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                current = None
+            if current != self.snapshot.get(path):
+                self.on_path(path)
+
+
+class LibraryWatcher:
+    """维护壁纸目录快照，并根据文件系统通知增量更新
+
+    drain() 只处理自上次调用以来发生变化的路径，耗时与变化量成正比，与库大小无关。
+    """
+
+    def __init__(self, root: str, use_notifications: bool = True):
+        self.snapshot = DirectorySnapshot(root)
+        self._lock = threading.Lock()
+        self._pending_paths = set()
+        self._pending_dirs = set()
+        self._full_rescan = False
+        self.snapshot.scan()
+        self.backend = None
+        if use_notifications:
+            self.backend = self._create_backend()
+        if self.backend is None:
+            self.backend = _PollingBackend(self.snapshot, self._on_path, self._on_dir)
+        self.backend.start()
+
+    def _create_backend(self):
+        try:
+            if sys.platform.startswith('linux'):
+                return _InotifyBackend(self.snapshot, self._on_path, self._on_dir)
+            if sys.platform == 'win32':
+                return _WindowsBackend(self.snapshot, self._on_path, self._on_dir)
+        except Exception as e:
+            print(f"Error starting file watcher, falling back to polling: {e}")
+        return None
+
+    @property
+    def mode(self) -> str:
+        return {
+            _InotifyBackend: 'inotify',
+            _WindowsBackend: 'ReadDirectoryChangesW',
+            _PollingBackend: 'polling',
+        }[type(self.backend)]
+
+    def _on_path(self, path: str):
+        with self._lock:
+            self._pending_paths.add(path)
+
+    def _on_dir(self, directory: Optional[str]):
+        with self._lock:
+            if directory is None:
+                self._full_rescan = True
+            else:
+                self._pending_dirs.add(directory)
+
+    def drain(self) -> Dict[str, Tuple[Optional[FileInfo], Optional[FileInfo]]]:
+        """取出自上次调用以来的变化，返回 路径 -> (旧状态, 新状态)"""
+        with self._lock:
+            paths, self._pending_paths = self._pending_paths, set()
+            dirs, self._pending_dirs = self._pending_dirs, set()
+            full_rescan, self._full_rescan = self._full_rescan, False
+
+        if full_rescan:
+            return self.snapshot.refresh_dir(self.snapshot.root, recursive=True)
+
+        changes = {}
+        for directory in dirs:
+            changes.update(self.snapshot.refresh_dir(directory))
+        for path in paths:
+            old, new = self.snapshot.refresh_path(path)
+            if old != new:
+                changes[os.path.abspath(path)] = (old, new)
+        return changes
+
+    def exists(self, path: str) -> bool:
+        """判断文件是否存在；快照覆盖范围外的路径直接检查磁盘"""
+        if self.snapshot.contains_dir(path):
+            return self.snapshot.get(path) is not None
+        return os.path.exists(path)
+
+    def stat(self, path: str) -> Optional[FileInfo]:
+        if self.snapshot.contains_dir(path):
+            return self.snapshot.get(path)
+        try:
+            st = os.stat(path)
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def stop(self):
+        if self.backend is not None:
+            self.backend.stop()
@@ -0,0 +1,168 @@
+"""循环接缝基准测试：测量视频从最后一帧回到第一帧之间的时间间隔和黑帧
+
+用 OpenCV 生成一段测试视频，每帧左上角用黑白方块编码帧序号，背景为灰色；
+VLC 解码到内存缓冲区，每显示一帧记录时间和读出的帧序号。序号变小处即为循环接缝，
+接缝间隔减去一帧的时长就是循环带来的额外停顿。
+
+用法：python loop_benchmark.py [--loops 5] [--seconds 2] [--fps 30] [--strategy list repeat]
+    list   - video_loop.LoopingPlayer（媒体列表循环，壁纸使用的方式）
+    repeat - 旧的 input-repeat 选项
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# 测试视频尺寸和编码帧序号的方块
+CLIP_SIZE = (320, 180)
+BIT_COUNT = 12
+BIT_SIZE = 16
+BACKGROUND = 128
+# 平均亮度低于这个值的帧视为黑帧
+BLACK_LEVEL = 16
+
+
+def make_clip(path: str, frames: int, fps: float, size: Tuple[int, int] = CLIP_SIZE) -> str:
+    """生成帧序号可读的测试视频"""
+    import cv2
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    try:
+        for index in range(frames):
+            frame = np.full((size[1], size[0], 3), BACKGROUND, dtype=np.uint8)
+            for bit in range(BIT_COUNT):
+                value = 255 if index >> bit & 1 else 0
+                frame[0:BIT_SIZE, bit * BIT_SIZE:(bit + 1) * BIT_SIZE] = value
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+
+def read_index(frame: np.ndarray) -> int:
+    """从帧（高 x 宽 x 通道）读出帧序号，取每个方块中心的亮度"""
+    center = BIT_SIZE // 2
+    index = 0
+    for bit in range(BIT_COUNT):
+        if frame[center, bit * BIT_SIZE + center, :3].mean() > 128:
+            index |= 1 << bit
+    return index
+
+
+def seam_stats(records: List[Tuple[float, int, bool]], fps: float) -> Dict:
+    """从 (时间, 帧序号, 是否黑帧) 序列统计每个接缝的间隔（毫秒）和黑帧数"""
+    gaps = []
+    for (t0, i0, _), (t1, i1, _) in zip(records, records[1:]):
+        if i1 < i0:
+            gaps.append((t1 - t0) * 1000)
+    frame_ms = 1000 / fps
+    return {
+        'seams': len(gaps),
+        'frame_ms': frame_ms,
+        'gaps_ms': gaps,
+        'median_ms': float(np.median(gaps)) if gaps else None,
+        'max_ms': max(gaps) if gaps else None,
+        'extra_ms': float(np.median(gaps)) - frame_ms if gaps else None,
+        'black_frames': sum(1 for _t, _i, black in records if black),
+        'frames': len(records),
+    }
+
+
+def measure(clip: str, strategy: str, loops: int, fps: float, duration: float) -> Dict:
+    """按指定的循环方式播放测试视频，直到经过 loops 个接缝或超时"""
+    import vlc
+    from PyQt6.QtCore import QCoreApplication
+    from video_loop import LoopingPlayer, loop_media
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    width, height = CLIP_SIZE
+    buffer = np.zeros((height, width, 4), dtype=np.uint8)
+    records: List[Tuple[float, int, bool]] = []
+    lock = threading.Lock()
+
+    def on_lock(_opaque, planes):
+        planes[0] = buffer.ctypes.data
+        return None
+
+    def on_unlock(_opaque, _picture, _planes):
+        pass
+
+    def on_display(_opaque, _picture):
+        now = time.perf_counter()
+        index = read_index(buffer)
+        black = buffer[..., :3].mean() < BLACK_LEVEL
+        with lock:
+            records.append((now, index, black))
+
+    instance = vlc.Instance('--quiet', '--no-audio')
+    player = instance.media_player_new()
+    callbacks = (vlc.CallbackDecorators.VideoLockCb(on_lock),
+                 vlc.CallbackDecorators.VideoUnlockCb(on_unlock),
+                 vlc.CallbackDecorators.VideoDisplayCb(on_display))
+    player.video_set_callbacks(*callbacks, None)
+    player.video_set_format('RV32', width, height, width * 4)
+
+    loop = None
+    if strategy == 'list':
+        loop = LoopingPlayer(instance, player)
+        loop.set_media(loop_media(instance, clip))
+        loop.play()
+    else:
+        media = instance.media_new(clip)
+        media.add_option('input-repeat=65535')
+        player.set_media(media)
+        player.play()
+
+    deadline = time.perf_counter() + duration * (loops + 2) + 10
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        with lock:
+            if seam_stats(records, fps)['seams'] >= loops:
+                break
+        time.sleep(0.005)
+
+    if loop:
+        loop.stop()
+    player.stop()
+    player.release()
+    instance.release()
+    with lock:
+        return seam_stats(records, fps)
+
+
+def format_stats(strategy: str, stats: Dict) -> str:
+    if not stats['seams']:
+        return f"{strategy}: no loop seam observed ({stats['frames']} frames)"
+    return (f"{strategy}: {stats['seams']} seams, gap median {stats['median_ms']:.1f} ms, "
+            f"max {stats['max_ms']:.1f} ms (frame {stats['frame_ms']:.1f} ms, "
+            f"extra {stats['extra_ms']:.1f} ms), black frames {stats['black_frames']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="循环接缝基准测试")
+    parser.add_argument('--loops', type=int, default=5)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--strategy', nargs='+', default=['list', 'repeat'], choices=['list', 'repeat'])
+    parser.add_argument('--clip', help="使用已有的测试视频（需按本脚本的方式编码帧序号）")
+    args = parser.parse_args(argv)
+
+    clip = args.clip
+    tmp_dir = None
+    if not clip:
+        tmp_dir = tempfile.mkdtemp()
+        clip = make_clip(os.path.join(tmp_dir, 'loop.mp4'), max(2, round(args.seconds * args.fps)), args.fps)
+    try:
+        for strategy in args.strategy:
+            print(format_stats(strategy, measure(clip, strategy, args.loops, args.fps, args.seconds)))
+    finally:
+        if tmp_dir:
+            os.remove(clip)
+            os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,15 @@
 import sys
 import os
+import threading
+import multiprocessing
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QTabWidget,
                            QPushButton, QVBoxLayout, QHBoxLayout, QLabel,
-                           QFileDialog, QListWidget, QMessageBox, QListWidgetItem,
-                           QFrame, QScrollArea, QSlider, QCheckBox)
+                           QFileDialog, QListView, QMessageBox,
+                           QFrame, QScrollArea, QSlider, QCheckBox, QProgressBar,
+                           QComboBox, QSpinBox, QDoubleSpinBox)
 from PyQt6.QtGui import QDesktopServices
 from PyQt6.QtCore import QUrl, QSettings
-from PyQt6.QtCore import Qt, QSize, pyqtSignal
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QIcon, QPixmap, QColor, QPalette, QPainter
 import win32gui
 import win32con
@@ -14,6 +17,14 @@ import win32api
 from PIL import Image
 from wallpaper_manager import WallpaperManager
 from video_wallpaper import VideoWallpaper
+from import_service import ImportService
+from thumbnail_service import ThumbnailService
+from preview_pyramid import PreviewPyramid, PREVIEW_NAMESPACE, PREVIEW_BUDGET
+from cache_manager import CacheManager
+from wallpaper_list_model import WallpaperListModel, WallpaperItemDelegate, PathRole, NameRole
+from rotation import RotationScheduler
+from playback_policy import PlaybackPolicyEngine, default_provider
+from playback_governor import PlaybackGovernor, DEFAULT_CPU_BUDGET
 
 # 创建图标目录
 ICONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icons')
@@ -24,10 +35,14 @@ if not os.path.exists(ICONS_DIR):
 DEFAULT_VIDEO_ICON = os.path.join(ICONS_DIR, 'video.png')
 DEFAULT_GIF_ICON = os.path.join(ICONS_DIR, 'gif.png')
 
+# 检查系统内存占用的间隔（毫秒）
+MEMORY_CHECK_INTERVAL = 30 * 1000
+
 class SettingsTab(QWidget):
-    def __init__(self):
+    def __init__(self, rotation_scheduler=None):
         super().__init__()
         self.settings = QSettings('PlanetBoy', 'Wallpaper')
+        self.rotation_scheduler = rotation_scheduler
         
         # 创建主布局
         main_layout = QVBoxLayout(self)
@@ -95,6 +110,133 @@ class SettingsTab(QWidget):
         autostart_layout.addWidget(autostart_label)
         autostart_layout.addWidget(self.autostart_checkbox)
         autostart_layout.addStretch()
+
+        # 自动更换壁纸设置区域
+        rotation_container = QWidget()
+        rotation_container.setStyleSheet("""
+            QWidget {
+                background: rgba(255, 248, 240, 0.7);
+                border-radius: 15px;
+                padding: 20px;
+            }
+        """)
+        rotation_layout = QHBoxLayout(rotation_container)
+
+        rotation_label = QLabel("自动更换壁纸")
+        rotation_label.setStyleSheet("font-size: 14px; font-weight: bold;")
+
+        self.rotation_checkbox = QCheckBox()
+        self.rotation_checkbox.setStyleSheet(self.autostart_checkbox.styleSheet())
+
+        self.rotation_interval = QSpinBox()
+        self.rotation_interval.setRange(1, 24 * 60)
+        self.rotation_interval.setSuffix(" 分钟")
+
+        self.rotation_order = QComboBox()
+        self.rotation_order.addItem("随机（不重复）", 'shuffle')
+        self.rotation_order.addItem("按顺序", 'sequential')
+        self.rotation_order.addItem("优先久未使用", 'recency')
+
+        if self.rotation_scheduler:
+            rotation_settings = self.rotation_scheduler.wallpaper_manager.config['settings']
+            self.rotation_checkbox.setChecked(bool(rotation_settings.get('auto_change')))
+            self.rotation_interval.setValue(max(1, int(rotation_settings.get('change_interval', 3600)) // 60))
+            index = self.rotation_order.findData(rotation_settings.get('rotation_order', 'shuffle'))
+            self.rotation_order.setCurrentIndex(max(0, index))
+        else:
+            rotation_container.setEnabled(False)
+
+        self.rotation_checkbox.stateChanged.connect(self.update_rotation)
+        self.rotation_interval.valueChanged.connect(self.update_rotation)
+        self.rotation_order.currentIndexChanged.connect(self.update_rotation)
+
+        rotation_layout.addWidget(rotation_label)
+        rotation_layout.addWidget(self.rotation_checkbox)
+        rotation_layout.addWidget(self.rotation_interval)
+        rotation_layout.addWidget(self.rotation_order)
+        rotation_layout.addStretch()
+
+        # 壁纸填充方式设置区域
+        fit_container = QWidget()
+        fit_container.setStyleSheet(rotation_container.styleSheet())
+        fit_layout = QHBoxLayout(fit_container)
+
+        fit_label = QLabel("填充方式")
+        fit_label.setStyleSheet("font-size: 14px; font-weight: bold;")
+
+        self.fit_mode = QComboBox()
+        self.fit_mode.addItem("填充", 'fill')
+        self.fit_mode.addItem("适应", 'fit')
+        self.fit_mode.addItem("拉伸", 'stretch')
+        self.fit_mode.addItem("居中", 'center')
+
+        # 多显示器时每屏各铺一张或一张图跨越所有显示器
+        self.monitor_layout = QComboBox()
+        self.monitor_layout.addItem("每屏相同", 'duplicate')
+        self.monitor_layout.addItem("跨屏拼接", 'span')
+
+        if self.rotation_scheduler:
+            index = self.fit_mode.findData(rotation_settings.get('fit_mode', 'fill'))
+            self.fit_mode.setCurrentIndex(max(0, index))
+            index = self.monitor_layout.findData(rotation_settings.get('monitor_layout', 'duplicate'))
+            self.monitor_layout.setCurrentIndex(max(0, index))
+        else:
+            fit_container.setEnabled(False)
+        self.fit_mode.currentIndexChanged.connect(self.update_fit_mode)
+        self.monitor_layout.currentIndexChanged.connect(self.update_fit_mode)
+
+        fit_layout.addWidget(fit_label)
+        fit_layout.addWidget(self.fit_mode)
+        fit_layout.addWidget(self.monitor_layout)
+        fit_layout.addStretch()
+
+        # 动画和视频播放设置区域
+        playback_container = QWidget()
+        playback_container.setStyleSheet(rotation_container.styleSheet())
+        playback_layout = QHBoxLayout(playback_container)
+
+        playback_label = QLabel("动画和视频")
+        playback_label.setStyleSheet("font-size: 14px; font-weight: bold;")
+
+        # 帧数多、尺寸大的动画转码为循环视频播放，占用更少的内存和CPU
+        self.transcode_checkbox = QCheckBox("大动画转为视频")
+        self.transcode_checkbox.setStyleSheet("font-size: 14px;")
+        # 视频在空闲时转码为显示器分辨率、限制帧率、去掉音轨的版本，播放时自动选用
+        self.optimize_videos_checkbox = QCheckBox("视频按显示器优化")
+        self.optimize_videos_checkbox.setStyleSheet("font-size: 14px;")
+        # 壁纸被全屏程序或窗口挡住、锁屏、使用电池或 CPU 繁忙时暂停或降低帧率
+        self.playback_policy_checkbox = QCheckBox("看不见或省电时暂停")
+        self.playback_policy_checkbox.setStyleSheet("font-size: 14px;")
+        # 按实测的CPU占用自动跳帧、改用低分辨率版本或停在当前帧，把播放控制在预算内（单核百分比）
+        self.adaptive_quality_checkbox = QCheckBox("限制CPU占用")
+        self.adaptive_quality_checkbox.setStyleSheet("font-size: 14px;")
+        self.cpu_budget = QDoubleSpinBox()
+        self.cpu_budget.setRange(0.5, 100.0)
+        self.cpu_budget.setSingleStep(0.5)
+        self.cpu_budget.setSuffix(" %")
+
+        if self.rotation_scheduler:
+            self.transcode_checkbox.setChecked(bool(rotation_settings.get('transcode_animations')))
+            self.optimize_videos_checkbox.setChecked(bool(rotation_settings.get('optimize_videos')))
+            self.playback_policy_checkbox.setChecked(rotation_settings.get('playback_policy', True))
+            self.adaptive_quality_checkbox.setChecked(bool(rotation_settings.get('adaptive_quality')))
+            self.cpu_budget.setValue(float(rotation_settings.get('cpu_budget', DEFAULT_CPU_BUDGET)))
+        else:
+            playback_container.setEnabled(False)
+        # 每项只保存自己的设置，不影响静态壁纸的渲染
+        self.transcode_checkbox.stateChanged.connect(self.update_transcode_animations)
+        self.optimize_videos_checkbox.stateChanged.connect(self.update_optimize_videos)
+        self.playback_policy_checkbox.stateChanged.connect(self.update_playback_policy)
+        self.adaptive_quality_checkbox.stateChanged.connect(self.update_adaptive_quality)
+        self.cpu_budget.valueChanged.connect(self.update_cpu_budget)
+
+        playback_layout.addWidget(playback_label)
+        playback_layout.addWidget(self.transcode_checkbox)
+        playback_layout.addWidget(self.optimize_videos_checkbox)
+        playback_layout.addWidget(self.playback_policy_checkbox)
+        playback_layout.addWidget(self.adaptive_quality_checkbox)
+        playback_layout.addWidget(self.cpu_budget)
+        playback_layout.addStretch()
         
         # 透明度设置区域
         opacity_container = QWidget()
@@ -198,6 +340,9 @@ class SettingsTab(QWidget):
         
         # 添加所有设置区域到内容布局
         content_layout.addWidget(autostart_container)
+        content_layout.addWidget(rotation_container)
+        content_layout.addWidget(fit_container)
+        content_layout.addWidget(playback_container)
         content_layout.addWidget(opacity_container)
         content_layout.addWidget(bg_container)
         content_layout.addStretch()
@@ -240,6 +385,50 @@ class SettingsTab(QWidget):
             except Exception as e:
                 QMessageBox.warning(self, "警告", f"取消开机自启动失败: {str(e)}")
 
+    def update_rotation(self, *_):
+        """保存自动更换设置并重新调度"""
+        if not self.rotation_scheduler:
+            return
+        manager = self.rotation_scheduler.wallpaper_manager
+        manager.set_setting('auto_change', self.rotation_checkbox.isChecked())
+        manager.set_setting('change_interval', self.rotation_interval.value() * 60)
+        manager.set_setting('rotation_order', self.rotation_order.currentData())
+        self.rotation_scheduler.apply_settings()
+
+    def update_fit_mode(self, *_):
+        """保存填充方式和多显示器布局"""
+        if self.rotation_scheduler:
+            manager = self.rotation_scheduler.wallpaper_manager
+            manager.set_setting('fit_mode', self.fit_mode.currentData())
+            manager.set_setting('monitor_layout', self.monitor_layout.currentData())
+
+    def _save_setting(self, key, value):
+        if self.rotation_scheduler:
+            self.rotation_scheduler.wallpaper_manager.set_setting(key, value)
+
+    def update_transcode_animations(self, *_):
+        self._save_setting('transcode_animations', self.transcode_checkbox.isChecked())
+
+    def update_optimize_videos(self, *_):
+        if not self.rotation_scheduler:
+            return
+        manager = self.rotation_scheduler.wallpaper_manager
+        optimize = self.optimize_videos_checkbox.isChecked()
+        enabled = optimize and not manager.config['settings'].get('optimize_videos')
+        manager.set_setting('optimize_videos', optimize)
+        if enabled:
+            # 刚开启时在后台为已有视频生成转码版本
+            threading.Thread(target=manager.backfill_video_variants, daemon=True).start()
+
+    def update_playback_policy(self, *_):
+        self._save_setting('playback_policy', self.playback_policy_checkbox.isChecked())
+
+    def update_adaptive_quality(self, *_):
+        self._save_setting('adaptive_quality', self.adaptive_quality_checkbox.isChecked())
+
+    def update_cpu_budget(self, value):
+        self._save_setting('cpu_budget', value)
+
     def select_background(self):
         """选择背景图"""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -312,10 +501,34 @@ class WallpaperApp(QMainWindow):
         # 初始化管理器
         self.wallpaper_manager = WallpaperManager()
         self.original_geometry = None
-        self.video_wallpaper = VideoWallpaper()
+        # 所有缩略图和预览共用一个按字节数限制的内存缓存
+        self.cache = CacheManager()
+        # 定期检查系统内存，紧张时缩减缓存
+        self._memory_timer = QTimer(self)
+        self._memory_timer.setInterval(MEMORY_CHECK_INTERVAL)
+        self._memory_timer.timeout.connect(self.check_memory_pressure)
+        self._memory_timer.start()
+        self.video_wallpaper = VideoWallpaper(self.cache)
         
         # 连接壁纸管理器和视频壁纸处理器
         self.wallpaper_manager.set_video_wallpaper_handler(self.video_wallpaper)
+
+        # 自动更换壁纸调度器
+        self.rotation_scheduler = RotationScheduler(self.wallpaper_manager, self.video_wallpaper, self)
+        self.rotation_scheduler.apply_settings()
+
+        # 壁纸看不见或需要省电时暂停、降低帧率或停在当前帧（壁纸窗口自身不算遮挡）
+        self.playback_policy = PlaybackPolicyEngine(
+            self.video_wallpaper,
+            default_provider(lambda: {int(w.winId()) for w in self.video_wallpaper.windows.values()}),
+            parent=self)
+        self.playback_policy.start()
+        # 按实测的CPU占用调节播放质量（设置中开启后生效）
+        self.playback_governor = PlaybackGovernor(self.video_wallpaper, parent=self)
+        self.playback_governor.start()
+
+        # 后台为旧壁纸补全元数据（分辨率、时长等）和感知哈希
+        threading.Thread(target=self.wallpaper_manager.backfill, daemon=True).start()
         
         # 创建主窗口部件和布局
         main_widget = QWidget()
@@ -435,15 +648,18 @@ class WallpaperApp(QMainWindow):
         """)
         
         # 创建各个标签页
-        self.preview_tab = WallpaperPreviewTab(self.wallpaper_manager, self.video_wallpaper)
-        self.manage_tab = WallpaperManageTab(self.wallpaper_manager, self.video_wallpaper)
+        self.preview_tab = WallpaperPreviewTab(self.wallpaper_manager, self.video_wallpaper, self.cache)
+        self.manage_tab = WallpaperManageTab(self.wallpaper_manager, self.video_wallpaper, self.cache)
         self.recommend_tab = self.create_recommend_tab()
-        self.settings_tab = SettingsTab()
+        self.settings_tab = SettingsTab(self.rotation_scheduler)
         self.about_tab = self.create_about_tab()
         
         # 连接壁纸管理和预览页面的信号
         self.manage_tab.wallpaper_changed.connect(self.preview_tab.set_current_file)
         self.manage_tab.wallpaper_changed.connect(self.preview_tab.update_preview)
+        self.rotation_scheduler.switched.connect(
+            lambda path, _latency: self.preview_tab.set_current_file(path)
+        )
         
         # 添加标签页
         self.tabs.addTab(self.preview_tab, "壁纸设置")
@@ -550,6 +766,13 @@ class WallpaperApp(QMainWindow):
     def mouseReleaseEvent(self, event):
         self.drag_position = None
 
+    def check_memory_pressure(self):
+        """系统内存紧张时缩减缓存，并输出缓存统计用于调整上限"""
+        if self.cache.check_pressure():
+            total = self.cache.stats()['total']
+            print(f"Memory pressure: cache shrunk to {total['bytes'] // (1024 * 1024)} MB, "
+                  f"hits={total['hits']} misses={total['misses']} evictions={total['evictions']}")
+
     def update_tab_backgrounds(self):
         """更新所有标签页的背景"""
         settings = QSettings('PlanetBoy', 'Wallpaper')
@@ -625,7 +848,7 @@ class WallpaperApp(QMainWindow):
             QLabel {{
                 background: transparent;
             }}
-            QListWidget {{
+            QListView {{
                 background: rgba(255, 248, 240, {opacity_value * 0.7});
                 border: 1px solid rgba(255, 228, 196, {opacity_value * 0.6});
                 border-radius: 10px;
@@ -948,12 +1171,19 @@ class WallpaperApp(QMainWindow):
         return about_tab
 
 class WallpaperPreviewTab(QWidget):
-    def __init__(self, wallpaper_manager, video_wallpaper):
+    def __init__(self, wallpaper_manager, video_wallpaper, cache=None):
         super().__init__()
         self.wallpaper_manager = wallpaper_manager
         self.video_wallpaper = video_wallpaper
         self.current_file = None
-        self.preview_cache = {}  # 添加预览缓存
+        # 预览金字塔缓存：每张图片只解码一次，任意尺寸从最接近的一层缩放
+        self.cache = cache or CacheManager()
+        self.cache.set_limit(PREVIEW_NAMESPACE, PREVIEW_BUDGET)
+        # 调整大小时先快速缩放，停止调整后再平滑缩放一次
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(150)
+        self._resize_timer.timeout.connect(self.update_preview)
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
         
@@ -984,39 +1214,21 @@ class WallpaperPreviewTab(QWidget):
         select_btn.clicked.connect(self.select_wallpaper)
         layout.addWidget(select_btn, alignment=Qt.AlignmentFlag.AlignCenter)
 
-    def get_cached_preview(self, file_path, target_size):
-        """获取缓存的预览图"""
-        cache_key = f"{file_path}_{target_size[0]}_{target_size[1]}"
-        
-        if cache_key in self.preview_cache:
-            return self.preview_cache[cache_key]
-            
-        try:
-            if self.wallpaper_manager.is_video_file(file_path):
-                return None
-                
-            pixmap = QPixmap(file_path)
-            if pixmap.isNull():
-                return None
-                
-            # 保持宽高比缩放
-            scaled_pixmap = pixmap.scaled(
-                target_size[0], 
-                target_size[1],
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            
-            # 缓存预览图
-            self.preview_cache[cache_key] = scaled_pixmap
-            return scaled_pixmap
-        except Exception as e:
-            print(f"Error generating preview: {e}")
+    def get_cached_preview(self, file_path, target_size, smooth=True):
+        """获取指定尺寸的预览图"""
+        if self.wallpaper_manager.is_video_file(file_path):
             return None
+        pyramid = self.cache.get(PREVIEW_NAMESPACE, file_path)
+        if pyramid is None:
+            pyramid = PreviewPyramid.load(file_path)
+            if pyramid is None:
+                return None
+            self.cache.put(PREVIEW_NAMESPACE, file_path, pyramid)
+        return pyramid.render(max(1, target_size[0]), max(1, target_size[1]), smooth)
 
     def clear_cache(self):
         """清除预览缓存"""
-        self.preview_cache.clear()
+        self.cache.clear(PREVIEW_NAMESPACE)
 
     def select_wallpaper(self):
         """选择壁纸"""
@@ -1033,18 +1245,19 @@ class WallpaperPreviewTab(QWidget):
             self,
             "选择壁纸",
             "",
-            "图片/视频文件 (*.jpg *.jpeg *.png *.gif *.mp4)"
+            "图片/视频文件 (*.jpg *.jpeg *.png *.gif *.webp *.mp4 *.mkv *.webm)"
         )
         
         if file_path:
             self.current_file = file_path
-            if file_path.lower().endswith('.mp4'):
-                self.video_wallpaper.set_wallpaper(file_path)
+            if self.wallpaper_manager.is_video_file(file_path):
+                if self.video_wallpaper.set_wallpaper(file_path):
+                    self.wallpaper_manager.mark_current(file_path)
             else:
                 self.wallpaper_manager.set_wallpaper(file_path)
             self.update_preview()
 
-    def update_preview(self):
+    def update_preview(self, smooth=True):
         """更新预览"""
         if not self.current_file:
             self.preview_area.setText("未选择壁纸")
@@ -1056,7 +1269,7 @@ class WallpaperPreviewTab(QWidget):
             target_size = (preview_size.width() - 40, preview_size.height() - 40)
             
             # 获取缓存的预览图
-            pixmap = self.get_cached_preview(self.current_file, target_size)
+            pixmap = self.get_cached_preview(self.current_file, target_size, smooth)
             
             if pixmap:
                 self.preview_area.setPixmap(pixmap)
@@ -1072,9 +1285,9 @@ class WallpaperPreviewTab(QWidget):
     def resizeEvent(self, event):
         """处理窗口大小改变事件"""
         super().resizeEvent(event)
-        # 当窗口大小改变时，清除缓存并更新预览
-        self.clear_cache()
-        self.update_preview()  # 更新预览以适应新的尺寸
+        # 拖动过程中从缓存的金字塔快速缩放，停下后再平滑缩放
+        self.update_preview(smooth=False)
+        self._resize_timer.start()
 
     def set_current_file(self, file_path):
         """设置当前文件并更新预览"""
@@ -1084,7 +1297,7 @@ class WallpaperPreviewTab(QWidget):
 class WallpaperManageTab(QWidget):
     wallpaper_changed = pyqtSignal(str)  # 添加信号
 
-    def __init__(self, wallpaper_manager, video_wallpaper):
+    def __init__(self, wallpaper_manager, video_wallpaper, cache=None):
         super().__init__()
         self.wallpaper_manager = wallpaper_manager
         self.video_wallpaper = video_wallpaper
@@ -1094,53 +1307,78 @@ class WallpaperManageTab(QWidget):
         # 创建默认图标
         self.create_default_icons()
         
-        # 壁纸列表
-        self.wallpaper_list = QListWidget()
-        self.wallpaper_list.setViewMode(QListWidget.ViewMode.IconMode)
-        self.wallpaper_list.setIconSize(QSize(200, 120))
-        self.wallpaper_list.setSpacing(20)
-        self.wallpaper_list.setMovement(QListWidget.Movement.Static)
-        self.wallpaper_list.setResizeMode(QListWidget.ResizeMode.Adjust)
+        # 壁纸列表：模型只按需读取可见的行，缩略图在后台生成，可见的条目优先
+        self.thumbnail_service = ThumbnailService(self.wallpaper_manager, self)
+        self.wallpaper_model = WallpaperListModel(self.wallpaper_manager, self.thumbnail_service, {
+            'loading': self.loading_icon,
+            'video': QPixmap(DEFAULT_VIDEO_ICON),
+            'gif': QPixmap(DEFAULT_GIF_ICON),
+        }, cache, self)
+        self.wallpaper_list = QListView()
+        self.wallpaper_list.setViewMode(QListView.ViewMode.IconMode)
+        self.wallpaper_list.setUniformItemSizes(True)
+        self.wallpaper_list.setSpacing(10)
+        self.wallpaper_list.setMovement(QListView.Movement.Static)
+        self.wallpaper_list.setResizeMode(QListView.ResizeMode.Adjust)
+        self.wallpaper_list.setMouseTracking(True)
+        self.wallpaper_list.setItemDelegate(WallpaperItemDelegate(self.wallpaper_list))
+        self.wallpaper_list.setModel(self.wallpaper_model)
         self.wallpaper_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 background: rgba(255, 248, 240, 0.7);
                 padding: 20px;
                 border-radius: 15px;
             }
-            QListWidget::item {
-                background: rgba(255, 248, 240, 0.8);
-                color: #664433;
-                border-radius: 10px;
-                padding: 10px;
-                margin: 5px;
-                min-width: 220px;
-                min-height: 180px;
-            }
-            QListWidget::item:selected {
-                background: rgba(255, 228, 196, 0.9);
-                border: 2px solid rgba(255, 218, 176, 1);
-            }
-            QListWidget::item:hover {
-                background: rgba(255, 238, 216, 0.9);
-                border: 2px solid rgba(255, 228, 196, 1);
-            }
         """)
-        self.wallpaper_list.itemDoubleClicked.connect(self.apply_wallpaper)
+        self.wallpaper_list.doubleClicked.connect(self.apply_wallpaper)
         layout.addWidget(self.wallpaper_list)
+
+        # 滚动、调整大小或列表刷新后稍等片刻再计算可见的行
+        self._visible_timer = QTimer(self)
+        self._visible_timer.setSingleShot(True)
+        self._visible_timer.setInterval(50)
+        self._visible_timer.timeout.connect(self.request_visible_thumbnails)
+        scroll_bar = self.wallpaper_list.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self._visible_timer.start)
+        scroll_bar.rangeChanged.connect(self._visible_timer.start)
+        self.wallpaper_model.modelReset.connect(self._visible_timer.start)
         
         # 按钮区域
         btn_layout = QHBoxLayout()
         btn_layout.setSpacing(20)
         
         add_btn = QPushButton("添加壁纸")
+        add_folder_btn = QPushButton("导入文件夹")
         delete_btn = QPushButton("删除壁纸")
         
         add_btn.clicked.connect(self.add_wallpaper)
+        add_folder_btn.clicked.connect(self.add_folder)
         delete_btn.clicked.connect(self.delete_wallpaper)
         
         btn_layout.addWidget(add_btn)
+        btn_layout.addWidget(add_folder_btn)
         btn_layout.addWidget(delete_btn)
         layout.addLayout(btn_layout)
+
+        # 导入进度区域（导入时显示）
+        self.import_service = ImportService(self.wallpaper_manager, self)
+        self.import_service.batch_progress.connect(self.on_import_progress)
+        self.import_service.batch_finished.connect(self.on_import_finished)
+
+        self.import_panel = QWidget()
+        import_layout = QHBoxLayout(self.import_panel)
+        import_layout.setContentsMargins(0, 10, 0, 0)
+        self.import_progress = QProgressBar()
+        self.import_progress.setTextVisible(False)
+        self.import_label = QLabel()
+        self.import_label.setStyleSheet("color: #664433;")
+        cancel_btn = QPushButton("取消导入")
+        cancel_btn.clicked.connect(self.import_service.cancel)
+        import_layout.addWidget(self.import_progress, 1)
+        import_layout.addWidget(self.import_label)
+        import_layout.addWidget(cancel_btn)
+        self.import_panel.hide()
+        layout.addWidget(self.import_panel)
         
         # 更新列表
         self.update_wallpaper_list()
@@ -1165,46 +1403,34 @@ class WallpaperManageTab(QWidget):
             painter.end()
             gif_icon.save(DEFAULT_GIF_ICON)
 
+        # 缩略图生成前的占位图
+        self.loading_icon = QPixmap(200, 120)
+        self.loading_icon.fill(QColor(255, 238, 216))
+        painter = QPainter(self.loading_icon)
+        painter.drawText(self.loading_icon.rect(), Qt.AlignmentFlag.AlignCenter, "加载中...")
+        painter.end()
+
     def update_wallpaper_list(self):
         """更新壁纸列表"""
-        self.wallpaper_list.clear()
-        wallpapers = self.wallpaper_manager.get_wallpapers()
-        
-        for wallpaper in wallpapers:
-            item = QListWidgetItem()
-            wallpaper_path = wallpaper['path'] if isinstance(wallpaper, dict) else wallpaper
-            name = os.path.basename(wallpaper_path)
-            
-            # 创建预览图
-            if wallpaper_path.lower().endswith('.mp4'):
-                # 对于视频文件，获取第一帧作为预览
-                pixmap = self.video_wallpaper.get_cached_thumbnail(wallpaper_path, (250, 120))
-                if pixmap:
-                    item.setIcon(QIcon(pixmap))
-                else:
-                    # 如果无法获取视频缩略图，使用默认图标
-                    item.setIcon(QIcon(DEFAULT_VIDEO_ICON))
-                item.setText(f"{name}\n[视频]")
-            elif wallpaper_path.lower().endswith('.gif'):
-                # 对于GIF，使用特殊图标
-                if os.path.exists(DEFAULT_GIF_ICON):
-                    item.setIcon(QIcon(DEFAULT_GIF_ICON))
-                item.setText(f"{name}\n[GIF]")
+        self.wallpaper_model.reload()
+
+    def _first_row_below(self, y: int) -> int:
+        """第一个底边在 y 之下的行（行按从上到下的顺序排列，二分查找）"""
+        low, high = 0, self.wallpaper_model.rowCount()
+        while low < high:
+            mid = (low + high) // 2
+            if self.wallpaper_list.visualRect(self.wallpaper_model.index(mid)).bottom() < y:
+                low = mid + 1
             else:
-                # 对于图片，创建缩略图
-                try:
-                    pixmap = QPixmap(wallpaper_path)
-                    scaled_pixmap = pixmap.scaled(250, 120, Qt.AspectRatioMode.KeepAspectRatio, 
-                                                Qt.TransformationMode.SmoothTransformation)
-                    item.setIcon(QIcon(scaled_pixmap))
-                    item.setText(name)
-                except Exception as e:
-                    print(f"Error creating thumbnail for {wallpaper_path}: {e}")
-                    item.setText(name)
-            
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignBottom)
-            item.setData(Qt.ItemDataRole.UserRole, wallpaper_path)
-            self.wallpaper_list.addItem(item)
+                high = mid
+        return low
+
+    def request_visible_thumbnails(self):
+        """为可见的行请求缩略图，其后是下一屏的行；其余请求取消"""
+        height = self.wallpaper_list.viewport().height()
+        first = self._first_row_below(0)
+        last = self._first_row_below(height * 2)
+        self.wallpaper_model.request_thumbnails(range(first, min(last + 1, self.wallpaper_model.rowCount())))
 
     def add_wallpaper(self):
         """添加新壁纸"""
@@ -1221,42 +1447,82 @@ class WallpaperManageTab(QWidget):
             self,
             "选择壁纸",
             "",
-            "图片/视频文件 (*.jpg *.jpeg *.png *.gif *.mp4)"
+            "图片/视频文件 (*.jpg *.jpeg *.png *.gif *.webp *.mp4 *.mkv *.webm)"
         )
         
         if files:
-            for file in files:
-                self.wallpaper_manager.add_wallpaper(file)
-            self.update_wallpaper_list()
+            # 在后台线程池中复制，界面保持响应
+            if self.import_service.import_files(files):
+                self.import_progress.setValue(0)
+                self.import_label.setText("正在导入...")
+                self.import_panel.show()
+            else:
+                QMessageBox.information(self, "提示", "正在导入壁纸，请稍后再试")
+
+    def add_folder(self):
+        """导入整个文件夹（包括子文件夹）中的壁纸"""
+        folder = QFileDialog.getExistingDirectory(self, "选择壁纸文件夹")
+        if folder:
+            # 扫描在后台线程中边遍历边导入
+            if self.import_service.import_folder(folder):
+                self.import_progress.setValue(0)
+                self.import_label.setText("正在扫描...")
+                self.import_panel.show()
+            else:
+                QMessageBox.information(self, "提示", "正在导入壁纸，请稍后再试")
+
+    def on_import_progress(self, files_done, files_total, bytes_done, bytes_total, rate):
+        """更新导入进度"""
+        if bytes_total > 0:
+            self.import_progress.setRange(0, 1000)
+            self.import_progress.setValue(int(bytes_done * 1000 / bytes_total))
+        else:
+            # 总量未知时显示忙碌状态
+            self.import_progress.setRange(0, 0)
+        total_text = f"/{files_total}" if files_total >= 0 else ""
+        self.import_label.setText(f"{files_done}{total_text} 个文件  {rate / 1024 / 1024:.1f} MB/s")
+
+    def on_import_finished(self, imported, failed, cancelled):
+        """导入结束（新壁纸已通过新增事件逐步插入列表）"""
+        self.import_panel.hide()
+        if cancelled:
+            QMessageBox.information(self, "提示", f"导入已取消，已导入 {imported} 个壁纸")
+        elif failed:
+            QMessageBox.warning(self, "警告", f"已导入 {imported} 个壁纸，{failed} 个导入失败")
 
     def delete_wallpaper(self):
         """删除选中的壁纸"""
-        current_item = self.wallpaper_list.currentItem()
-        if current_item:
-            wallpaper_path = current_item.data(Qt.ItemDataRole.UserRole)
+        current = self.wallpaper_list.currentIndex()
+        if current.isValid():
+            wallpaper_path = current.data(PathRole)
+            name = current.data(NameRole) or os.path.basename(wallpaper_path)
             reply = QMessageBox.question(
                 self,
                 "确认删除",
-                f"确定要删除壁纸 {os.path.basename(wallpaper_path)} 吗？",
+                f"确定要删除壁纸 {name} 吗？",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
+                # 列表通过删除事件只移除这一行
                 self.wallpaper_manager.remove_wallpaper(wallpaper_path)
-                self.update_wallpaper_list()
 
-    def apply_wallpaper(self, item):
+    def apply_wallpaper(self, index):
         """应用选中的壁纸"""
-        wallpaper_path = item.data(Qt.ItemDataRole.UserRole)
-        if wallpaper_path.lower().endswith('.mp4'):
-            self.video_wallpaper.set_wallpaper(wallpaper_path)
+        wallpaper_path = index.data(PathRole)
+        if self.wallpaper_manager.is_video_file(wallpaper_path):
+            # 视频由视频壁纸处理器显示，当前壁纸和最近使用时间在这里记录
+            if self.video_wallpaper.set_wallpaper(wallpaper_path):
+                self.wallpaper_manager.mark_current(wallpaper_path)
         else:
             self.wallpaper_manager.set_wallpaper(wallpaper_path)
         # 发送信号
         self.wallpaper_changed.emit(wallpaper_path)
 
 if __name__ == '__main__':
+    # 打包后使用进程池需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     # 设置应用程序图标
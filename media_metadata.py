@@ -0,0 +1,166 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from media_scanner import VIDEO_EXTENSIONS
+
+# 元数据字段，与数据库列一一对应
+METADATA_FIELDS = ('width', 'height', 'aspect', 'duration', 'fps', 'codec')
+# 默认进程数
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def _gif_duration(f) -> Optional[float]:
+    """遍历 GIF 的数据块，累加每帧图形控制扩展中的延迟（单位 1/100 秒），不解码 LZW 数据"""
+    header = f.read(13)
+    if len(header) < 13 or header[:3] != b'GIF':
+        return None
+    if header[10] & 0x80:
+        f.seek(3 * (2 << (header[10] & 0x07)), 1)  # 全局颜色表
+    total, delay = 0, 0
+
+    def skip_sub_blocks():
+        while True:
+            size = f.read(1)
+            if not size or size[0] == 0:
+                return
+            f.seek(size[0], 1)
+
+    while True:
+        block = f.read(1)
+        if not block or block == b'\x3b':  # 文件结尾
+            break
+        if block == b'\x21':  # 扩展块
+            label = f.read(1)
+            if label == b'\xf9':
+                data = f.read(6)  # 块长度、标志、延迟、透明色索引、结束符
+                if len(data) < 6:
+                    break
+                delay = int.from_bytes(data[2:4], 'little')
+            else:
+                skip_sub_blocks()
+        elif block == b'\x2c':  # 图像描述符
+            descriptor = f.read(9)
+            if len(descriptor) < 9:
+                break
+            if descriptor[8] & 0x80:
+                f.seek(3 * (2 << (descriptor[8] & 0x07)), 1)  # 局部颜色表
+            f.seek(1, 1)  # LZW 最小码长
+            skip_sub_blocks()
+            total += delay
+            delay = 0
+        else:
+            break
+    return total / 100.0
+
+
+def _png_duration(f) -> Optional[float]:
+    """累加 APNG 每个 fcTL 块的帧延迟（delay_num / delay_den 秒）"""
+    if f.read(8) != b'\x89PNG\r\n\x1a\n':
+        return None
+    total = 0.0
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        length, kind = int.from_bytes(head[:4], 'big'), head[4:]
+        if kind == b'fcTL':
+            data = f.read(length)
+            num, den = int.from_bytes(data[20:22], 'big'), int.from_bytes(data[22:24], 'big')
+            total += num / (den or 100)
+            f.seek(4, 1)  # CRC
+        elif kind == b'IEND':
+            break
+        else:
+            f.seek(length + 4, 1)
+    return total
+
+
+def _webp_duration(f) -> Optional[float]:
+    """累加动态 WebP 每个 ANMF 块的帧时长（毫秒）"""
+    header = f.read(12)
+    if header[:4] != b'RIFF' or header[8:12] != b'WEBP':
+        return None
+    total = 0
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        length = int.from_bytes(head[4:], 'little')
+        if head[:4] == b'ANMF':
+            data = f.read(16)
+            total += int.from_bytes(data[12:15], 'little')
+            f.seek(length - 16 + (length & 1), 1)
+        else:
+            f.seek(length + (length & 1), 1)
+    return total / 1000.0
+
+
+_DURATION_READERS = {'GIF': _gif_duration, 'PNG': _png_duration, 'WEBP': _webp_duration}
+
+
+def _image_metadata(path: str) -> Dict:
+    """Pillow 打开图片只解析文件头，不解码像素"""
+    from PIL import Image
+    with Image.open(path) as img:
+        width, height = img.size
+        codec = img.format
+        animated = getattr(img, 'is_animated', False)
+    duration = None
+    reader = _DURATION_READERS.get(codec)
+    if animated and reader:
+        # 动图的总时长直接从各帧的块头读取（Pillow 的 seek 会解码并合成之前的每一帧）
+        with open(path, 'rb') as f:
+            duration = reader(f)
+    return {'width': width, 'height': height, 'duration': duration, 'fps': None, 'codec': codec}
+
+
+def _video_metadata(path: str) -> Dict:
+    """通过 OpenCV 探测容器参数，不解码视频帧"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or None
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    finally:
+        cap.release()
+    codec = ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\0 ') or None
+    duration = frames / fps if fps and frames > 0 else None
+    return {'width': width, 'height': height, 'duration': duration, 'fps': fps, 'codec': codec}
+
+
+def extract_metadata(path: str) -> Optional[Dict]:
+    """读取单个文件的元数据，失败时返回 None"""
+    try:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            meta = _video_metadata(path)
+        else:
+            meta = _image_metadata(path)
+        width, height = meta['width'], meta['height']
+        meta['aspect'] = round(width / height, 4) if width and height else None
+        return meta
+    except Exception as e:
+        print(f"Error extracting metadata for {path}: {e}")
+        return None
+
+
+def _extract_one(path: str) -> Tuple[str, Optional[Dict]]:
+    return path, extract_metadata(path)
+
+
+def extract_many(paths: Iterable[str], max_workers: int = DEFAULT_WORKERS) -> Iterator[Tuple[str, Optional[Dict]]]:
+    """在进程池中并行提取元数据，按输入顺序逐个返回 (路径, 元数据)"""
+    paths = list(paths)
+    if not paths:
+        return
+    if len(paths) == 1 or max_workers <= 1:
+        # 单个文件不值得启动进程池
+        for path in paths:
+            yield _extract_one(path)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        yield from pool.map(_extract_one, paths, chunksize=16)
@@ -0,0 +1,89 @@
+import os
+from typing import Iterator, Optional, Tuple
+
+# 读取文件头的字节数，足够识别下列所有格式
+SNIFF_SIZE = 64
+
+# 媒体类型 -> 规范扩展名
+IMAGE_TYPES = {'jpeg': '.jpg', 'png': '.png', 'gif': '.gif', 'webp': '.webp'}
+VIDEO_TYPES = {'mp4': '.mp4', 'mkv': '.mkv', 'webm': '.webm'}
+# 按扩展名视为视频的文件（各模块都从这里导入，不要另外定义）
+VIDEO_EXTENSIONS = ('.mp4', '.m4v', '.mov', '.mkv', '.webm')
+MEDIA_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', *VIDEO_EXTENSIONS}
+
+
+def sniff_media_type(path: str) -> Optional[str]:
+    """根据文件头判断媒体类型，无法识别时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_SIZE)
+    except OSError:
+        return None
+    return sniff_bytes(head)
+
+
+def sniff_bytes(head: bytes) -> Optional[str]:
+    """根据文件头字节判断媒体类型"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp':
+        # ISO BMFF：排除 HEIC/AVIF 等图片品牌
+        brand = head[8:12]
+        if brand in (b'heic', b'heix', b'mif1', b'msf1', b'avif', b'avis'):
+            return None
+        return 'mp4'
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        # EBML 头中的 DocType 区分 Matroska 和 WebM
+        return 'webm' if b'webm' in head else 'mkv'
+    return None
+
+
+def extension_for(media_type: Optional[str]) -> Optional[str]:
+    """媒体类型对应的规范扩展名"""
+    if media_type is None:
+        return None
+    return IMAGE_TYPES.get(media_type) or VIDEO_TYPES.get(media_type)
+
+
+def is_video_type(media_type: Optional[str]) -> bool:
+    return media_type in VIDEO_TYPES
+
+
+def scan_media(root: str, sniff_all: bool = False) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """流式遍历目录树，逐个产生 (路径, 媒体类型, 文件状态)
+
+    使用显式栈和 os.scandir，不预先构建完整文件列表，内存只与目录深度和单个目录大小有关。
+    默认只嗅探常见媒体扩展名的文件，sniff_all 为 True 时嗅探所有文件。
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # 跳过隐藏目录（如 .git、程序自身的库目录）
+                        if not entry.name.startswith('.'):
+                            stack.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if not sniff_all:
+                        ext = os.path.splitext(entry.name)[1].lower()
+                        if ext not in MEDIA_EXTENSIONS:
+                            continue
+                    media_type = sniff_media_type(entry.path)
+                    if media_type is not None:
+                        yield entry.path, media_type, entry.stat()
+                except OSError:
+                    continue
@@ -0,0 +1,202 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from media_scanner import VIDEO_EXTENSIONS
+
+# pHash 使用的缩放尺寸和保留的低频系数
+PHASH_SIZE = 32
+PHASH_LOW = 8
+# 视频采样位置（占时长比例）
+VIDEO_SAMPLES = (0.2, 0.5, 0.8)
+# 默认判定为近似重复的汉明距离
+DEFAULT_RADIUS = 6
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """正交 DCT-II 变换矩阵，二维 DCT 即 D @ X @ D.T"""
+    k = np.arange(n).reshape(-1, 1)
+    i = np.arange(n).reshape(1, -1)
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """64 个布尔位打包为整数（高位在前）"""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def phash(gray: np.ndarray) -> int:
+    """感知哈希：输入 32x32 灰度图，对 DCT 低频系数按中位数二值化"""
+    gray = np.asarray(gray, dtype=np.float64)
+    coeffs = (_DCT @ gray @ _DCT.T)[:PHASH_LOW, :PHASH_LOW]
+    # 忽略直流分量计算中位数
+    median = np.median(coeffs.ravel()[1:])
+    return _bits_to_int(coeffs > median)
+
+
+def image_phash(path: str) -> int:
+    """计算图片的感知哈希；JPEG 使用 draft 模式，只解码缩小后的图像"""
+    from PIL import Image
+    with Image.open(path) as img:
+        img.draft('L', (PHASH_SIZE * 2, PHASH_SIZE * 2))
+        small = img.convert('L').resize((PHASH_SIZE, PHASH_SIZE), Image.BILINEAR)
+        return phash(np.asarray(small))
+
+
+def video_phashes(path: str, samples: Iterable[float] = VIDEO_SAMPLES) -> List[int]:
+    """在视频的几个位置采样关键帧并分别计算感知哈希"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    hashes = []
+    try:
+        if not cap.isOpened():
+            return hashes
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        for position in samples:
+            if frames > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int(frames * position))
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            small = cv2.resize(gray, (PHASH_SIZE, PHASH_SIZE), interpolation=cv2.INTER_AREA)
+            hashes.append(phash(small))
+    finally:
+        cap.release()
+    return hashes
+
+
+def compute_hashes(path: str) -> Tuple[str, Optional[List[int]]]:
+    """计算单个文件的感知哈希列表（图片一个，视频每个采样帧一个），失败时返回 None"""
+    try:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            return path, video_phashes(path)
+        return path, [image_phash(path)]
+    except Exception as e:
+        print(f"Error computing perceptual hash for {path}: {e}")
+        return path, None
+
+
+def compute_many(paths: Iterable[str], max_workers: int = DEFAULT_WORKERS) -> Iterator[Tuple[str, Optional[List[int]]]]:
+    """在进程池中并行计算感知哈希，按输入顺序返回"""
+    paths = list(paths)
+    if not paths:
+        return
+    if len(paths) == 1 or max_workers <= 1:
+        for path in paths:
+            yield compute_hashes(path)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        yield from pool.map(compute_hashes, paths, chunksize=16)
+
+
+# Python 3.10+ 提供 int.bit_count，旧版本退回到字符串计数
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+def hamming(a: int, b: int) -> int:
+    return _popcount(a ^ b)
+
+
+def to_signed(value: int) -> int:
+    """64 位无符号整数转为 SQLite 可存储的有符号整数"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class MultiIndexHash:
+    """多索引哈希：把 64 位哈希切成若干段分别建索引
+
+    根据抽屉原理，距离不超过 r 的两个哈希至少有一段的距离不超过 r // 段数，
+    因此只需在每段中枚举很少的邻居，查询复杂度与库大小无关。
+    """
+
+    def __init__(self, chunks: int = 4, bits: int = 64):
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self.mask = (1 << self.chunk_bits) - 1
+        self.tables: List[Dict[int, List[Tuple[int, Hashable]]]] = [{} for _ in range(chunks)]
+        self._mask_cache: Dict[int, List[int]] = {}
+        self.size = 0
+
+    def _split(self, value: int) -> List[int]:
+        return [(value >> (i * self.chunk_bits)) & self.mask for i in range(self.chunks)]
+
+    def add(self, value: int, key: Hashable):
+        for table, part in zip(self.tables, self._split(value)):
+            table.setdefault(part, []).append((value, key))
+        self.size += 1
+
+    def _flip_masks(self, radius: int) -> List[int]:
+        """段内翻转不超过 radius 位的所有异或掩码（按半径缓存）"""
+        masks = self._mask_cache.get(radius)
+        if masks is None:
+            masks = [0]
+            frontier = [(0, -1)]
+            for _ in range(radius):
+                next_frontier = []
+                for value, last_bit in frontier:
+                    for bit in range(last_bit + 1, self.chunk_bits):
+                        flipped = value | (1 << bit)
+                        next_frontier.append((flipped, bit))
+                        masks.append(flipped)
+                frontier = next_frontier
+            self._mask_cache[radius] = masks
+        return masks
+
+    def query(self, value: int, radius: int = DEFAULT_RADIUS) -> List[Tuple[Hashable, int]]:
+        """返回距离不超过 radius 的 (键, 距离)，同一个键只返回最小距离"""
+        masks = self._flip_masks(radius // self.chunks)
+        results: Dict[Hashable, int] = {}
+        for table, part in zip(self.tables, self._split(value)):
+            for mask in masks:
+                bucket = table.get(part ^ mask)
+                if not bucket:
+                    continue
+                for candidate, key in bucket:
+                    distance = _popcount(value ^ candidate)
+                    if distance <= radius and distance < results.get(key, radius + 1):
+                        results[key] = distance
+        return list(results.items())
+
+
+def find_groups(items: Iterable[Tuple[Hashable, int]], radius: int = DEFAULT_RADIUS) -> List[List[Hashable]]:
+    """把 (键, 哈希) 按近似关系聚成组（并查集），只返回包含多个键的组"""
+    items = list(items)
+    index = MultiIndexHash()
+    for key, value in items:
+        index.add(value, key)
+
+    parent: Dict[Hashable, Hashable] = {}
+
+    def find(key):
+        root = key
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(key, key) != root:
+            parent[key], key = root, parent[key]
+        return root
+
+    for key, value in items:
+        for other, _distance in index.query(value, radius):
+            a, b = find(key), find(other)
+            if a != b:
+                parent[b] = a
+
+    groups: Dict[Hashable, List[Hashable]] = {}
+    seen = set()
+    for key, _value in items:
+        if key in seen:
+            continue
+        seen.add(key)
+        groups.setdefault(find(key), []).append(key)
+    return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,245 @@
+import os
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from playback_policy import FROZEN_STATES, PLAY, SLOW, STILL, THROTTLE
+
+# 质量档位，从高到低：正常播放、跳帧、低分辨率转码版本（同时跳帧）、只解码关键帧、停在当前帧
+# 跳帧：解码器只解码参考帧，窗口最多每秒绘制 THROTTLE_FPS 帧
+# 只解码关键帧：帧率降到关键帧间隔，窗口最多每秒绘制 SLOW_FPS 帧；有低分辨率版本时也使用
+TIERS = ('full', 'skip', 'reduced', 'keyframes', 'still')
+# 每个档位对应的播放状态（与播放策略的状态合并，取更省的一个）
+TIER_STATES = {'full': PLAY, 'skip': THROTTLE, 'reduced': THROTTLE, 'keyframes': SLOW, 'still': STILL}
+# 每个档位的 VLC 跳帧级别（avcodec-skip-frame：1 跳过非参考帧，3 跳过非关键帧）
+SKIP_LEVELS = {'full': 0, 'skip': 1, 'reduced': 1, 'keyframes': 3}
+# 使用低分辨率版本的档位
+REDUCED_TIERS = ('reduced', 'keyframes')
+
+# 默认 CPU 预算：单个核心的百分比
+DEFAULT_CPU_BUDGET = 3.0
+# 采样间隔（毫秒）和参与判断的采样数（档位变化后重新积累）
+SAMPLE_INTERVAL = 2000
+WINDOW_SAMPLES = 5
+# 丢帧比例超过这个值说明解码跟不上，也要降档
+DROP_LIMIT = 0.05
+# CPU 低于预算的这个比例才升档
+HEADROOM = 0.7
+# 升档后又超出预算时，再次尝试升档前等待的时间（秒），每次失败翻倍
+PROBE_BACKOFF = 60
+MAX_PROBE_BACKOFF = 15 * 60
+
+
+class BackgroundCpu:
+    """本进程内不属于壁纸播放的工作（导入、缩略图、元数据补全、转码、预渲染）用掉的 CPU 时间
+
+    这些工作用 background_job 标记，结束时按所在线程的 CPU 时间累加（嵌套时只算最外层）。
+    采样器从进程 CPU 时间中减去这部分；还有工作在进行时其用量未知，调节器不做判断。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.total = 0.0
+        self.running = 0
+
+    @contextmanager
+    def track(self):
+        if getattr(self._local, 'active', False):
+            yield
+            return
+        self._local.active = True
+        with self._lock:
+            self.running += 1
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            used = time.thread_time() - start
+            self._local.active = False
+            with self._lock:
+                self.running -= 1
+                self.total += used
+
+
+background_cpu = BackgroundCpu()
+
+
+def background_job(func):
+    """把函数用掉的 CPU 时间计为后台工作，不算在壁纸播放上"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with background_cpu.track():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ProcessSampler:
+    """采样壁纸播放的 CPU 占用（VLC 在进程内解码）和 VLC 的解码、丢帧统计
+
+    播放开销为进程 CPU 时间减去 background_job 标记的后台工作。
+    """
+
+    def __init__(self, video_wallpaper, background: BackgroundCpu = background_cpu):
+        self.video_wallpaper = video_wallpaper
+        self.background = background
+        self._last = None
+
+    def sample(self) -> Optional[Dict]:
+        now, cpu = time.monotonic(), time.process_time() - self.background.total
+        stats = self.video_wallpaper.decode_stats()
+        last, self._last = self._last, (now, cpu, stats)
+        if last is None or now <= last[0]:
+            return None
+        decoded = stats['decoded'] - last[2]['decoded']
+        dropped = stats['dropped'] - last[2]['dropped']
+        if decoded < 0 or dropped < 0:
+            # 切换了视频，统计从零开始
+            decoded, dropped = stats['decoded'], stats['dropped']
+        # 跨越采样间隔的后台工作在结束时才扣除，可能使差值为负
+        cpu_used = max(0.0, cpu - last[1])
+        return {
+            'cpu': cpu_used * 100 / (now - last[0]),
+            'decoded': decoded,
+            'dropped': dropped,
+            'ms_per_frame': cpu_used * 1000 / decoded if decoded else None,
+        }
+
+
+class PlaybackGovernor(QObject):
+    """按实测的 CPU 占用在质量档位间切换，把壁纸播放控制在 CPU 预算内
+
+    最近若干次采样的平均 CPU 超出预算或丢帧过多时降一档；低于预算并留有余量时升一档。
+    记住每个档位上次的实测开销，已知会超预算的档位按退避时间再尝试，避免来回切换。
+    每次切换都输出触发它的指标。设置项 adaptive_quality 开启时生效，预算为 cpu_budget。
+    """
+
+    # 新的档位名称
+    tier_changed = pyqtSignal(str)
+
+    def __init__(self, video_wallpaper, sampler=None, interval: int = SAMPLE_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.video_wallpaper = video_wallpaper
+        self.sampler = sampler or ProcessSampler(video_wallpaper)
+        self.tier = 0
+        self._samples = deque(maxlen=WINDOW_SAMPLES)
+        # 档位 -> 上次在该档位测得的平均 CPU
+        self._tier_cost: Dict[int, float] = {}
+        self._probe_at = 0.0
+        self._backoff = PROBE_BACKOFF
+        self._probing = False
+        self._transcoding = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.poll)
+
+    @property
+    def budget(self) -> float:
+        return float(self.video_wallpaper.settings.get('cpu_budget', DEFAULT_CPU_BUDGET))
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _active(self) -> bool:
+        """正在播放视频或动画、没有被播放策略全部停住，且没有后台工作在进行时才采样"""
+        vw = self.video_wallpaper
+        if background_cpu.running or not (vw.players or vw.animation):
+            return False
+        handles = [monitor['handle'] for monitor in vw.monitors]
+        return not all(vw.playback_states.get(handle, PLAY) in FROZEN_STATES for handle in handles)
+
+    def poll(self) -> Optional[str]:
+        if not self.video_wallpaper.settings.get('adaptive_quality'):
+            if self.tier:
+                self._set_tier(0, "adaptive quality disabled")
+            self._samples.clear()
+            return None
+        metrics = self.sampler.sample()
+        if metrics is None or not self._active():
+            self._samples.clear()
+            return None
+        self._samples.append(metrics)
+        if len(self._samples) < self._samples.maxlen:
+            return None
+        return self.decide(time.monotonic())
+
+    def decide(self, now: float) -> Optional[str]:
+        """根据窗口内的采样决定是否换档，返回新的档位名称"""
+        cpu = sum(m['cpu'] for m in self._samples) / len(self._samples)
+        decoded = sum(m['decoded'] for m in self._samples)
+        dropped = sum(m['dropped'] for m in self._samples)
+        costs = [m['ms_per_frame'] for m in self._samples if m['ms_per_frame'] is not None]
+        ms = sum(costs) / len(costs) if costs else None
+        metrics = (f"cpu {cpu:.1f}% budget {self.budget:g}%, "
+                   f"{'%.2f ms/frame' % ms if ms is not None else 'no frames'}, "
+                   f"dropped {dropped}/{decoded + dropped}")
+        self._tier_cost[self.tier] = cpu
+
+        over = cpu > self.budget
+        dropping = decoded + dropped > 0 and dropped / (decoded + dropped) > DROP_LIMIT
+        if (over or dropping) and self.tier < len(TIERS) - 1:
+            if self._probing:
+                # 刚升上来的档位撑不住，下次尝试前等待更久
+                self._backoff = min(self._backoff * 2, MAX_PROBE_BACKOFF)
+            self._probe_at = now + self._backoff
+            self._probing = False
+            reason = "over budget" if over else "dropping frames"
+            return self._set_tier(self._next_tier(self.tier, 1), f"{reason}: {metrics}")
+
+        if not over and not dropping:
+            if self._probing:
+                # 升档后稳定在预算内；再往上已知超预算的档位仍要等一段时间才尝试
+                self._probing = False
+                self._backoff = PROBE_BACKOFF
+                self._probe_at = now + self._backoff
+            if self.tier and cpu <= self.budget * HEADROOM:
+                higher = self._next_tier(self.tier, -1)
+                known = self._tier_cost.get(higher)
+                if known is None or known <= self.budget * HEADROOM or now >= self._probe_at:
+                    self._probing = True
+                    return self._set_tier(higher, f"headroom: {metrics}")
+        return None
+
+    def _next_tier(self, tier: int, step: int) -> int:
+        """相邻档位；动画没有低分辨率版本，播放视频时低分辨率版本还没生成也跳过该档"""
+        tier += step
+        if TIERS[tier] == 'reduced' and not self._reduced_available():
+            tier += step
+        return max(0, min(len(TIERS) - 1, tier))
+
+    def _reduced_available(self) -> bool:
+        vw = self.video_wallpaper
+        if vw.animation or not vw.current_video:
+            return False
+        if os.path.exists(vw.reduced_variant_path(vw.current_video)):
+            return True
+        if not self._transcoding:
+            # 在后台生成，之后再降档时即可使用
+            self._transcoding = True
+            threading.Thread(target=self._transcode_reduced, args=(vw.current_video,), daemon=True).start()
+        return False
+
+    @background_job
+    def _transcode_reduced(self, video_path: str):
+        try:
+            self.video_wallpaper.transcode_reduced(video_path)
+        finally:
+            self._transcoding = False
+
+    def _set_tier(self, tier: int, reason: str) -> str:
+        old, self.tier = TIERS[self.tier], tier
+        self._samples.clear()
+        name = TIERS[tier]
+        print(f"Playback governor: {old} -> {name} ({reason})")
+        if name != 'still':
+            # 停在当前帧时保留原来的解码设置，不重新加载视频
+            self.video_wallpaper.set_playback_quality(SKIP_LEVELS[name], name in REDUCED_TIERS)
+        self.video_wallpaper.set_governor_state(TIER_STATES[name])
+        self.tier_changed.emit(name)
+        return name
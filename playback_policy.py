@@ -0,0 +1,301 @@
+import os
+import ctypes
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# 每个显示器的播放状态
+PLAY = 'play'            # 正常播放
+THROTTLE = 'throttle'    # 降低帧率
+SLOW = 'slow'            # 只显示少量帧（质量调节器的最低播放档位）
+STILL = 'still'          # 停在当前帧（壁纸可见，但需要节省电量或 CPU）
+PAUSE = 'pause'          # 暂停（壁纸完全看不见）
+FROZEN_STATES = (STILL, PAUSE)
+# 从最费到最省的顺序，多个来源给出不同状态时取更省的一个
+STATE_ORDER = (PLAY, THROTTLE, SLOW, STILL, PAUSE)
+
+# 检查信号的间隔（毫秒）
+POLL_INTERVAL = 1000
+# 被窗口遮挡超过这个比例视为看不见（最大化窗口只露出任务栏时也算）
+OCCLUDED_COVERAGE = 0.9
+# 使用电池且电量低于这个百分比时停在当前帧，否则降低帧率
+LOW_BATTERY = 20
+# CPU 占用高于 HIGH 且持续 CPU_POLLS 次检查时降低帧率，回落到 LOW 以下才恢复
+CPU_HIGH = 85
+CPU_LOW = 60
+CPU_POLLS = 3
+# 降低帧率时每秒最多刷新的帧数
+THROTTLE_FPS = 15
+SLOW_FPS = 4
+# 每个显示器单独用 VLC 播放时无法按帧控制显示，降低帧率改为跳帧解码
+# （avcodec-skip-frame：1 跳过非参考帧，3 只解码关键帧）
+STATE_SKIP_LEVELS = {THROTTLE: 1, SLOW: 3}
+
+
+def strictest(*states: str) -> str:
+    return max(states, key=STATE_ORDER.index)
+
+
+def should_present(state: str, last: float, now: float) -> bool:
+    """按播放状态决定窗口是否绘制新的一帧（last 为上次绘制的时间，单位秒）"""
+    if state in FROZEN_STATES:
+        return False
+    if state == THROTTLE:
+        return now - last >= 1 / THROTTLE_FPS
+    if state == SLOW:
+        return now - last >= 1 / SLOW_FPS
+    return True
+
+
+def default_signals() -> Dict:
+    """信号格式：所有提供者的 poll() 都返回这种字典"""
+    return {
+        'session_locked': False,
+        'on_battery': False,
+        'battery_percent': None,
+        'battery_saver': False,
+        'cpu_load': None,
+        # 显示器句柄 -> {'coverage': 被其他窗口遮挡的比例, 'fullscreen': 是否有全屏程序}
+        'monitors': {},
+    }
+
+
+class ScriptedSignalProvider:
+    """按脚本依次返回信号的提供者，用于在任何平台上测试播放策略
+
+    steps 中每一项是要覆盖默认信号的字典，每次 poll 前进一步，脚本结束后重复最后一步；
+    也可以随时调用 set() 修改当前信号。
+    """
+
+    def __init__(self, steps: Optional[List[Dict]] = None):
+        self.steps = list(steps or [])
+        self.current = default_signals()
+        self.polls = 0
+
+    def set(self, **signals):
+        self.current.update(signals)
+
+    def poll(self, monitors: List[Dict]) -> Dict:
+        if self.polls < len(self.steps):
+            self.current = dict(default_signals(), **self.steps[self.polls])
+        self.polls += 1
+        return dict(self.current)
+
+
+class _SYSTEM_POWER_STATUS(ctypes.Structure):
+    _fields_ = [
+        ('ACLineStatus', ctypes.c_ubyte),
+        ('BatteryFlag', ctypes.c_ubyte),
+        ('BatteryLifePercent', ctypes.c_ubyte),
+        ('SystemStatusFlag', ctypes.c_ubyte),
+        ('BatteryLifeTime', ctypes.c_ulong),
+        ('BatteryFullLifeTime', ctypes.c_ulong),
+    ]
+
+
+class WindowsSignalProvider:
+    """从 Windows 读取信号：窗口遮挡、全屏程序、电源、锁屏和 CPU 占用
+
+    exclude 返回不计入遮挡的窗口句柄（壁纸窗口自身）。
+    """
+
+    # 桌面和任务栏本身不算遮挡
+    SHELL_CLASSES = ('Progman', 'WorkerW', 'Shell_TrayWnd', 'Shell_SecondaryTrayWnd')
+    # 计算遮挡比例时显示器缩小的倍数
+    COVERAGE_GRID = 16
+
+    def __init__(self, exclude: Optional[Callable[[], Set[int]]] = None):
+        self.exclude = exclude or (lambda: set())
+        self._last_times = None
+
+    def poll(self, monitors: List[Dict]) -> Dict:
+        signals = default_signals()
+        try:
+            signals['session_locked'] = self._session_locked()
+            signals.update(self._power_status())
+            signals['cpu_load'] = self._cpu_load()
+            signals['monitors'] = self._monitor_coverage(monitors)
+        except Exception as e:
+            print(f"Error reading playback signals: {e}")
+        return signals
+
+    @staticmethod
+    def _session_locked() -> bool:
+        """锁屏或切换到安全桌面时无法切换到输入桌面"""
+        user32 = ctypes.windll.user32
+        desktop = user32.OpenInputDesktop(0, False, 0x0100)  # DESKTOP_SWITCHDESKTOP
+        if not desktop:
+            return True
+        try:
+            return not user32.SwitchDesktop(desktop)
+        finally:
+            user32.CloseDesktop(desktop)
+
+    @staticmethod
+    def _power_status() -> Dict:
+        status = _SYSTEM_POWER_STATUS()
+        if not ctypes.windll.kernel32.GetSystemPowerStatus(ctypes.byref(status)):
+            return {}
+        percent = status.BatteryLifePercent
+        return {
+            'on_battery': status.ACLineStatus == 0,
+            'battery_percent': None if percent == 255 else percent,
+            'battery_saver': bool(status.SystemStatusFlag & 1),
+        }
+
+    def _cpu_load(self) -> Optional[float]:
+        """两次检查之间的整机 CPU 占用百分比"""
+        idle, kernel, user = (ctypes.c_ulonglong(), ctypes.c_ulonglong(), ctypes.c_ulonglong())
+        if not ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user)):
+            return None
+        times = (idle.value, kernel.value + user.value)
+        last, self._last_times = self._last_times, times
+        if last is None or times[1] == last[1]:
+            return None
+        # 内核时间包含空闲时间
+        return max(0.0, min(100.0, 100 * (1 - (times[0] - last[0]) / (times[1] - last[1]))))
+
+    def _visible_windows(self) -> List[tuple]:
+        import win32gui
+        exclude = self.exclude()
+        dwmapi = ctypes.windll.dwmapi
+        windows = []
+
+        def callback(hwnd, _):
+            if hwnd in exclude or not win32gui.IsWindowVisible(hwnd) or win32gui.IsIconic(hwnd):
+                return True
+            if win32gui.GetClassName(hwnd) in self.SHELL_CLASSES:
+                return True
+            # 被 DWM 隐藏的窗口（其他虚拟桌面上的、挂起的 UWP 应用）
+            cloaked = ctypes.c_int(0)
+            dwmapi.DwmGetWindowAttribute(hwnd, 14, ctypes.byref(cloaked), ctypes.sizeof(cloaked))
+            if cloaked.value:
+                return True
+            rect = win32gui.GetWindowRect(hwnd)
+            if rect[2] > rect[0] and rect[3] > rect[1]:
+                windows.append(rect)
+            return True
+
+        win32gui.EnumWindows(callback, None)
+        return windows
+
+    def _monitor_coverage(self, monitors: List[Dict]) -> Dict:
+        import numpy as np
+        import win32gui
+        windows = self._visible_windows()
+        foreground = win32gui.GetForegroundWindow()
+        foreground_rect = win32gui.GetWindowRect(foreground) if foreground else None
+        result = {}
+        for monitor in monitors:
+            left, top, right, bottom = monitor['rect']
+            grid = self.COVERAGE_GRID
+            mask = np.zeros((max(1, (bottom - top) // grid), max(1, (right - left) // grid)), dtype=bool)
+            for w_left, w_top, w_right, w_bottom in windows:
+                x0, x1 = max(w_left, left), min(w_right, right)
+                y0, y1 = max(w_top, top), min(w_bottom, bottom)
+                if x0 < x1 and y0 < y1:
+                    mask[(y0 - top) // grid:(y1 - top + grid - 1) // grid,
+                         (x0 - left) // grid:(x1 - left + grid - 1) // grid] = True
+            fullscreen = bool(foreground_rect) and foreground not in self.exclude() \
+                and win32gui.GetClassName(foreground) not in self.SHELL_CLASSES \
+                and foreground_rect[0] <= left and foreground_rect[1] <= top \
+                and foreground_rect[2] >= right and foreground_rect[3] >= bottom
+            result[monitor['handle']] = {'coverage': float(mask.mean()), 'fullscreen': fullscreen}
+        return result
+
+
+class PlaybackPolicy:
+    """根据信号决定每个显示器的播放状态
+
+    锁屏时全部暂停；有全屏程序或几乎被窗口挡住的显示器暂停；
+    使用电池时降低帧率，电量低或开启省电模式时停在当前帧；
+    CPU 持续繁忙时降低帧率。多个条件同时成立时取最省的状态。
+    """
+
+    def __init__(self):
+        self._cpu_busy = False
+        self._cpu_high_polls = 0
+
+    def _update_cpu(self, load: Optional[float]):
+        if load is None:
+            return
+        if load >= CPU_HIGH:
+            self._cpu_high_polls += 1
+            if self._cpu_high_polls >= CPU_POLLS:
+                self._cpu_busy = True
+        else:
+            self._cpu_high_polls = 0
+            if load < CPU_LOW:
+                self._cpu_busy = False
+
+    def decide(self, signals: Dict, handles: Iterable) -> Dict:
+        self._update_cpu(signals.get('cpu_load'))
+        # 对所有显示器都成立的状态
+        base = PLAY
+        if signals.get('on_battery'):
+            percent = signals.get('battery_percent')
+            low = signals.get('battery_saver') or (percent is not None and percent < LOW_BATTERY)
+            base = STILL if low else THROTTLE
+        if self._cpu_busy and base == PLAY:
+            base = THROTTLE
+
+        states = {}
+        monitors = signals.get('monitors', {})
+        for handle in handles:
+            info = monitors.get(handle, {})
+            if signals.get('session_locked') or info.get('fullscreen') \
+                    or info.get('coverage', 0) >= OCCLUDED_COVERAGE:
+                states[handle] = PAUSE
+            else:
+                states[handle] = base
+        return states
+
+
+class PlaybackPolicyEngine(QObject):
+    """定期读取信号并把每个显示器的播放状态应用到视频壁纸处理器
+
+    设置项 playback_policy 关闭时所有显示器正常播放。
+    状态变化时发出 changed 信号并输出一行日志；恢复播放时直接继续，不重新打开视频。
+    provider 为任何带 poll(monitors) 方法、返回 default_signals() 格式字典的对象。
+    """
+
+    # 显示器句柄 -> 播放状态
+    changed = pyqtSignal(object)
+
+    def __init__(self, video_wallpaper, provider, policy: Optional[PlaybackPolicy] = None,
+                 interval: int = POLL_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.video_wallpaper = video_wallpaper
+        self.provider = provider
+        self.policy = policy or PlaybackPolicy()
+        self.states: Dict = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.poll)
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def poll(self) -> Dict:
+        monitors = self.video_wallpaper.monitors
+        handles = [monitor['handle'] for monitor in monitors]
+        if self.video_wallpaper.settings.get('playback_policy', True):
+            states = self.policy.decide(self.provider.poll(monitors), handles)
+        else:
+            states = {handle: PLAY for handle in handles}
+        # 每次都重新应用：刚切换的视频还在打开时 VLC 可能忽略暂停，下一次检查时补上
+        self.video_wallpaper.apply_playback_states(states)
+        if states != self.states:
+            self.states = states
+            print(f"Playback policy: {', '.join(f'{handle}={state}' for handle, state in states.items())}")
+            self.changed.emit(states)
+        return states
+
+
+def default_provider(exclude: Optional[Callable[[], Set[int]]] = None):
+    """当前平台的信号提供者；非 Windows 平台没有信号来源，始终正常播放"""
+    if os.name == 'nt':
+        return WindowsSignalProvider(exclude)
+    return ScriptedSignalProvider()
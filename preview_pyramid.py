@@ -0,0 +1,73 @@
+from typing import List, Optional, Tuple
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPixmap
+
+# 金字塔最大一层的最长边上限（预览不会超过屏幕尺寸）
+MAX_BASE_EDGE = 4096
+# 最小一层的最长边
+MIN_LEVEL_EDGE = 128
+# 预览金字塔在统一缓存中的命名空间和内存上限（字节）
+PREVIEW_NAMESPACE = 'previews'
+PREVIEW_BUDGET = 128 * 1024 * 1024
+
+
+def _to_qimage(img) -> QImage:
+    data = img.tobytes()
+    qimage = QImage(data, img.width, img.height, img.width * 3, QImage.Format.Format_RGB888)
+    # QImage 不持有 data 的引用，复制一份
+    return qimage.copy()
+
+
+class PreviewPyramid:
+    """一张图片的多分辨率金字塔：原图只解码一次，之后每层是上一层的一半
+
+    任意尺寸的预览都从不小于目标尺寸的最小一层缩放得到，缩放量始终不超过 2 倍。
+    """
+
+    def __init__(self, levels: List[QImage]):
+        self.levels = levels
+        self.nbytes = sum(level.sizeInBytes() for level in levels)
+
+    @classmethod
+    def load(cls, path: str, max_edge: int = MAX_BASE_EDGE) -> Optional['PreviewPyramid']:
+        """解码图片（JPEG 使用 draft 模式）并逐层缩小，失败时返回 None"""
+        from PIL import Image, ImageOps
+        try:
+            with Image.open(path) as src:
+                src.draft('RGB', (max_edge, max_edge))
+                base = ImageOps.exif_transpose(src).convert('RGB')
+            # 超出上限时按整数倍缩小（比任意比例的高质量重采样快得多）
+            while max(base.size) > max_edge:
+                base = base.reduce(2)
+        except Exception as e:
+            print(f"Error loading preview for {path}: {e}")
+            return None
+        levels = [_to_qimage(base)]
+        level = base
+        while max(level.size) // 2 >= MIN_LEVEL_EDGE:
+            # 2x2 区域取平均，速度快且不会产生锯齿
+            level = level.reduce(2)
+            levels.append(_to_qimage(level))
+        return cls(levels)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.levels[0].width(), self.levels[0].height()
+
+    def level_for(self, width: int, height: int) -> QImage:
+        """满足目标尺寸的最小一层；目标比原图还大时返回最大一层"""
+        scale = min(width / self.levels[0].width(), height / self.levels[0].height())
+        best = self.levels[0]
+        for level in self.levels[1:]:
+            if level.width() < self.levels[0].width() * scale or level.height() < self.levels[0].height() * scale:
+                break
+            best = level
+        return best
+
+    def render(self, width: int, height: int, smooth: bool = True) -> QPixmap:
+        """按目标尺寸保持比例缩放；拖动窗口时用快速缩放，停下后再平滑缩放"""
+        level = self.level_for(width, height)
+        mode = Qt.TransformationMode.SmoothTransformation if smooth else Qt.TransformationMode.FastTransformation
+        scaled = level.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio, mode)
+        return QPixmap.fromImage(scaled)
+
@@ -0,0 +1,191 @@
+import time
+import random
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from animated_wallpaper import is_animated_file
+
+# 提前准备下一张壁纸的时间（秒），不超过间隔的四分之一
+PREFETCH_LEAD = 30
+# 保留的切换耗时记录条数
+LATENCY_HISTORY = 200
+
+
+class SequentialOrder:
+    """按添加顺序依次轮换"""
+
+    name = 'sequential'
+
+    def next(self, candidates: List[Tuple[str, Optional[float]]], current: Optional[str]) -> Optional[str]:
+        if not candidates:
+            return None
+        paths = [path for path, _last_used in candidates]
+        try:
+            return paths[(paths.index(current) + 1) % len(paths)]
+        except ValueError:
+            return paths[0]
+
+
+class ShuffleBagOrder:
+    """洗牌袋：每一轮把所有壁纸打乱后依次播放，一轮内不重复"""
+
+    name = 'shuffle'
+
+    def __init__(self):
+        self._bag: List[str] = []
+
+    def next(self, candidates: List[Tuple[str, Optional[float]]], current: Optional[str]) -> Optional[str]:
+        available = {path for path, _last_used in candidates}
+        # 丢弃已被删除的壁纸
+        self._bag = [path for path in self._bag if path in available]
+        if not self._bag:
+            self._bag = list(available)
+            random.shuffle(self._bag)
+            # 新一轮的第一张不与当前壁纸相同
+            if len(self._bag) > 1 and self._bag[-1] == current:
+                self._bag[0], self._bag[-1] = self._bag[-1], self._bag[0]
+        return self._bag.pop() if self._bag else None
+
+
+class RecencyWeightedOrder:
+    """按最近使用时间加权随机：越久没用过的壁纸越容易被选中"""
+
+    name = 'recency'
+
+    # 超过这个时长未使用的壁纸权重相同（秒）
+    MAX_AGE = 7 * 24 * 3600
+
+    def next(self, candidates: List[Tuple[str, Optional[float]]], current: Optional[str]) -> Optional[str]:
+        pool = [(path, last_used) for path, last_used in candidates if path != current] or candidates
+        if not pool:
+            return None
+        now = time.time()
+        weights = [
+            min(now - last_used, self.MAX_AGE) + 60 if last_used else self.MAX_AGE + 60
+            for _path, last_used in pool
+        ]
+        return random.choices([path for path, _ in pool], weights=weights)[0]
+
+
+ORDERS = {order.name: order for order in (SequentialOrder, ShuffleBagOrder, RecencyWeightedOrder)}
+
+
+class RotationScheduler(QObject):
+    """自动更换壁纸的调度器
+
+    在切换前提前准备下一张壁纸（图片预先渲染到显示器分辨率，视频预先打开并解析），
+    到点时只需调用系统接口，切换几乎瞬间完成，也不会在整点产生 CPU 峰值。
+    """
+
+    # 完成一次切换：壁纸路径, 切换耗时(毫秒)
+    switched = pyqtSignal(str, float)
+    # 后台准备完成（内部使用，回到界面线程）
+    _prepared = pyqtSignal(str, str)
+
+    def __init__(self, wallpaper_manager, video_wallpaper, parent=None):
+        super().__init__(parent)
+        self.wallpaper_manager = wallpaper_manager
+        self.video_wallpaper = video_wallpaper
+        self.order = ShuffleBagOrder()
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self._next_path: Optional[str] = None
+        self._prepared_file: Optional[str] = None
+
+        self._switch_timer = QTimer(self)
+        self._switch_timer.setSingleShot(True)
+        self._switch_timer.timeout.connect(self.switch_now)
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.timeout.connect(self.prefetch)
+        self._prepared.connect(self._on_prepared)
+
+    def apply_settings(self):
+        """根据配置启动或停止自动更换"""
+        settings = self.wallpaper_manager.config['settings']
+        order_name = settings.get('rotation_order', ShuffleBagOrder.name)
+        if getattr(self.order, 'name', None) != order_name:
+            self.order = ORDERS.get(order_name, ShuffleBagOrder)()
+        if settings.get('auto_change'):
+            self._schedule()
+        else:
+            self.stop()
+
+    def stop(self):
+        self._switch_timer.stop()
+        self._prefetch_timer.stop()
+
+    @property
+    def interval(self) -> float:
+        return max(10, float(self.wallpaper_manager.config['settings'].get('change_interval', 3600)))
+
+    def _schedule(self):
+        interval_ms = int(self.interval * 1000)
+        lead_ms = int(min(PREFETCH_LEAD, self.interval / 4) * 1000)
+        self._switch_timer.start(interval_ms)
+        self._prefetch_timer.start(max(0, interval_ms - lead_ms))
+
+    def prefetch(self):
+        """选出下一张壁纸并提前准备"""
+        current = self.wallpaper_manager.config.get('current_wallpaper')
+        self._next_path = self.order.next(self.wallpaper_manager.db.rotation_candidates(), current)
+        self._prepared_file = None
+        if not self._next_path:
+            return
+        if self.wallpaper_manager.is_video_file(self._next_path):
+            # VLC 对象需要在界面线程中创建
+            self.video_wallpaper.prepare(self._next_path)
+        elif is_animated_file(self._next_path):
+            # 动画在切换时才开始解码，不需要预渲染静态图
+            pass
+        else:
+            path = self._next_path
+            threading.Thread(target=self._prepare_image, args=(path,), daemon=True).start()
+
+    def _prepare_image(self, path: str):
+        """在后台线程中把图片渲染为显示器分辨率（结果进入预渲染缓存）"""
+        try:
+            output = self.wallpaper_manager.render_wallpaper(path)
+            if output:
+                self._prepared.emit(path, output)
+        except Exception as e:
+            print(f"Error preparing next wallpaper: {e}")
+
+    def _on_prepared(self, path: str, output: str):
+        if path == self._next_path:
+            self._prepared_file = output
+
+    def switch_now(self):
+        """切换到已准备好的下一张壁纸，并记录切换耗时"""
+        if not self._next_path:
+            self.prefetch()
+        path = self._next_path
+        if path:
+            start = time.perf_counter()
+            if self.wallpaper_manager.is_video_file(path):
+                ok = self.video_wallpaper.set_wallpaper(path)
+                if ok:
+                    self.wallpaper_manager.mark_current(path)
+            else:
+                ok = self.wallpaper_manager.set_wallpaper(path, rendered_path=self._prepared_file)
+            latency = (time.perf_counter() - start) * 1000
+            if ok:
+                self.latencies.append(latency)
+                self.switched.emit(path, latency)
+        self._next_path = None
+        self._prepared_file = None
+        if self.wallpaper_manager.config['settings'].get('auto_change'):
+            self._schedule()
+
+    def latency_stats(self) -> Dict[str, float]:
+        """切换耗时统计（毫秒）"""
+        if not self.latencies:
+            return {'count': 0}
+        values = sorted(self.latencies)
+        return {
+            'count': len(values),
+            'last': self.latencies[-1],
+            'median': values[len(values) // 2],
+            'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+            'max': values[-1],
+        }
@@ -0,0 +1,14 @@
+import os
+import sys
+import pytest
+
+# 测试直接导入仓库根目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 界面相关的测试不需要显示器
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from PyQt6.QtGui import QGuiApplication
+    return QGuiApplication.instance() or QGuiApplication([])
@@ -0,0 +1,97 @@
+import json
+import os
+import time
+import pytest
+import config_writer
+from config_writer import DebouncedJsonWriter
+
+
+@pytest.fixture
+def config():
+    return {'wallpapers': [], 'current_wallpaper': None}
+
+
+@pytest.fixture
+def writer(tmp_path, config):
+    # 延迟设得很长，测试中手动 flush
+    writer = DebouncedJsonWriter(str(tmp_path / 'config.json'), lambda: config, delay=60)
+    yield writer
+    with writer._lock:
+        if writer._timer is not None:
+            writer._timer.cancel()
+
+
+def on_disk(writer):
+    with open(writer.file_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_changes_coalesce_into_one_write(writer, config):
+    for index in range(5):
+        config['current_wallpaper'] = f'/store/{index}.jpg'
+        writer.mark_dirty()
+    assert not os.path.exists(writer.file_path)
+    writer.flush()
+    assert on_disk(writer)['current_wallpaper'] == '/store/4.jpg'
+    assert writer.stats == {'requested': 5, 'written': 1, 'coalesced': 4, 'unchanged': 0}
+    assert writer.writes_avoided == 4
+
+
+def test_snapshot_taken_when_marked(writer, config):
+    config['current_wallpaper'] = 'a'
+    writer.mark_dirty()
+    # 标记之后的修改不会被写入，除非再次标记
+    config['current_wallpaper'] = 'b'
+    writer.flush()
+    assert on_disk(writer)['current_wallpaper'] == 'a'
+
+
+def test_unchanged_content_is_skipped(writer):
+    writer.mark_dirty()
+    writer.flush()
+    writer.mark_dirty()
+    writer.flush()
+    assert writer.stats['written'] == 1
+    assert writer.stats['unchanged'] == 1
+
+
+def test_existing_file_counts_as_written(tmp_path, config):
+    path = tmp_path / 'config.json'
+    path.write_bytes(json.dumps(config, ensure_ascii=False, indent=2).encode('utf-8'))
+    writer = DebouncedJsonWriter(str(path), lambda: config, delay=60)
+    writer.mark_dirty()
+    writer.flush()
+    assert writer.stats['written'] == 0
+
+
+def test_failed_write_keeps_old_file_and_retries(writer, config, monkeypatch, tmp_path):
+    writer.mark_dirty()
+    writer.flush()
+    monkeypatch.setattr(config_writer, 'RETRY_DELAY', 60)
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(config_writer.os, 'replace', failing_replace)
+    config['current_wallpaper'] = 'new'
+    writer.mark_dirty()
+    writer.flush()
+    # 旧文件完整保留，临时文件已清理，修改等待重试
+    assert on_disk(writer)['current_wallpaper'] is None
+    assert os.listdir(tmp_path) == ['config.json']
+    assert writer._dirty
+
+    monkeypatch.setattr(config_writer.os, 'replace', real_replace)
+    writer.flush()
+    assert on_disk(writer)['current_wallpaper'] == 'new'
+    assert not writer._dirty
+
+
+def test_timer_flushes_after_delay(tmp_path, config):
+    writer = DebouncedJsonWriter(str(tmp_path / 'config.json'), lambda: config, delay=0.01)
+    writer.mark_dirty()
+    deadline = time.monotonic() + 5
+    while writer.stats['written'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert on_disk(writer) == config
@@ -0,0 +1,80 @@
+import os
+import stat
+import threading
+import pytest
+from content_store import ContentStore, ImportCancelled
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(str(tmp_path / 'library'))
+
+
+def source(tmp_path, name, data, read_only=False):
+    path = tmp_path / name
+    path.write_bytes(data)
+    if read_only:
+        path.chmod(stat.S_IRUSR)
+    return str(path)
+
+
+def test_ingest_names_object_by_content(store, tmp_path):
+    src = source(tmp_path, 'a.JPG', b'wallpaper')
+    target, digest = store.ingest(src, '.JPG')
+    assert target == store.object_path(digest, '.jpg')
+    assert digest == ContentStore.full_hash(src)
+    with open(target, 'rb') as f:
+        assert f.read() == b'wallpaper'
+    assert store.is_object(target)
+    assert not store.is_object(src)
+
+
+def test_same_content_is_stored_once(store, tmp_path):
+    first, digest = store.ingest(source(tmp_path, 'a.png', b'same'), '.png')
+    second, second_digest = store.ingest(source(tmp_path, 'b.png', b'same'), '.png')
+    assert (first, digest) == (second, second_digest)
+    objects = [name for _root, _dirs, files in os.walk(store.root) for name in files]
+    assert objects == [os.path.basename(first)]
+
+
+def test_writable_source_is_not_hardlinked(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(store, '_reflink', lambda src, target: False)
+    src = source(tmp_path, 'a.png', b'original')
+    target, _digest = store.ingest(src, '.png')
+    assert not os.path.samefile(src, target)
+
+
+def test_read_only_source_is_hardlinked(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(store, '_reflink', lambda src, target: False)
+    src = source(tmp_path, 'a.png', b'original', read_only=True)
+    target, _digest = store.ingest(src, '.png')
+    assert os.path.samefile(src, target)
+
+
+def test_changed_object_is_replaced(store, tmp_path):
+    src = source(tmp_path, 'a.png', b'original')
+    target, digest = store.ingest(src, '.png')
+    # 模拟旧版本硬链接的对象被原地修改
+    with open(target, 'wb') as f:
+        f.write(b'edited in place')
+    assert store.ingest(src, '.png', digest) == (target, digest)
+    with open(target, 'rb') as f:
+        assert f.read() == b'original'
+
+
+def test_cancel_leaves_no_temp_files(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(store, '_same_device', lambda src: False)
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(ImportCancelled):
+        store.ingest(source(tmp_path, 'a.png', b'data'), '.png', cancel=cancel)
+    assert os.listdir(store.root) == []
+
+
+def test_release_only_deletes_objects(store, tmp_path):
+    src = source(tmp_path, 'a.png', b'data')
+    target, _digest = store.ingest(src, '.png')
+    store.release(src)
+    store.release(target)
+    assert os.path.exists(src)
+    assert not os.path.exists(target)
@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+import pytest
+import library_db
+from library_db import LibraryDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = LibraryDB(str(tmp_path / 'library.db'))
+    yield db
+    db.close()
+
+
+def wallpaper(index):
+    return {'path': f'/store/{index}.jpg', 'name': f'{index}.jpg', 'type': '.jpg', 'size': index}
+
+
+def committed(db):
+    """另开一个连接读取，只能看到已提交的行"""
+    conn = sqlite3.connect(db.db_path)
+    try:
+        return conn.execute('SELECT count(*) FROM wallpapers').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_single_change_commits_immediately(db):
+    db.insert(wallpaper(1))
+    assert committed(db) == 1
+
+
+def test_batch_commits_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(library_db, 'BATCH_COMMIT_SIZE', 3)
+    with db.batch():
+        for index in range(7):
+            db.insert(wallpaper(index))
+        assert committed(db) == 6
+    assert committed(db) == 7
+
+
+def test_failed_change_in_batch_rolls_back_only_itself(db):
+    with db.batch():
+        db.insert(wallpaper(1))
+        with pytest.raises(sqlite3.IntegrityError):
+            with db._transaction() as conn:
+                conn.execute("INSERT INTO wallpapers (path, name, type) VALUES ('/store/2.jpg', 'x', '.jpg')")
+                conn.execute("INSERT INTO wallpapers (path, name, type) VALUES ('/store/2.jpg', 'x', '.jpg')")
+        db.insert(wallpaper(3))
+    assert committed(db) == 2
+    assert db.get('/store/2.jpg') is None
+
+
+def test_batch_error_rolls_back_uncommitted_chunk(db, monkeypatch):
+    monkeypatch.setattr(library_db, 'BATCH_COMMIT_SIZE', 2)
+    with pytest.raises(RuntimeError):
+        with db.batch():
+            for index in range(3):
+                db.insert(wallpaper(index))
+            raise RuntimeError('import failed')
+    assert committed(db) == 2
+    assert db.count() == 2
+
+
+def test_batch_depth_is_per_thread(db):
+    entered, release = threading.Event(), threading.Event()
+
+    def importer():
+        with db.batch():
+            db.insert(wallpaper(1))
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=importer)
+    thread.start()
+    entered.wait(5)
+    try:
+        # 界面线程的修改不受其他线程批次的影响，立即提交
+        assert db._batch_depth == 0
+        db.insert(wallpaper(2))
+        assert committed(db) == 2
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_nested_batches_commit_when_last_one_ends(db):
+    joined, release = threading.Event(), threading.Event()
+
+    def worker():
+        with db.batch():
+            db.insert(wallpaper(2))
+        joined.set()
+        release.wait(5)
+
+    with db.batch():
+        db.insert(wallpaper(1))
+        thread = threading.Thread(target=worker)
+        thread.start()
+        joined.wait(5)
+        # 工作线程的批次结束时，外层批次还没结束，不提交
+        assert committed(db) == 0
+        release.set()
+        thread.join()
+    assert committed(db) == 2
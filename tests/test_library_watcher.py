@@ -0,0 +1,105 @@
+import os
+import time
+from library_watcher import DirectorySnapshot, LibraryWatcher, _PollingBackend
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def make_library(tmp_path, count=3):
+    sub = tmp_path / 'ab'
+    sub.mkdir()
+    for index in range(count):
+        write(sub / f'{index}.jpg', b'x' * (index + 1))
+    return sub
+
+
+class Recorder:
+    def __init__(self):
+        self.paths, self.dirs = [], []
+
+    def on_path(self, path):
+        self.paths.append(path)
+
+    def on_dir(self, directory):
+        self.dirs.append(directory)
+
+
+def test_polling_detects_in_place_modification(tmp_path):
+    sub = make_library(tmp_path)
+    snapshot = DirectorySnapshot(str(tmp_path))
+    snapshot.scan()
+    dir_mtime = os.stat(sub).st_mtime_ns
+    path = str(sub / '1.jpg')
+    write(path, b'changed content')
+    # 原地修改文件不改变目录的修改时间
+    assert os.stat(sub).st_mtime_ns == dir_mtime
+    recorder = Recorder()
+    backend = _PollingBackend(snapshot, recorder.on_path, recorder.on_dir)
+    backend.poll()
+    assert recorder.paths == [path]
+    assert recorder.dirs == []
+
+
+def test_polling_checks_files_round_robin(tmp_path):
+    sub = make_library(tmp_path, count=5)
+    snapshot = DirectorySnapshot(str(tmp_path))
+    snapshot.scan()
+    for index in range(5):
+        write(sub / f'{index}.jpg', b'changed content')
+    recorder = Recorder()
+    backend = _PollingBackend(snapshot, recorder.on_path, recorder.on_dir, files_per_poll=2)
+    backend.poll()
+    assert len(recorder.paths) == 2
+    backend.poll()
+    backend.poll()
+    assert sorted(recorder.paths) == sorted(str(sub / f'{index}.jpg') for index in range(5))
+
+
+def test_polling_rescans_changed_directories(tmp_path):
+    sub = make_library(tmp_path)
+    snapshot = DirectorySnapshot(str(tmp_path))
+    snapshot.scan()
+    time.sleep(0.01)
+    write(sub / 'new.jpg', b'new')
+    os.utime(sub, ns=(os.stat(sub).st_atime_ns, os.stat(sub).st_mtime_ns + 10 ** 9))
+    recorder = Recorder()
+    _PollingBackend(snapshot, recorder.on_path, recorder.on_dir).poll()
+    assert recorder.dirs == [str(sub)]
+
+
+def test_drain_reports_modified_and_deleted_files(tmp_path):
+    sub = make_library(tmp_path)
+    watcher = LibraryWatcher(str(tmp_path), use_notifications=False)
+    try:
+        assert watcher.mode == 'polling'
+        old = watcher.stat(str(sub / '0.jpg'))
+        write(sub / '0.jpg', b'modified')
+        watcher.backend.poll()
+        changes = watcher.drain()
+        assert changes[str(sub / '0.jpg')][0] == old
+        assert changes[str(sub / '0.jpg')][1][0] == len(b'modified')
+        assert watcher.drain() == {}
+        deleted = watcher.stat(str(sub / '2.jpg'))
+        os.remove(sub / '2.jpg')
+        watcher._on_dir(str(sub))
+        assert watcher.drain() == {str(sub / '2.jpg'): (deleted, None)}
+        assert not watcher.exists(str(sub / '2.jpg'))
+    finally:
+        watcher.stop()
+
+
+def test_paths_outside_snapshot_are_checked_on_disk(tmp_path):
+    root = tmp_path / 'objects'
+    root.mkdir()
+    outside = tmp_path / 'legacy.jpg'
+    write(outside, b'legacy')
+    watcher = LibraryWatcher(str(root), use_notifications=False)
+    try:
+        assert watcher.exists(str(outside))
+        assert watcher.stat(str(outside))[0] == len(b'legacy')
+        assert not watcher.exists(str(root / 'missing.jpg'))
+    finally:
+        watcher.stop()
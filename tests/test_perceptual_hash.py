@@ -0,0 +1,52 @@
+import random
+import pytest
+
+np = pytest.importorskip('numpy')
+import perceptual_hash
+from perceptual_hash import MultiIndexHash, find_groups, hamming
+
+
+def flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_phash_stable_under_brightness_change():
+    gray = np.random.default_rng(0).uniform(0, 200, (32, 32))
+    assert hamming(perceptual_hash.phash(gray), perceptual_hash.phash(gray * 0.8 + 10)) <= 2
+
+
+def test_query_matches_linear_scan():
+    rng = random.Random(1)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    # 加入一些近似副本
+    values += [flip(values[i], rng.sample(range(64), rng.randint(0, 8))) for i in range(50)]
+    index = MultiIndexHash()
+    for key, value in enumerate(values):
+        index.add(value, key)
+    for probe in values[:60]:
+        expected = {key: hamming(probe, value) for key, value in enumerate(values) if hamming(probe, value) <= 6}
+        assert dict(index.query(probe, 6)) == expected
+
+
+def test_query_keeps_smallest_distance_per_key():
+    index = MultiIndexHash()
+    index.add(0, 'video')
+    index.add(flip(0, [1, 2, 3]), 'video')
+    assert index.query(flip(0, [1]), 6) == [('video', 1)]
+
+
+def test_find_groups_is_transitive():
+    a = 0
+    b = flip(a, range(5))
+    c = flip(b, range(5, 10))  # 与 a 相距 10，经 b 连到同一组
+    far = (1 << 64) - 1
+    groups = find_groups([('a', a), ('b', b), ('c', c), ('far', far)], radius=6)
+    assert [sorted(group) for group in groups] == [['a', 'b', 'c']]
+
+
+def test_find_groups_merges_keys_with_several_hashes():
+    # 视频每个采样帧一个哈希，同一个键多次出现只算一次
+    groups = find_groups([('v', 0), ('v', flip(0, range(30))), ('img', flip(0, range(30, 32)))])
+    assert [sorted(group) for group in groups] == [['img', 'v']]
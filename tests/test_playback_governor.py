@@ -0,0 +1,193 @@
+import time
+import pytest
+import playback_governor
+from playback_governor import (HEADROOM, PROBE_BACKOFF, WINDOW_SAMPLES, BackgroundCpu,
+                               PlaybackGovernor, ProcessSampler)
+from playback_policy import PLAY, SLOW, STILL, THROTTLE
+
+
+class FakeVideoWallpaper:
+    def __init__(self, reduced_path=None):
+        self.settings = {'adaptive_quality': True, 'cpu_budget': 10.0}
+        self.players = {'shared': object()}
+        self.animation = None
+        self.monitors = [{'handle': 1}]
+        self.playback_states = {}
+        self.current_video = '/store/video.mp4'
+        self.reduced_path = reduced_path
+        self.quality = (0, False)
+        self.governor_state = PLAY
+        self.transcodes = []
+        self.stats = {'decoded': 0, 'dropped': 0}
+
+    def reduced_variant_path(self, video_path):
+        return self.reduced_path or '/nonexistent/reduced.mp4'
+
+    def transcode_reduced(self, video_path):
+        self.transcodes.append(video_path)
+
+    def set_playback_quality(self, skip_frames, reduced):
+        self.quality = (skip_frames, reduced)
+
+    def set_governor_state(self, state):
+        self.governor_state = state
+
+    def decode_stats(self):
+        return dict(self.stats)
+
+
+class ScriptedSampler:
+    def __init__(self):
+        self.cpu = 0.0
+        self.dropped = 0
+
+    def sample(self):
+        return {'cpu': self.cpu, 'decoded': 100, 'dropped': self.dropped, 'ms_per_frame': 1.0}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def make_governor(reduced_path=None):
+    vw = FakeVideoWallpaper(reduced_path)
+    sampler = ScriptedSampler()
+    return PlaybackGovernor(vw, sampler), vw, sampler
+
+
+def run_window(governor, sampler, cpu, clock, seconds=10):
+    """按给定 CPU 占用采样一个窗口的时长，返回期间切换到的档位（窗口是滑动的，可能中途切换）"""
+    sampler.cpu = cpu
+    result = None
+    for _ in range(WINDOW_SAMPLES):
+        clock[0] += seconds / WINDOW_SAMPLES
+        result = governor.poll() or result
+    return result
+
+
+def test_steps_down_one_tier_per_window(clock):
+    governor, vw, sampler = make_governor()
+    assert run_window(governor, sampler, 20.0, clock) == 'skip'
+    assert vw.quality == (1, False)
+    assert vw.governor_state == THROTTLE
+
+
+def test_without_reduced_variant_steps_through_keyframes_before_still(clock):
+    governor, vw, sampler = make_governor()
+    vw.animation = True  # 动画没有低分辨率版本，也不会开始转码
+    assert run_window(governor, sampler, 20.0, clock) == 'skip'
+    assert run_window(governor, sampler, 20.0, clock) == 'keyframes'
+    assert vw.quality == (3, True)
+    assert vw.governor_state == SLOW
+    assert run_window(governor, sampler, 20.0, clock) == 'still'
+    assert vw.governor_state == STILL
+    # 停在当前帧时保留原来的解码设置
+    assert vw.quality == (3, True)
+
+
+def test_missing_reduced_variant_is_transcoded_in_background(clock):
+    governor, vw, sampler = make_governor()
+    run_window(governor, sampler, 20.0, clock)
+    assert run_window(governor, sampler, 20.0, clock) == 'keyframes'
+    for _ in range(100):
+        if vw.transcodes and not governor._transcoding:
+            break
+        time.sleep(0.01)
+    assert vw.transcodes == ['/store/video.mp4']
+
+
+def test_uses_reduced_variant_when_available(clock, tmp_path):
+    reduced = tmp_path / 'reduced.mp4'
+    reduced.write_bytes(b'')
+    governor, vw, sampler = make_governor(str(reduced))
+    run_window(governor, sampler, 20.0, clock)
+    assert run_window(governor, sampler, 20.0, clock) == 'reduced'
+    assert vw.quality == (1, True)
+
+
+def test_dropping_frames_steps_down_within_budget(clock):
+    governor, vw, sampler = make_governor()
+    sampler.dropped = 50
+    assert run_window(governor, sampler, 1.0, clock) == 'skip'
+
+
+def test_holds_tier_between_headroom_and_budget(clock):
+    governor, vw, sampler = make_governor()
+    run_window(governor, sampler, 20.0, clock)
+    clock[0] += PROBE_BACKOFF
+    assert run_window(governor, sampler, 10.0 * (HEADROOM + 0.1), clock) is None
+    assert governor.tier == 1
+    assert run_window(governor, sampler, 10.0 * (HEADROOM - 0.1), clock) == 'full'
+
+
+def test_known_costly_tier_waits_for_backoff(clock):
+    governor, vw, sampler = make_governor()
+    run_window(governor, sampler, 20.0, clock)
+    # full 刚测得超预算，退避时间内有余量也不升档
+    assert run_window(governor, sampler, 2.0, clock) is None
+    clock[0] += PROBE_BACKOFF
+    assert run_window(governor, sampler, 2.0, clock) == 'full'
+
+
+def test_failed_probe_doubles_backoff(clock):
+    governor, vw, sampler = make_governor()
+    run_window(governor, sampler, 20.0, clock)
+    clock[0] += PROBE_BACKOFF
+    assert run_window(governor, sampler, 2.0, clock) == 'full'
+    # 升档后又超预算：退避翻倍
+    assert run_window(governor, sampler, 20.0, clock) == 'skip'
+    assert governor._backoff == PROBE_BACKOFF * 2
+    clock[0] += PROBE_BACKOFF
+    assert run_window(governor, sampler, 2.0, clock) is None
+    clock[0] += PROBE_BACKOFF
+    assert run_window(governor, sampler, 2.0, clock) == 'full'
+    # 稳定在预算内后退避恢复
+    assert run_window(governor, sampler, 2.0, clock) is None
+    assert governor._backoff == PROBE_BACKOFF
+
+
+def test_no_decision_while_background_job_runs(clock):
+    governor, vw, sampler = make_governor()
+    with playback_governor.background_cpu.track():
+        assert run_window(governor, sampler, 20.0, clock) is None
+    assert governor.tier == 0
+
+
+def test_disabling_restores_full_quality(clock):
+    governor, vw, sampler = make_governor()
+    run_window(governor, sampler, 20.0, clock)
+    vw.settings['adaptive_quality'] = False
+    governor.poll()
+    assert governor.tier == 0
+    assert vw.quality == (0, False)
+    assert vw.governor_state == PLAY
+
+
+def test_sampler_excludes_background_cpu(monkeypatch):
+    vw = FakeVideoWallpaper()
+    background = BackgroundCpu()
+    sampler = ProcessSampler(vw, background)
+    now, cpu = [0.0], [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(time, 'process_time', lambda: cpu[0])
+    assert sampler.sample() is None
+    now[0], cpu[0] = 2.0, 1.0
+    background.total = 0.8
+    vw.stats = {'decoded': 60, 'dropped': 3}
+    sample = sampler.sample()
+    assert sample['cpu'] == pytest.approx(10.0)
+    assert sample['ms_per_frame'] == pytest.approx(200 / 60)
+    assert (sample['decoded'], sample['dropped']) == (60, 3)
+
+
+def test_background_job_counts_outermost_call_once():
+    background = BackgroundCpu()
+    with background.track():
+        with background.track():
+            assert background.running == 1
+            sum(range(200000))
+    assert background.running == 0
+    assert background.total > 0
@@ -0,0 +1,89 @@
+from playback_policy import (CPU_HIGH, CPU_LOW, CPU_POLLS, PAUSE, PLAY, SLOW, SLOW_FPS, STILL, THROTTLE,
+                             THROTTLE_FPS, PlaybackPolicyEngine, ScriptedSignalProvider, should_present,
+                             strictest)
+
+
+class FakeVideoWallpaper:
+    def __init__(self, handles=(1, 2)):
+        self.monitors = [{'handle': handle, 'rect': (0, 0, 1920, 1080)} for handle in handles]
+        self.settings = {}
+        self.applied = []
+
+    def apply_playback_states(self, states):
+        self.applied.append(states)
+
+
+def run(app, steps, handles=(1, 2), settings=None):
+    """按脚本逐步检查，返回每一步的播放状态"""
+    vw = FakeVideoWallpaper(handles)
+    vw.settings.update(settings or {})
+    engine = PlaybackPolicyEngine(vw, ScriptedSignalProvider(steps))
+    return [engine.poll() for _ in steps], vw, engine
+
+
+def test_strictest_and_presenting():
+    assert strictest(PLAY, THROTTLE) == THROTTLE
+    assert strictest(SLOW, THROTTLE) == SLOW
+    assert strictest(STILL, SLOW, PAUSE) == PAUSE
+    assert should_present(PLAY, 10.0, 10.0)
+    assert not should_present(STILL, 0.0, 10.0)
+    assert not should_present(THROTTLE, 0.0, 0.5 / THROTTLE_FPS)
+    assert should_present(THROTTLE, 0.0, 1 / THROTTLE_FPS)
+    assert not should_present(SLOW, 0.0, 1 / THROTTLE_FPS)
+    assert should_present(SLOW, 0.0, 1 / SLOW_FPS)
+
+
+def test_locked_session_pauses_everything(app):
+    states, _vw, _engine = run(app, [{}, {'session_locked': True}, {}])
+    assert states == [{1: PLAY, 2: PLAY}, {1: PAUSE, 2: PAUSE}, {1: PLAY, 2: PLAY}]
+
+
+def test_fullscreen_and_occluded_monitors_pause_alone(app):
+    states, _vw, _engine = run(app, [
+        {'monitors': {1: {'fullscreen': True, 'coverage': 1.0}}},
+        {'monitors': {2: {'coverage': 0.95}}},
+        {'monitors': {2: {'coverage': 0.5}}},
+    ])
+    assert states == [{1: PAUSE, 2: PLAY}, {1: PLAY, 2: PAUSE}, {1: PLAY, 2: PLAY}]
+
+
+def test_battery_throttles_and_low_battery_holds_frame(app):
+    states, _vw, _engine = run(app, [
+        {'on_battery': True, 'battery_percent': 80},
+        {'on_battery': True, 'battery_percent': 10},
+        {'on_battery': True, 'battery_percent': 80, 'battery_saver': True},
+        {'on_battery': False, 'battery_percent': 10},
+    ], handles=(1,))
+    assert [s[1] for s in states] == [THROTTLE, STILL, STILL, PLAY]
+
+
+def test_busy_cpu_needs_consecutive_polls_and_hysteresis(app):
+    high, mid, low = CPU_HIGH + 5, (CPU_HIGH + CPU_LOW) / 2, CPU_LOW - 5
+    steps = [{'cpu_load': high}] * (CPU_POLLS - 1) + [{'cpu_load': mid}] + [{'cpu_load': high}] * CPU_POLLS \
+        + [{'cpu_load': mid}, {'cpu_load': low}]
+    states, _vw, _engine = run(app, steps, handles=(1,))
+    expected = [PLAY] * CPU_POLLS + [PLAY] * (CPU_POLLS - 1) + [THROTTLE, THROTTLE, PLAY]
+    assert [s[1] for s in states] == expected
+
+
+def test_disabled_policy_always_plays(app):
+    states, _vw, _engine = run(app, [{'session_locked': True}], settings={'playback_policy': False})
+    assert states == [{1: PLAY, 2: PLAY}]
+
+
+def test_states_are_reapplied_every_poll_but_reported_on_change(app):
+    _states, vw, engine = run(app, [{}, {}, {'session_locked': True}])
+    changes = []
+    engine.changed.connect(changes.append)
+    engine.poll()
+    assert len(vw.applied) == 4
+    assert changes == []
+
+
+def test_script_can_be_changed_while_running(app):
+    vw = FakeVideoWallpaper((1,))
+    provider = ScriptedSignalProvider()
+    engine = PlaybackPolicyEngine(vw, provider)
+    assert engine.poll() == {1: PLAY}
+    provider.set(on_battery=True, battery_percent=50)
+    assert engine.poll() == {1: THROTTLE}
@@ -0,0 +1,103 @@
+import random
+import time
+from collections import Counter
+import rotation
+from rotation import ORDERS, RecencyWeightedOrder, RotationScheduler, SequentialOrder, ShuffleBagOrder
+
+
+def candidates(count, last_used=None):
+    return [(f'/store/{i}.jpg', last_used) for i in range(count)]
+
+
+def test_orders_registered_by_name():
+    assert set(ORDERS) == {'sequential', 'shuffle', 'recency'}
+
+
+def test_sequential_wraps_around():
+    order = SequentialOrder()
+    items = candidates(3)
+    assert order.next(items, None) == '/store/0.jpg'
+    assert order.next(items, '/store/1.jpg') == '/store/2.jpg'
+    assert order.next(items, '/store/2.jpg') == '/store/0.jpg'
+    # 当前壁纸已被删除时从头开始
+    assert order.next(items, '/store/gone.jpg') == '/store/0.jpg'
+    assert order.next([], None) is None
+
+
+def test_shuffle_bag_plays_each_once_per_round():
+    random.seed(3)
+    order = ShuffleBagOrder()
+    items = candidates(10)
+    current = None
+    for _round in range(5):
+        played = []
+        for _ in range(10):
+            nxt = order.next(items, current)
+            # 跨轮时也不会连续出现同一张
+            assert nxt != current
+            played.append(nxt)
+            current = nxt
+        assert sorted(played) == sorted(path for path, _ in items)
+
+
+def test_shuffle_bag_drops_removed_wallpapers():
+    order = ShuffleBagOrder()
+    order.next(candidates(5), None)
+    remaining = candidates(5)[:2]
+    picks = {order.next(remaining, None) for _ in range(10)}
+    assert picks == {'/store/0.jpg', '/store/1.jpg'}
+
+
+def test_recency_prefers_long_unused(monkeypatch):
+    random.seed(5)
+    now = 1_000_000_000.0
+    monkeypatch.setattr(rotation.time, 'time', lambda: now)
+    items = [('/store/recent.jpg', now - 60), ('/store/old.jpg', now - 3 * 24 * 3600), ('/store/never.jpg', None)]
+    counts = Counter(RecencyWeightedOrder().next(items, None) for _ in range(2000))
+    assert counts['/store/never.jpg'] > counts['/store/old.jpg'] > counts['/store/recent.jpg']
+
+
+def test_recency_skips_current_unless_only_choice():
+    order = RecencyWeightedOrder()
+    items = candidates(2)
+    assert all(order.next(items, '/store/0.jpg') == '/store/1.jpg' for _ in range(20))
+    assert order.next(candidates(1), '/store/0.jpg') == '/store/0.jpg'
+
+
+class FakeDB:
+    def rotation_candidates(self):
+        return candidates(3)
+
+
+class FakeManager:
+    def __init__(self):
+        self.config = {'current_wallpaper': '/store/0.jpg', 'settings': {'auto_change': False}}
+        self.db = FakeDB()
+        self.applied = []
+
+    def is_video_file(self, path):
+        return False
+
+    def render_wallpaper(self, path):
+        return path + '.rendered'
+
+    def set_wallpaper(self, path, rendered_path=None):
+        time.sleep(0.002)
+        self.applied.append((path, rendered_path))
+        return True
+
+
+def test_switch_uses_prepared_image_and_records_latency(app):
+    manager = FakeManager()
+    scheduler = RotationScheduler(manager, video_wallpaper=None)
+    scheduler.order = SequentialOrder()
+    switched = []
+    scheduler.switched.connect(lambda path, latency: switched.append(path))
+    scheduler.prefetch()
+    # 后台线程渲染完成后回到界面线程
+    scheduler._on_prepared('/store/1.jpg', manager.render_wallpaper('/store/1.jpg'))
+    scheduler.switch_now()
+    assert manager.applied == [('/store/1.jpg', '/store/1.jpg.rendered')]
+    assert switched == ['/store/1.jpg']
+    stats = scheduler.latency_stats()
+    assert stats['count'] == 1 and stats['last'] >= 2
@@ -0,0 +1,95 @@
+import io
+import os
+import pytest
+from thumbnail_cache import ThumbnailCache, make_thumbnail
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / 'thumbnails'))
+    yield cache
+    cache.close()
+
+
+def reopen(cache):
+    cache.close()
+    return ThumbnailCache(cache.cache_dir)
+
+
+def test_put_then_get(cache):
+    assert cache.get('aa', (250, 120)) is None
+    cache.put('aa', (250, 120), b'jpeg-aa')
+    cache.put('aa', (64, 64), b'small-aa')
+    assert cache.get('aa', (250, 120)) == b'jpeg-aa'
+    assert cache.get('aa', (64, 64)) == b'small-aa'
+    assert ThumbnailCache.key('aa', (64, 64)) in cache
+
+
+def test_reopen_loads_index_from_pack(cache):
+    for index in range(50):
+        cache.put(f'{index:02x}', (250, 120), bytes([index]) * index)
+    cache = reopen(cache)
+    try:
+        assert len(cache) == 50
+        assert cache.get('31', (250, 120)) == bytes([49]) * 49
+    finally:
+        cache.close()
+
+
+def test_rewritten_key_uses_latest_record(cache):
+    cache.put('aa', (250, 120), b'old')
+    cache.put('aa', (250, 120), b'new')
+    cache = reopen(cache)
+    try:
+        assert cache.get('aa', (250, 120)) == b'new'
+        assert len(cache) == 1
+    finally:
+        cache.close()
+
+
+def test_truncated_tail_is_dropped(cache):
+    cache.put('aa', (250, 120), b'complete')
+    cache.put('bb', (250, 120), b'will be cut')
+    size = os.path.getsize(cache.pack_path)
+    cache.close()
+    # 模拟写入最后一条记录时崩溃
+    with open(cache.pack_path, 'r+b') as f:
+        f.truncate(size - 3)
+    cache = ThumbnailCache(cache.cache_dir)
+    try:
+        assert cache.get('aa', (250, 120)) == b'complete'
+        assert cache.get('bb', (250, 120)) is None
+        cache.put('cc', (250, 120), b'after')
+        cache = reopen(cache)
+        assert cache.get('cc', (250, 120)) == b'after'
+    finally:
+        cache.close()
+
+
+def test_compact_drops_removed_wallpapers(cache):
+    for digest in ('aa', 'bb', 'cc', 'dd'):
+        cache.put(digest, (250, 120), digest.encode() * 100)
+    before = os.path.getsize(cache.pack_path)
+    cache.compact(['aa'])
+    assert os.path.getsize(cache.pack_path) < before
+    assert cache.get('aa', (250, 120)) == b'aa' * 100
+    assert cache.get('bb', (250, 120)) is None
+    assert os.listdir(cache.cache_dir) == ['thumbnails.pack']
+
+
+def test_compact_skips_when_little_is_dead(cache):
+    for digest in ('aa', 'bb', 'cc', 'dd', 'ee'):
+        cache.put(digest, (250, 120), b'x' * 100)
+    before = os.path.getsize(cache.pack_path)
+    cache.compact(['aa', 'bb', 'cc', 'dd'])
+    assert os.path.getsize(cache.pack_path) == before
+
+
+def test_image_thumbnail_fits_size(tmp_path):
+    Image = pytest.importorskip('PIL.Image')
+    src = tmp_path / 'big.jpg'
+    Image.new('RGB', (2000, 500), (10, 200, 30)).save(src)
+    data = make_thumbnail(str(src), (250, 120))
+    with Image.open(io.BytesIO(data)) as thumb:
+        assert thumb.width == 250 and thumb.height < 120
+    assert make_thumbnail(str(tmp_path / 'missing.jpg')) is None
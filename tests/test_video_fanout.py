@@ -0,0 +1,39 @@
+from video_fanout import MAX_FRAME_PIXELS, frame_layout
+
+
+def test_span_gives_each_monitor_its_own_region():
+    rects = [(0, 0, 1920, 1080), (1920, -200, 3200, 824)]
+    size, sources = frame_layout(rects, span=True)
+    assert size == (3200, 1280)
+    assert sources == [(0, 200, 1920, 1080), (1920, 0, 1280, 1024)]
+
+
+def test_span_regions_match_monitor_size():
+    rects = [(-1920, 0, 0, 1080), (0, 0, 2560, 1440)]
+    _size, sources = frame_layout(rects, span=True)
+    assert [(w, h) for _x, _y, w, h in sources] == [(1920, 1080), (2560, 1440)]
+
+
+def test_same_size_monitors_copy_whole_frame():
+    rects = [(0, 0, 1920, 1080), (1920, 0, 3840, 1080)]
+    size, sources = frame_layout(rects, span=False)
+    assert size == (1920, 1080)
+    assert sources == [(0, 0, 1920, 1080)] * 2
+
+
+def test_other_aspect_is_center_cropped():
+    # 16:9 输出帧中取 4:3 显示器的中间部分
+    rects = [(0, 0, 1920, 1080), (1920, 0, 3200, 960)]
+    size, sources = frame_layout(rects, span=False)
+    assert size == (1920, 1080)
+    assert sources[0] == (0, 0, 1920, 1080)
+    assert sources[1] == (240, 0, 1440, 1080)
+
+
+def test_large_desktop_is_scaled_down():
+    rects = [(0, 0, 3840, 2160), (3840, 0, 7680, 2160), (7680, 0, 11520, 2160)]
+    (width, height), sources = frame_layout(rects, span=True)
+    assert width * height <= MAX_FRAME_PIXELS
+    assert width % 2 == 0 and height % 2 == 0
+    assert all(x + w <= width and y + h <= height for x, y, w, h in sources)
+    assert sources[0][2] == sources[1][2] == sources[2][2]
@@ -0,0 +1,63 @@
+import os
+import pytest
+import video_transcoder
+from video_transcoder import needs_variant, variant_path, variant_size, variants_of
+
+
+def info(width, height, fps=30.0, codec='h264'):
+    return {'width': width, 'height': height, 'fps': fps, 'codec': codec}
+
+
+def test_variant_size_fills_target_without_upscaling():
+    assert variant_size(info(3840, 2160), (1920, 1080)) == (1920, 1080)
+    # 比例不同时铺满目标，多出的一边由显示时裁掉
+    assert variant_size(info(3840, 1600), (1920, 1080)) == (2592, 1080)
+    assert variant_size(info(1280, 720), (1920, 1080)) == (1280, 720)
+
+
+def test_variant_size_is_even():
+    width, height = variant_size(info(4001, 2251), (1366, 768))
+    assert width % 2 == 0 and height % 2 == 0
+    assert width >= 1364 and height >= 766
+
+
+def test_needs_variant():
+    target = (1920, 1080)
+    assert needs_variant(info(3840, 2160), target)
+    assert needs_variant(info(1920, 1080, fps=60), target)
+    assert needs_variant(info(1920, 1080, codec='hevc'), target)
+    assert not needs_variant(info(1920, 1080), target)
+    # 略大于目标或帧率略有误差时不值得转码
+    assert not needs_variant(info(2048, 1152, fps=30.5), target)
+    # 只有一边超出时缩放后仍需铺满，不转码
+    assert not needs_variant(info(3840, 1080), target)
+
+
+def test_variants_sit_next_to_original(tmp_path):
+    original = str(tmp_path / 'clip[1].mp4')
+    assert variant_path(original, (1920, 1080)) == str(tmp_path / 'clip[1].wp1920x1080.mp4')
+    for target in ((1920, 1080), (2560, 1440)):
+        open(variant_path(original, target), 'wb').close()
+    open(str(tmp_path / 'other.wp1920x1080.mp4'), 'wb').close()
+    assert sorted(os.path.basename(p) for p in variants_of(original)) == [
+        'clip[1].wp1920x1080.mp4', 'clip[1].wp2560x1440.mp4']
+
+
+def test_opencv_transcode_caps_size_and_fps(tmp_path, monkeypatch):
+    cv2 = pytest.importorskip('cv2')
+    np = pytest.importorskip('numpy')
+    source = str(tmp_path / 'source.mp4')
+    writer = cv2.VideoWriter(source, cv2.VideoWriter_fourcc(*'mp4v'), 60, (320, 240))
+    if not writer.isOpened():
+        pytest.skip('OpenCV cannot write mp4 here')
+    for index in range(60):
+        writer.write(np.full((240, 320, 3), index * 4, dtype=np.uint8))
+    writer.release()
+
+    monkeypatch.setattr(video_transcoder, 'find_ffmpeg', lambda: None)
+    output = video_transcoder.transcode(source, (160, 120))
+    assert output == variant_path(source, (160, 120))
+    result = video_transcoder.probe(output)
+    assert (result['width'], result['height']) == (160, 120)
+    assert result['fps'] == pytest.approx(video_transcoder.MAX_FPS, abs=1)
+    assert sorted(os.listdir(tmp_path)) == ['source.mp4', 'source.wp160x120.mp4']
@@ -0,0 +1,127 @@
+import pytest
+
+# 视频壁纸处理器依赖 Windows 和 VLC 的模块，缺少时跳过（播放器本身用假对象代替）
+pytest.importorskip('win32api')
+pytest.importorskip('vlc')
+from playback_policy import PAUSE, PLAY, SLOW, STILL, THROTTLE  # noqa: E402
+from video_wallpaper import VideoWallpaper  # noqa: E402
+
+
+class FakeMedia:
+    def __init__(self, source):
+        self.source = source
+        self.options = []
+
+    def add_option(self, option):
+        self.options.append(option)
+
+
+class FakeInstance:
+    def media_new(self, source):
+        return FakeMedia(source)
+
+
+class FakePlayer:
+    def __init__(self):
+        self.paused = 0
+        self.time = 5000
+        self.seeks = []
+
+    def set_pause(self, paused):
+        self.paused = paused
+
+    def get_time(self):
+        return self.time
+
+    def set_time(self, time):
+        self.seeks.append(time)
+
+
+class FakeLoop:
+    def __init__(self):
+        self.medias = []
+        self.plays = 0
+
+    def set_media(self, media):
+        self.medias.append(media)
+
+    def play(self):
+        self.plays += 1
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def wallpaper(tmp_path):
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'')
+    vw = VideoWallpaper.__new__(VideoWallpaper)
+    vw.instance = FakeInstance()
+    vw.monitors = [{'handle': handle, 'rect': (0, 0, 1920, 1080)} for handle in (1, 2)]
+    vw.windows = {1: object(), 2: object()}
+    vw.players = {1: FakePlayer(), 2: FakePlayer()}
+    vw.loops = {1: FakeLoop(), 2: FakeLoop()}
+    vw.player_skip = {1: 0, 2: 0}
+    vw.animation = None
+    vw.shared_output = None
+    vw.settings = {}
+    vw.playback_states = {}
+    vw.governor_state = PLAY
+    vw.skip_frames = 0
+    vw.reduced_quality = False
+    vw.current_video = str(video)
+    return vw
+
+
+def skip_options(loop):
+    return [option for option in loop.medias[-1].options if option.startswith('avcodec-skip-frame')]
+
+
+def test_throttle_reloads_only_that_monitor_with_frame_skipping(wallpaper):
+    wallpaper.apply_playback_states({1: THROTTLE, 2: PLAY})
+    assert skip_options(wallpaper.loops[1]) == ['avcodec-skip-frame=1']
+    assert wallpaper.players[1].seeks == [5000]
+    assert wallpaper.players[1].paused == 0
+    assert wallpaper.loops[2].medias == []
+
+
+def test_slow_decodes_key_frames_only(wallpaper):
+    wallpaper.apply_playback_states({1: SLOW, 2: SLOW})
+    assert skip_options(wallpaper.loops[1]) == ['avcodec-skip-frame=3']
+    assert skip_options(wallpaper.loops[2]) == ['avcodec-skip-frame=3']
+
+
+def test_same_state_does_not_reload_again(wallpaper):
+    wallpaper.apply_playback_states({1: THROTTLE})
+    wallpaper.apply_playback_states({1: THROTTLE})
+    assert wallpaper.loops[1].plays == 1
+
+
+def test_back_to_play_restores_full_decoding(wallpaper):
+    wallpaper.apply_playback_states({1: THROTTLE})
+    wallpaper.apply_playback_states({1: PLAY})
+    assert wallpaper.loops[1].plays == 2
+    assert skip_options(wallpaper.loops[1]) == []
+
+
+def test_frozen_monitor_keeps_media_until_resumed(wallpaper):
+    wallpaper.apply_playback_states({1: PAUSE})
+    assert wallpaper.players[1].paused == 1
+    assert wallpaper.loops[1].medias == []
+    wallpaper.apply_playback_states({1: THROTTLE})
+    assert wallpaper.players[1].paused == 0
+    assert skip_options(wallpaper.loops[1]) == ['avcodec-skip-frame=1']
+
+
+def test_governor_level_combines_with_policy_state(wallpaper):
+    # 质量调节器已经让所有媒体跳帧，策略降低帧率时不必重新加载
+    wallpaper.skip_frames = 1
+    wallpaper.player_skip = {1: 1, 2: 1}
+    wallpaper.governor_state = THROTTLE
+    wallpaper.apply_playback_states({1: THROTTLE, 2: SLOW})
+    assert wallpaper.loops[1].medias == []
+    assert skip_options(wallpaper.loops[2]) == ['avcodec-skip-frame=3']
+    wallpaper.governor_state = STILL
+    wallpaper.apply_playback_states()
+    assert wallpaper.players[1].paused == wallpaper.players[2].paused == 1
@@ -0,0 +1,151 @@
+import random
+import wallpaper_list_model
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QPixmap
+from wallpaper_list_model import CurrentRole, WallpaperListModel
+
+
+class FakeThumbnails(QObject):
+    ready = pyqtSignal(str, bytes)
+    failed = pyqtSignal(str)
+
+    def request(self, wallpapers):
+        pass
+
+    def cancel(self, path):
+        pass
+
+
+class FakeManager:
+    def __init__(self, count):
+        self.config = {'current_wallpaper': None}
+        self.wallpapers = {i: {'id': i, 'path': f'/store/{i}.jpg', 'name': f'{i}.jpg'} for i in range(1, count + 1)}
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def query_wallpaper_ids(self, sort, descending, **filters):
+        return sorted(self.wallpapers, reverse=descending)
+
+    def get_wallpapers_by_id(self, ids):
+        return {i: self.wallpapers[i] for i in ids if i in self.wallpapers}
+
+    def add(self, wallpaper_id):
+        self.wallpapers[wallpaper_id] = {'id': wallpaper_id, 'path': f'/store/{wallpaper_id}.jpg',
+                                         'name': f'{wallpaper_id}.jpg'}
+        return self.wallpapers[wallpaper_id]
+
+
+def make_model(app, count=5, descending=False):
+    manager = FakeManager(count)
+    model = WallpaperListModel(manager, FakeThumbnails(), {'loading': QPixmap()})
+    model.reload(descending=descending)
+    return model, manager
+
+
+def assert_rows_consistent(model):
+    for row in range(model.rowCount()):
+        assert model.row_of_id(model._ids[row]) == row
+    assert model.rowCount() == len(model._row_by_id)
+
+
+def test_reload_indexes_rows(app):
+    model, _ = make_model(app)
+    assert [model.row_of_id(i) for i in range(1, 6)] == [0, 1, 2, 3, 4]
+    assert model.row_of_id(99) == -1
+
+
+def test_append_updates_rows(app):
+    model, manager = make_model(app)
+    model._on_library_event('added', manager.add(6))
+    model._on_library_event('added', manager.add(7))
+    model._flush_added()
+    assert model.rowCount() == 7
+    assert model.row_of_id(7) == 6
+    assert_rows_consistent(model)
+
+
+def test_prepend_shifts_rows(app):
+    model, manager = make_model(app, descending=True)
+    model._on_library_event('added', manager.add(6))
+    model._flush_added()
+    assert model.row_of_id(6) == 0
+    assert model.row_of_id(5) == 1
+    assert_rows_consistent(model)
+
+
+def test_remove_shifts_following_rows(app):
+    model, manager = make_model(app)
+    model._on_library_event('removed', manager.wallpapers.pop(2))
+    assert model.rowCount() == 4
+    assert model.row_of_id(2) == -1
+    assert model.row_of_id(3) == 1
+    assert_rows_consistent(model)
+
+
+def test_remove_pending_addition(app):
+    model, manager = make_model(app)
+    added = manager.add(6)
+    model._on_library_event('added', added)
+    model._on_library_event('removed', added)
+    model._flush_added()
+    assert model.rowCount() == 5
+    assert model.row_of_id(6) == -1
+    assert_rows_consistent(model)
+
+
+def test_current_marks_row(app):
+    model, manager = make_model(app)
+    model._on_library_event('current', manager.wallpapers[3])
+    assert model.data(model.index(2), CurrentRole) is True
+    model._on_library_event('current', manager.wallpapers[4])
+    assert model.data(model.index(2), CurrentRole) is False
+    assert model.data(model.index(3), CurrentRole) is True
+
+
+def test_random_edits_match_linear_search(app, monkeypatch):
+    monkeypatch.setattr(wallpaper_list_model, 'MAX_ROW_EDITS', 8)
+    rng = random.Random(1)
+    for descending in (False, True):
+        model, manager = make_model(app, count=50, descending=descending)
+        next_id = 100
+        for step in range(120):
+            if rng.random() < 0.5 and model.rowCount():
+                wallpaper_id = rng.choice(list(model._ids))
+                model._on_library_event('removed', manager.wallpapers.pop(wallpaper_id))
+            else:
+                for _ in range(rng.randint(1, 3)):
+                    model._on_library_event('added', manager.add(next_id))
+                    next_id += 1
+                model._flush_added()
+            # 只查一部分行，其余的行号留到之后补上偏移
+            ids = list(model._ids)
+            for wallpaper_id in rng.sample(ids, min(3, len(ids))):
+                assert model.row_of_id(wallpaper_id) == ids.index(wallpaper_id)
+        assert_rows_consistent(model)
+
+
+def test_row_of_path_follows_cached_rows(app):
+    model, manager = make_model(app)
+    assert model.row_of('/store/3.jpg') == -1
+    model.wallpaper(0)
+    assert model.row_of('/store/3.jpg') == 2
+    moved = dict(manager.wallpapers[3], path='/store/moved.jpg')
+    model._on_library_event('updated', moved)
+    assert model.row_of('/store/3.jpg') == -1
+    assert model.row_of('/store/moved.jpg') == 2
+    model._on_library_event('removed', manager.wallpapers.pop(1))
+    assert model.row_of('/store/moved.jpg') == 1
+    assert '/store/1.jpg' not in model._id_by_path
+
+
+def test_evicted_rows_leave_path_index(app, monkeypatch):
+    monkeypatch.setattr(wallpaper_list_model, 'PAGE_SIZE', 2)
+    monkeypatch.setattr(wallpaper_list_model, 'MAX_PAGES', 1)
+    model, _manager = make_model(app)
+    model.wallpaper(0)
+    model.wallpaper(4)
+    assert set(model._id_by_path) == {w['path'] for w in model._rows.values()}
+    assert model.row_of('/store/1.jpg') == -1
+    assert model.row_of('/store/5.jpg') == 4
@@ -0,0 +1,89 @@
+import os
+import threading
+import pytest
+
+pytest.importorskip('numpy')
+Image = pytest.importorskip('PIL.Image')
+import wallpaper_renderer
+from wallpaper_renderer import WallpaperRenderer, render_image
+
+
+def two_halves(size=(200, 100)):
+    """左半红、右半蓝的测试图"""
+    img = Image.new('RGB', size, (0, 0, 255))
+    img.paste((255, 0, 0), (0, 0, size[0] // 2, size[1]))
+    return img
+
+
+def test_stretch_ignores_aspect():
+    out = render_image(two_halves(), (50, 100), 'stretch')
+    assert out.size == (50, 100)
+    assert out.getpixel((5, 50)) == (255, 0, 0)
+    assert out.getpixel((45, 50)) == (0, 0, 255)
+
+
+def test_fill_crops_center():
+    # 目标比源窄，只保留中间一块：左右两种颜色都在，但不留黑边
+    out = render_image(two_halves(), (100, 100), 'fill')
+    assert out.size == (100, 100)
+    assert out.getpixel((2, 2)) == (255, 0, 0)
+    assert out.getpixel((97, 97)) == (0, 0, 255)
+
+
+def test_fit_letterboxes():
+    out = render_image(two_halves(), (100, 100), 'fit')
+    assert out.size == (100, 100)
+    # 缩放为 100x50，上下各 25 像素黑边
+    assert out.getpixel((50, 5)) == (0, 0, 0)
+    assert out.getpixel((50, 94)) == (0, 0, 0)
+    assert out.getpixel((10, 50)) == (255, 0, 0)
+
+
+def test_center_keeps_pixels_and_pads():
+    img = two_halves((20, 10))
+    out = render_image(img, (40, 20), 'center')
+    assert out.size == (40, 20)
+    assert out.getpixel((0, 0)) == (0, 0, 0)
+    assert out.getpixel((10, 5)) == (255, 0, 0)
+    assert out.getpixel((29, 14)) == (0, 0, 255)
+    # 源比目标大时居中裁剪
+    assert render_image(two_halves((400, 200)), (10, 10), 'center').getpixel((0, 0)) == (255, 0, 0)
+
+
+def test_render_is_cached(tmp_path):
+    src = tmp_path / 'src.png'
+    two_halves().save(src)
+    renderer = WallpaperRenderer(str(tmp_path / 'cache'))
+    first = renderer.render(str(src), (64, 32), 'fill', digest='abc')
+    assert renderer.render(str(src), (64, 32), 'fill', digest='abc') == first
+    assert Image.open(first).size == (64, 32)
+
+
+def test_concurrent_renders_do_not_collide(tmp_path, monkeypatch):
+    src = tmp_path / 'src.png'
+    two_halves().save(src)
+    renderer = WallpaperRenderer(str(tmp_path / 'cache'))
+    # 两个线程都写完临时文件后才允许重命名，模拟同时渲染同一个输出
+    barrier = threading.Barrier(2)
+    original = os.replace
+
+    def replace(src, dst):
+        barrier.wait(timeout=5)
+        original(src, dst)
+
+    monkeypatch.setattr(wallpaper_renderer.os, 'replace', replace)
+    errors = []
+
+    def run():
+        try:
+            renderer.render(str(src), (64, 32), 'fill', digest='same')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(renderer.cache_dir) == ['same_64x32_fill.jpg']
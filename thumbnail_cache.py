@@ -0,0 +1,277 @@
+import io
+import os
+import mmap
+import struct
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from media_scanner import VIDEO_EXTENSIONS
+
+# 管理页缩略图尺寸
+THUMB_SIZE = (250, 120)
+THUMB_QUALITY = 85
+# 失效记录超过这个比例时压缩缓存文件
+COMPACT_RATIO = 0.3
+
+# 记录头：魔数, 键长度, 宽, 高, 数据长度；之后依次是键和 JPEG 数据
+_RECORD = struct.Struct('<4sHHHI')
+_MAGIC = b'THMB'
+
+
+def _image_thumbnail(path: str, size: Tuple[int, int]):
+    """Pillow 的 thumbnail 会先用 draft 模式让 JPEG 按 1/2、1/4、1/8 解码，不做全尺寸解码"""
+    from PIL import Image, ImageOps
+    with Image.open(path) as img:
+        img.draft('RGB', size)
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(size, Image.BICUBIC, reducing_gap=2.0)
+        return img.convert('RGB')
+
+
+# 视频缩略图的采样位置（占时长的比例），跳过片头片尾；按顺序向后跳转比向前跳转快得多
+VIDEO_SAMPLE_POSITIONS = (0.15, 0.3, 0.45, 0.6, 0.75, 0.9)
+# 生成一张视频缩略图的时间上限（秒），预计下一次取样会超时就停止
+VIDEO_TIME_BUDGET = 0.15
+# 平均亮度低于或高于这个范围的帧（黑场、白场）几乎不会被选中
+DARK_LEVEL = 0.08
+BRIGHT_LEVEL = 0.95
+# 拉普拉斯方差达到这个值时清晰度记满分
+SHARPNESS_NORM = 500.0
+
+
+def score_frames(frames):
+    """给一组同尺寸的小图（N, h, w, 3）打分，返回每帧的分数：亮度适中、信息熵高、清晰的帧得分高"""
+    import numpy as np
+    frames = np.asarray(frames, dtype=np.float32)
+    gray = frames @ np.array([0.114, 0.587, 0.299], dtype=np.float32)  # BGR 转亮度
+    count = gray.shape[0]
+    mean = gray.mean(axis=(1, 2)) / 255
+    brightness = 1 - np.abs(mean - 0.5) * 2
+
+    # 每帧 256 级直方图的信息熵（归一化到 0..1）
+    levels = np.clip(gray, 0, 255).astype(np.int64).reshape(count, -1)
+    offsets = (np.arange(count) * 256)[:, None]
+    hist = np.bincount((levels + offsets).ravel(), minlength=count * 256).reshape(count, 256)
+    p = hist / levels.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.nansum(np.where(p > 0, p * np.log2(p), 0), axis=1) / 8
+
+    # 拉普拉斯方差衡量清晰度
+    lap = (4 * gray[:, 1:-1, 1:-1] - gray[:, :-2, 1:-1] - gray[:, 2:, 1:-1]
+           - gray[:, 1:-1, :-2] - gray[:, 1:-1, 2:])
+    sharpness = np.minimum(1, lap.var(axis=(1, 2)) / SHARPNESS_NORM)
+
+    score = 0.4 * entropy + 0.3 * sharpness + 0.3 * brightness
+    return np.where((mean < DARK_LEVEL) | (mean > BRIGHT_LEVEL), score * 0.1, score)
+
+
+def _shrink(frame, size: Tuple[int, int]):
+    import cv2
+    h, w = frame.shape[:2]
+    scale = min(size[0] / w, size[1] / h, 1.0)
+    return cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def representative_frame(path: str, size: Tuple[int, int], positions=VIDEO_SAMPLE_POSITIONS,
+                         time_budget: float = VIDEO_TIME_BUDGET):
+    """在视频中取样若干帧，缩小后打分，返回得分最高的一帧（BGR 数组），失败时返回 None
+
+    每个位置跳转后只取一帧（跳转从前一个关键帧开始解码，耗时取决于关键帧间隔），
+    按已用时间和最慢一次取样的耗时估计，下一次会超时就停止，从已取到的帧中选。
+    """
+    import cv2
+    import numpy as np
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        if not cap.isOpened():
+            return None
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        slowest = 0.0
+        for position in (positions if frame_count > len(positions) else ()):
+            sample_start = time.perf_counter()
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_count * position))
+            # grab 只读取和解码，retrieve 才做颜色转换
+            if cap.grab():
+                ok, frame = cap.retrieve()
+                if ok:
+                    frames.append(_shrink(frame, size))
+            now = time.perf_counter()
+            slowest = max(slowest, now - sample_start)
+            if now - start + slowest > time_budget:
+                break
+        if not frames:
+            # 帧数未知或无法跳转的视频退回第一帧
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = cap.read()
+            if ok:
+                frames.append(_shrink(frame, size))
+    finally:
+        cap.release()
+    if len(frames) <= 1:
+        return frames[0] if frames else None
+    return frames[int(np.argmax(score_frames(frames)))]
+
+
+def _video_thumbnail(path: str, size: Tuple[int, int]):
+    """视频取最有代表性的一帧（跳过片头的黑场）"""
+    import cv2
+    from PIL import Image
+    frame = representative_frame(path, size)
+    if frame is None:
+        return None
+    return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+def make_thumbnail(path: str, size: Tuple[int, int] = THUMB_SIZE) -> Optional[bytes]:
+    """生成缩略图的 JPEG 数据，失败时返回 None"""
+    try:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            img = _video_thumbnail(path, size)
+        else:
+            img = _image_thumbnail(path, size)
+        if img is None:
+            return None
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=THUMB_QUALITY)
+        return buffer.getvalue()
+    except Exception as e:
+        print(f"Error creating thumbnail for {path}: {e}")
+        return None
+
+
+class ThumbnailCache:
+    """持久化缩略图缓存
+
+    所有缩略图以 JPEG 记录追加写入同一个文件，按 (内容哈希, 尺寸) 索引。
+    启动时把整个文件映射到内存，扫描一遍记录头即可建立索引，读取缩略图只是内存切片。
+    文件末尾的不完整记录（写入时崩溃）在打开时截掉。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self.pack_path = os.path.join(cache_dir, 'thumbnails.pack')
+        self._lock = threading.RLock()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._map: Optional[mmap.mmap] = None
+        self._file = None
+        self._open()
+
+    @staticmethod
+    def key(digest: str, size: Tuple[int, int]) -> str:
+        return f"{digest}_{size[0]}x{size[1]}"
+
+    def _open(self):
+        self._file = open(self.pack_path, 'a+b')
+        self._remap()
+        end = self._scan()
+        if end < self._file_size():
+            # 截掉损坏的尾部
+            self._close_map()
+            self._file.truncate(end)
+            self._remap()
+
+    def _file_size(self) -> int:
+        return os.fstat(self._file.fileno()).st_size
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _remap(self):
+        self._close_map()
+        if self._file_size() > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _scan(self) -> int:
+        """扫描全部记录建立索引，返回最后一条完整记录的结束位置"""
+        self._index.clear()
+        data = self._map
+        if data is None:
+            return 0
+        offset, length = 0, len(data)
+        while offset + _RECORD.size <= length:
+            magic, key_len, _w, _h, data_len = _RECORD.unpack_from(data, offset)
+            end = offset + _RECORD.size + key_len + data_len
+            if magic != _MAGIC or end > length:
+                break
+            key = data[offset + _RECORD.size:offset + _RECORD.size + key_len].decode('ascii')
+            # 同一个键被重新写入时以最后一条为准
+            self._index[key] = (offset + _RECORD.size + key_len, data_len)
+            offset = end
+        return offset
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, digest: str, size: Tuple[int, int] = THUMB_SIZE) -> Optional[bytes]:
+        """读取缩略图的 JPEG 数据，没有缓存时返回 None"""
+        with self._lock:
+            entry = self._index.get(self.key(digest, size))
+            if entry is None:
+                return None
+            offset, length = entry
+            if self._map is None or offset + length > len(self._map):
+                # 其他线程追加后映射还没有更新
+                self._remap()
+            return self._map[offset:offset + length]
+
+    def put(self, digest: str, size: Tuple[int, int], data: bytes):
+        """追加一条缩略图记录"""
+        key = self.key(digest, size)
+        key_bytes = key.encode('ascii')
+        header = _RECORD.pack(_MAGIC, len(key_bytes), size[0], size[1], len(data))
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(header + key_bytes + data)
+            self._file.flush()
+            self._index[key] = (offset + _RECORD.size + len(key_bytes), len(data))
+
+    def get_or_create(self, path: str, digest: str, size: Tuple[int, int] = THUMB_SIZE) -> Optional[bytes]:
+        data = self.get(digest, size)
+        if data is None:
+            data = make_thumbnail(path, size)
+            if data is not None:
+                self.put(digest, size, data)
+        return data
+
+    def compact(self, digests: Iterable[str]):
+        """丢弃不在 digests（get/put 使用的键）中的缩略图；失效数据不多时什么也不做"""
+        keep = set(digests)
+        with self._lock:
+            live = {key: entry for key, entry in self._index.items() if key.rsplit('_', 1)[0] in keep}
+            total = self._file_size()
+            used = sum(length + _RECORD.size + len(key) for key, (_offset, length) in live.items())
+            if total == 0 or (total - used) / total < COMPACT_RATIO:
+                return
+            self._remap()
+            tmp_path = self.pack_path + '.tmp'
+            with open(tmp_path, 'wb') as out:
+                for key, (offset, length) in live.items():
+                    width, height = (int(v) for v in key.rsplit('_', 1)[1].split('x'))
+                    key_bytes = key.encode('ascii')
+                    out.write(_RECORD.pack(_MAGIC, len(key_bytes), width, height, length))
+                    out.write(key_bytes)
+                    out.write(self._map[offset:offset + length])
+                out.flush()
+                os.fsync(out.fileno())
+            # Windows 上被映射或打开的文件不能替换，先全部关闭
+            self._close_map()
+            self._file.close()
+            os.replace(tmp_path, self.pack_path)
+            self._open()
+
+    def close(self):
+        with self._lock:
+            self._close_map()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
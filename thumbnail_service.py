@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# 生成缩略图的线程数（Pillow 和 OpenCV 解码时释放 GIL）
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+
+class ThumbnailService(QObject):
+    """在后台线程中生成缩略图，通过信号把结果送回界面线程
+
+    界面只请求当前可见（以及即将可见）的条目，按请求顺序优先处理；
+    重新请求时不在新列表中的条目会被取消，已删除或滚出视野的条目不再浪费解码时间。
+    """
+
+    # 缩略图完成：壁纸路径, JPEG 数据
+    ready = pyqtSignal(str, bytes)
+    # 缩略图生成失败：壁纸路径
+    failed = pyqtSignal(str)
+
+    def __init__(self, wallpaper_manager, parent=None, max_workers: int = DEFAULT_WORKERS):
+        super().__init__(parent)
+        self.wallpaper_manager = wallpaper_manager
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._pending: Dict[str, Dict] = {}
+        self._stopped = False
+        self._workers = [
+            threading.Thread(target=self._worker, daemon=True) for _ in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def request(self, wallpapers: Iterable[Dict]):
+        """按顺序请求一批缩略图（越靠前越优先），取消不在这批中的旧请求"""
+        with self._cond:
+            self._pending = {}
+            for wallpaper in wallpapers:
+                self._pending.setdefault(wallpaper['path'], wallpaper)
+            self._queue = deque(self._pending)
+            self._cond.notify_all()
+
+    def cancel(self, path: Optional[str] = None):
+        """取消指定壁纸的请求；不指定时取消全部"""
+        with self._cond:
+            if path is None:
+                self._pending.clear()
+                self._queue.clear()
+            else:
+                # 队列中的旧条目在取出时跳过
+                self._pending.pop(path, None)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def _next(self) -> Optional[Dict]:
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                while self._queue:
+                    path = self._queue.popleft()
+                    wallpaper = self._pending.pop(path, None)
+                    if wallpaper is not None:
+                        return wallpaper
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            wallpaper = self._next()
+            if wallpaper is None:
+                return
+            data = self.wallpaper_manager.get_thumbnail(wallpaper)
+            if data:
+                self.ready.emit(wallpaper['path'], bytes(data))
+            else:
+                self.failed.emit(wallpaper['path'])
@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+from PyQt6.QtCore import Qt, QObject, QRect, pyqtSignal
+from PyQt6.QtGui import QColor, QImage, QPainter
+from PyQt6.QtWidgets import QVBoxLayout, QWidget
+from playback_policy import FROZEN_STATES, PLAY, should_present
+
+# 解码输出帧的像素上限（两块 4K 屏拼接），超出时等比缩小，由各窗口放大
+MAX_FRAME_PIXELS = 3840 * 2160 * 2
+
+
+def _centered(width: int, height: int, aspect_w: int, aspect_h: int) -> Tuple[int, int, int, int]:
+    """width x height 中间与 aspect_w:aspect_h 同比例的最大区域"""
+    scale = min(width / aspect_w, height / aspect_h)
+    w, h = min(width, round(aspect_w * scale)), min(height, round(aspect_h * scale))
+    return (width - w) // 2, (height - h) // 2, w, h
+
+
+def frame_layout(rects: List[Tuple[int, int, int, int]], span: bool):
+    """解码输出尺寸和每个显示器在输出帧中的源区域
+
+    跨屏时输出整个虚拟桌面，每个显示器只取自己那一块；
+    每屏相同时输出最大显示器的尺寸，各显示器取中间与自己同比例的部分。
+    VLC 按输出尺寸裁剪缩放，与输出同尺寸的显示器绘制时只是复制，不再逐帧缩放。
+    """
+    if span:
+        left = min(r[0] for r in rects)
+        top = min(r[1] for r in rects)
+        width = max(r[2] for r in rects) - left
+        height = max(r[3] for r in rects) - top
+        sources = [(r[0] - left, r[1] - top, r[2] - r[0], r[3] - r[1]) for r in rects]
+    else:
+        width, height = max(((r[2] - r[0], r[3] - r[1]) for r in rects), key=lambda s: s[0] * s[1])
+        sources = [_centered(width, height, r[2] - r[0], r[3] - r[1]) for r in rects]
+    scale = min(1.0, (MAX_FRAME_PIXELS / (width * height)) ** 0.5)
+    if scale < 1.0:
+        # 按取偶后的实际比例缩放源区域，保证不超出输出帧
+        scaled = int(width * scale) & ~1, int(height * scale) & ~1
+        sx, sy = scaled[0] / width, scaled[1] / height
+        sources = [(int(x * sx), int(y * sy), int(w * sx), int(h * sy)) for x, y, w, h in sources]
+        width, height = scaled
+    return (width, height), sources
+
+
+class FanoutView(QWidget):
+    """显示共享帧中属于本显示器的区域"""
+
+    def __init__(self, output: 'SharedVideoOutput', source: Tuple[int, int, int, int], parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.output = output
+        # 源区域由 frame_layout 预先算好，与窗口比例相同
+        self.source = QRect(*source)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        image = self.output.front_image()
+        if image is None:
+            painter.fillRect(self.rect(), QColor(0, 0, 0))
+        else:
+            # 源区域与窗口同尺寸时只是复制，否则只缩放这一块
+            painter.drawImage(self.rect(), image, self.source)
+        painter.end()
+
+
+class SharedVideoOutput(QObject):
+    """一个 VLC 播放器解码，帧分发到所有显示器窗口
+
+    VLC 按输出尺寸解码并缩放一次，写入内存帧缓冲区；每个显示器窗口只绘制自己的区域。
+    解码器、缓冲区和缩放都只有一份，显示器增加时开销基本不变。
+    """
+
+    # 新的一帧已解码完成（从 VLC 的解码线程发出，排队到界面线程）
+    frame_ready = pyqtSignal()
+
+    def __init__(self, instance, windows: List[QWidget], rects: List[Tuple[int, int, int, int]],
+                 span: bool = False, parent=None):
+        super().__init__(parent)
+        (self.width, self.height), sources = frame_layout(rects, span)
+        # 三块缓冲区：解码写入一块、等待显示一块、界面正在绘制一块，互不覆盖
+        self._buffers = [np.zeros((self.height, self.width, 4), dtype=np.uint8) for _ in range(3)]
+        # QImage 直接引用缓冲区内存，不复制
+        self._images = [QImage(buf.data, self.width, self.height, self.width * 4, QImage.Format.Format_RGB32)
+                        for buf in self._buffers]
+        self._mutex = threading.Lock()
+        self._ready, self._front = 1, 2
+        self._has_ready = False
+        self._has_frame = False
+
+        self.views: List[FanoutView] = []
+        # 每个窗口的播放状态和上次绘制的时间（由播放策略设置）
+        self._view_states: List[str] = []
+        self._last_present: List[float] = []
+        for window, source in zip(windows, sources):
+            view = FanoutView(self, source, window)
+            layout = window.layout() or QVBoxLayout(window)
+            layout.setContentsMargins(0, 0, 0, 0)
+            layout.addWidget(view)
+            view.show()
+            self.views.append(view)
+            self._view_states.append(PLAY)
+            self._last_present.append(0.0)
+        self.frame_ready.connect(self._present)
+
+        import vlc
+        self.player = instance.media_player_new()
+        # 回调对象必须一直持有，否则会被回收
+        self._lock_cb = vlc.CallbackDecorators.VideoLockCb(self._lock)
+        self._unlock_cb = vlc.CallbackDecorators.VideoUnlockCb(self._unlock)
+        self._display_cb = vlc.CallbackDecorators.VideoDisplayCb(self._display)
+        self.player.video_set_callbacks(self._lock_cb, self._unlock_cb, self._display_cb, None)
+        self.player.video_set_format('RV32', self.width, self.height, self.width * 4)
+        # 按输出比例裁剪后再缩放，画面铺满不变形
+        self.player.video_set_crop_geometry(f"{self.width}:{self.height}")
+
+    def _lock(self, _opaque, planes):
+        # 解码线程：写入既不在显示也不在等待显示的那块缓冲区，返回其编号（从 1 开始）
+        with self._mutex:
+            index = 3 - self._ready - self._front
+        planes[0] = self._buffers[index].ctypes.data
+        return index + 1
+
+    def _unlock(self, _opaque, _picture, _planes):
+        pass
+
+    def _display(self, _opaque, picture):
+        # 解码线程：写好的缓冲区变为待显示，被替换掉的那块用来写下一帧
+        with self._mutex:
+            self._ready = picture - 1
+            self._has_ready = True
+        self.frame_ready.emit()
+
+    def _present(self):
+        with self._mutex:
+            if not self._has_ready:
+                return
+            self._front, self._ready = self._ready, self._front
+            self._has_ready = False
+            self._has_frame = True
+        now = time.monotonic()
+        for i, view in enumerate(self.views):
+            if should_present(self._view_states[i], self._last_present[i], now):
+                self._last_present[i] = now
+                view.update()
+
+    def set_view_states(self, states: List[str]):
+        """按窗口顺序设置播放状态；所有窗口都停住时暂停解码，恢复时从暂停处继续"""
+        self._view_states = list(states) + [PLAY] * (len(self.views) - len(states))
+        try:
+            self.player.set_pause(1 if all(state in FROZEN_STATES for state in self._view_states) else 0)
+        except Exception as e:
+            print(f"Error pausing shared video output: {e}")
+
+    def front_image(self) -> Optional[QImage]:
+        """界面线程当前显示的帧"""
+        return self._images[self._front] if self._has_frame else None
+
+    def release(self):
+        try:
+            self.player.stop()
+            self.player.release()
+        except Exception as e:
+            print(f"Error releasing shared video output: {e}")
+        for view in self.views:
+            view.hide()
+            view.deleteLater()
+        self.views.clear()
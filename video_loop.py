@@ -0,0 +1,88 @@
+import vlc
+from PyQt6.QtCore import Qt, QObject, pyqtSignal
+
+# 本地文件的读取缓冲（毫秒）；VLC 默认 300 毫秒，每次循环重新开始读取时都要先填满
+FILE_CACHING = 50
+
+# 转发到界面线程的 VLC 事件
+_NEXT_ITEM = 0
+_ERROR = 1
+
+
+def loop_media(instance, source: str):
+    """创建循环播放用的媒体对象；循环由 LoopingPlayer 负责，不再添加 input-repeat"""
+    media = instance.media_new(source)
+    media.add_option(f'file-caching={FILE_CACHING}')
+    return media
+
+
+class LoopingPlayer(QObject):
+    """用 VLC 的媒体列表循环模式无缝循环播放一个视频
+
+    媒体列表只有一项，播放到结尾时由 VLC 内部直接从头开始：不需要在 VLC 的事件线程里
+    调用 set_position / play，也不会在每次循环时给媒体追加选项。
+    同一个播放器的视频输出在两次播放之间保留，接缝处停留在最后一帧而不是黑屏。
+    VLC 事件只在事件线程里转发为 Qt 信号，所有对播放器的操作都在界面线程中进行。
+    """
+
+    # 又从头播放了一遍（参数为已循环的次数）
+    looped = pyqtSignal(int)
+    _vlc_event = pyqtSignal(int)
+
+    def __init__(self, instance, player, parent=None):
+        super().__init__(parent)
+        self.instance = instance
+        self.player = player
+        self.loops = 0
+        self._started = False
+        self.media_list = None
+        self.list_player = instance.media_list_player_new()
+        self.list_player.set_media_player(player)
+        self.list_player.set_playback_mode(vlc.PlaybackMode.loop)
+        self._vlc_event.connect(self._on_vlc_event, Qt.ConnectionType.QueuedConnection)
+        self._list_events = self.list_player.event_manager()
+        self._list_events.event_attach(vlc.EventType.MediaListPlayerNextItemSet,
+                                       lambda _event: self._vlc_event.emit(_NEXT_ITEM))
+        self._player_events = player.event_manager()
+        self._player_events.event_attach(vlc.EventType.MediaPlayerEncounteredError,
+                                         lambda _event: self._vlc_event.emit(_ERROR))
+
+    def set_media(self, media):
+        """替换要循环的媒体（之后调用 play 从头播放）；原来的媒体列表由列表播放器释放引用"""
+        old, self.media_list = self.media_list, self.instance.media_list_new()
+        self.media_list.add_media(media)
+        self.list_player.set_media_list(self.media_list)
+        if old:
+            old.release()
+
+    def play(self):
+        self._started = False
+        self.loops = 0
+        self.list_player.play()
+
+    def _on_vlc_event(self, event: int):
+        if event == _NEXT_ITEM:
+            # 第一次是开始播放，之后每次都是回到开头
+            if self._started:
+                self.loops += 1
+                self.looped.emit(self.loops)
+            self._started = True
+        elif event == _ERROR:
+            print("Error playing looped video, restarting")
+            try:
+                self.list_player.play_item_at_index(0)
+            except Exception as e:
+                print(f"Error restarting looped video: {e}")
+
+    def stop(self):
+        """停止循环并释放媒体列表（播放器本身由调用者释放）"""
+        try:
+            self._list_events.event_detach(vlc.EventType.MediaListPlayerNextItemSet)
+            self._player_events.event_detach(vlc.EventType.MediaPlayerEncounteredError)
+            self.list_player.stop()
+            self.list_player.release()
+            if self.media_list:
+                self.media_list.release()
+        except Exception as e:
+            print(f"Error stopping looped video: {e}")
+        self.media_list = None
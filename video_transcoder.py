@@ -0,0 +1,186 @@
+import os
+import glob
+import shutil
+import subprocess
+import time
+from typing import Dict, Optional, Tuple
+
+# 壁纸用转码版本的最高帧率
+MAX_FPS = 30
+# 转码版本与原文件放在一起，文件名为 <原文件名>.wp<宽>x<高>.mp4
+VARIANT_TAG = 'wp'
+# 解码代价高的编码（HEVC、VP9、AV1），即使尺寸和帧率合适也转码
+HEAVY_CODECS = ('hevc', 'h265', 'hev1', 'hvc1', 'vp90', 'vp09', 'av01')
+# 分辨率超过目标这么多时才值得转码
+SIZE_TOLERANCE = 1.1
+# 测量解码耗时读取的帧数
+MEASURE_FRAMES = 120
+
+
+def find_ffmpeg() -> Optional[str]:
+    return shutil.which('ffmpeg')
+
+
+def variant_path(path: str, target: Tuple[int, int]) -> str:
+    return f"{os.path.splitext(path)[0]}.{VARIANT_TAG}{target[0]}x{target[1]}.mp4"
+
+
+def variants_of(path: str):
+    """原文件的所有转码版本"""
+    return glob.glob(glob.escape(os.path.splitext(path)[0]) + f".{VARIANT_TAG}*x*.mp4")
+
+
+def probe(path: str) -> Optional[Dict]:
+    """读取视频的尺寸、帧率、帧数和编码"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC) or 0)
+        codec = ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ').lower()
+        return {
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': float(cap.get(cv2.CAP_PROP_FPS) or 0),
+            'frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+            'codec': codec,
+        }
+    finally:
+        cap.release()
+
+
+def variant_size(info: Dict, target: Tuple[int, int]) -> Tuple[int, int]:
+    """刚好铺满目标的尺寸（只缩小不放大，编码器要求偶数）"""
+    scale = min(1.0, max(target[0] / info['width'], target[1] / info['height']))
+    width, height = round(info['width'] * scale), round(info['height'] * scale)
+    return max(2, width - width % 2), max(2, height - height % 2)
+
+
+def needs_variant(info: Dict, target: Tuple[int, int]) -> bool:
+    """分辨率明显大于目标、帧率超过上限或编码解码代价高时需要转码"""
+    too_large = (info['width'] > target[0] * SIZE_TOLERANCE and info['height'] > target[1] * SIZE_TOLERANCE)
+    return too_large or info['fps'] > MAX_FPS + 1 or info['codec'] in HEAVY_CODECS
+
+
+def _ffmpeg_transcode(ffmpeg: str, path: str, output: str, size: Tuple[int, int], fps: float) -> bool:
+    """H.264 fastdecode（不用 CABAC 和去块滤波），固定间隔的封闭 GOP，首帧为关键帧，去掉音轨"""
+    gop = max(1, round(fps * 2))
+    command = [
+        ffmpeg, '-y', '-loglevel', 'error', '-i', path,
+        '-an', '-sn', '-map_metadata', '-1',
+        '-vf', f"scale={size[0]}:{size[1]}:flags=area,fps={fps:g}",
+        '-c:v', 'libx264', '-preset', 'medium', '-tune', 'fastdecode', '-profile:v', 'main',
+        '-pix_fmt', 'yuv420p', '-crf', '20',
+        '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0', '-flags', '+cgop',
+        '-movflags', '+faststart', output,
+    ]
+    kwargs = {}
+    if os.name == 'nt':
+        # 空闲优先级运行，不影响前台程序；不弹出控制台窗口
+        kwargs['creationflags'] = 0x00000040 | 0x08000000
+    else:
+        kwargs['preexec_fn'] = lambda: os.nice(19)
+    result = subprocess.run(command, capture_output=True, **kwargs)
+    if result.returncode != 0:
+        print(f"Error transcoding {path}: {result.stderr.decode(errors='replace').strip()}")
+        return False
+    return True
+
+
+def _opencv_transcode(path: str, output: str, size: Tuple[int, int], src_fps: float, fps: float) -> bool:
+    """没有 ffmpeg 时用 OpenCV 转码（MPEG-4 Part 2，解码代价低；OpenCV 不写音轨）"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    try:
+        if not cap.isOpened() or not writer.isOpened():
+            return False
+        # 按时间戳丢帧把帧率降到上限
+        step = src_fps / fps if src_fps > fps else 1.0
+        next_index = 0.0
+        index = 0
+        while cap.grab():
+            if index >= next_index:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+                next_index += step
+            index += 1
+        return True
+    finally:
+        cap.release()
+        writer.release()
+
+
+def transcode(path: str, target: Tuple[int, int], info: Optional[Dict] = None) -> Optional[str]:
+    """生成与目标显示器匹配的转码版本，返回其路径；失败时返回 None"""
+    info = info or probe(path)
+    if not info or not info['width'] or not info['height']:
+        return None
+    output = variant_path(path, target)
+    size = variant_size(info, target)
+    fps = min(info['fps'] or MAX_FPS, MAX_FPS)
+    tmp_path = output + '.tmp.mp4'
+    ffmpeg = find_ffmpeg()
+    try:
+        if ffmpeg:
+            ok = _ffmpeg_transcode(ffmpeg, path, tmp_path, size, fps)
+        else:
+            ok = _opencv_transcode(path, tmp_path, size, info['fps'] or fps, fps)
+        if not ok:
+            return None
+        os.replace(tmp_path, output)
+        return output
+    except Exception as e:
+        print(f"Error transcoding {path}: {e}")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def decode_cost(path: str, frames: int = MEASURE_FRAMES) -> Optional[float]:
+    """顺序解码若干帧，返回平均每帧占用的 CPU 时间（毫秒）"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        start = time.process_time()
+        count = 0
+        while count < frames and cap.grab():
+            count += 1
+        if not count:
+            return None
+        return (time.process_time() - start) * 1000 / count
+    finally:
+        cap.release()
+
+
+def cost_report(original: str, variant: str) -> Dict:
+    """转码前后每帧解码 CPU 时间；播放时每秒的解码开销还要乘以各自的帧率"""
+    before, after = probe(original) or {}, probe(variant) or {}
+    report = {
+        'original': original,
+        'variant': variant,
+        'before': {'size': (before.get('width'), before.get('height')), 'fps': before.get('fps'),
+                   'ms_per_frame': decode_cost(original)},
+        'after': {'size': (after.get('width'), after.get('height')), 'fps': after.get('fps'),
+                  'ms_per_frame': decode_cost(variant)},
+    }
+    for side in ('before', 'after'):
+        ms, fps = report[side]['ms_per_frame'], report[side]['fps']
+        report[side]['ms_per_second'] = ms * fps if ms is not None and fps else None
+    return report
+
+
+def format_report(report: Dict) -> str:
+    def side(values):
+        ms = values['ms_per_frame']
+        per_second = values['ms_per_second']
+        return (f"{values['size'][0]}x{values['size'][1]}@{values['fps'] or 0:.0f} "
+                f"{ms if ms is not None else float('nan'):.2f} ms/frame "
+                f"({per_second if per_second is not None else float('nan'):.0f} ms CPU/s)")
+    return f"{os.path.basename(report['original'])}: {side(report['before'])} -> {side(report['after'])}"
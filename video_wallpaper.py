@@ -10,20 +10,52 @@ import numpy as np
 from PyQt6.QtWidgets import QWidget
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QImage, QPixmap
+from cache_manager import CacheManager
+from animated_wallpaper import AnimationPlayer
+from video_fanout import SharedVideoOutput, frame_layout
+from video_transcoder import transcode, variant_path
+from thumbnail_cache import representative_frame
+from playback_policy import FROZEN_STATES, PLAY, STATE_SKIP_LEVELS, strictest
+from video_loop import LoopingPlayer, loop_media
+
+# 视频缩略图在统一缓存中的命名空间
+VIDEO_THUMBNAIL_NAMESPACE = 'video_thumbnails'
+# 降低画质时播放的转码版本相对目标尺寸的比例
+REDUCED_SCALE = 0.5
 
 class VideoWallpaper:
-    def __init__(self):
+    def __init__(self, cache=None):
         # 初始化VLC实例
         self.instance = vlc.Instance()
         self.players = {}  # 每个显示器一个播放器
         self.current_video = None
         self.windows = {}  # 每个显示器一个窗口
-        self.event_managers = {}  # 初始化事件管理器字典
+        self.loops = {}  # 每个播放器的循环控制（与 players 同键）
         self.monitors = []  # 初始化显示器列表
         self.is_24h = True
         
-        # 缩略图缓存
-        self._thumbnail_cache = {}
+        # 缩略图缓存（按字节数计入统一缓存的上限）
+        self.cache = cache or CacheManager()
+
+        # 预先打开并解析的下一个视频：(路径, [每个显示器一个媒体对象])
+        self._prepared = None
+
+        # 正在播放的动画壁纸（GIF / APNG / WebP）
+        self.animation = None
+
+        # 多显示器共用一个解码器时的输出
+        self.shared_output = None
+        # 壁纸管理器的设置（多显示器布局、是否共用解码器），由管理器关联
+        self.settings = {}
+
+        # 播放策略给出的每个显示器的播放状态（显示器句柄 -> 状态），由策略引擎设置
+        self.playback_states = {}
+        # 质量调节器给出的所有显示器的播放状态，以及是否跳帧解码、改用低分辨率的转码版本
+        self.governor_state = PLAY
+        self.skip_frames = 0
+        self.reduced_quality = False
+        # 每个显示器单独播放时，各播放器当前媒体的跳帧级别（显示器句柄 -> 级别）
+        self.player_skip = {}
         
         # 获取所有显示器信息
         self.update_display_info()
@@ -68,11 +100,13 @@ class VideoWallpaper:
             try:
                 monitors = win32api.EnumDisplayMonitors(hdc, None)
                 for index, monitor in enumerate(monitors):
+                    # 显示器矩形为物理像素（Qt 6 默认按显示器感知 DPI），混合缩放比例时各屏尺寸互不影响
+                    info = win32api.GetMonitorInfo(monitor[0])
                     self.monitors.append({
                         'handle': index,
-                        'rect': (monitor[2][0], monitor[2][1], monitor[2][2], monitor[2][3]),
-                        'work_area': (monitor[2][0], monitor[2][1], monitor[2][2], monitor[2][3]),
-                        'is_primary': True
+                        'rect': tuple(info['Monitor']),
+                        'work_area': tuple(info['Work']),
+                        'is_primary': info['Flags'] & win32con.MONITORINFOF_PRIMARY != 0
                     })
             finally:
                 win32gui.ReleaseDC(None, hdc)
@@ -213,6 +247,120 @@ class VideoWallpaper:
             except Exception as e:
                 print(f"Error creating window for monitor: {e}")
 
+    def prepare(self, video_path):
+        """提前打开并解析视频，之后切换到该视频时无需再等待解析"""
+        try:
+            medias = []
+            source = self.playback_source(video_path)
+            for _ in range(1 if self._uses_shared_decoder() else len(self.monitors)):
+                media = self._new_media(source)
+                # 异步解析容器信息
+                media.parse_with_options(vlc.MediaParseFlag.local, 0)
+                medias.append(media)
+            self._prepared = (video_path, medias)
+        except Exception as e:
+            print(f"Error preparing video: {e}")
+            self._prepared = None
+
+    def _new_media(self, source, skip_frames=None):
+        media = loop_media(self.instance, source)
+        level = self.skip_frames if skip_frames is None else skip_frames
+        if level:
+            # 跳过非参考帧（1）或非关键帧（3），降低解码开销
+            media.add_option(f'avcodec-skip-frame={level}')
+        return media
+
+    def _effective_state(self, handle):
+        return strictest(self.playback_states.get(handle, PLAY), self.governor_state)
+
+    def _skip_level(self, handle):
+        """单独播放的显示器应使用的跳帧级别：质量调节器的级别和播放状态对应的级别取较大者"""
+        return max(self.skip_frames, STATE_SKIP_LEVELS.get(self._effective_state(handle), 0))
+
+    def _set_player_skip(self, handle, level):
+        """按新的跳帧级别重新加载该显示器的媒体，从原来的播放位置继续"""
+        player, loop = self.players.get(handle), self.loops.get(handle)
+        if not player or not loop or not self.current_video:
+            return
+        position = player.get_time()
+        loop.set_media(self._new_media(self.playback_source(self.current_video), level))
+        loop.play()
+        if position and position > 0:
+            player.set_time(position)
+        self.player_skip[handle] = level
+
+    def target_size(self):
+        """视频输出的目标尺寸：共用解码器跨屏时为整个虚拟桌面，否则为最大的显示器"""
+        rects = [tuple(monitor['rect']) for monitor in self.monitors]
+        if not rects:
+            return None
+        span = self._uses_shared_decoder() and self.settings.get('monitor_layout') == 'span'
+        size, _sources = frame_layout(rects, span)
+        return size
+
+    def _reduced_target(self):
+        """降低画质时转码版本的尺寸（目标尺寸的一半，编码器要求偶数）"""
+        width, height = self.target_size() or (1920, 1080)
+        return max(2, int(width * REDUCED_SCALE) & ~1), max(2, int(height * REDUCED_SCALE) & ~1)
+
+    def reduced_variant_path(self, video_path):
+        return variant_path(video_path, self._reduced_target())
+
+    def transcode_reduced(self, video_path):
+        """生成降低画质时播放的转码版本，返回其路径；失败时返回 None"""
+        return transcode(video_path, self._reduced_target())
+
+    def set_playback_quality(self, skip_frames, reduced):
+        """切换跳帧级别（avcodec-skip-frame，0 为不跳帧）和低分辨率版本；正在播放的视频因此改变时重新加载"""
+        if (skip_frames, reduced) == (self.skip_frames, self.reduced_quality):
+            return
+        video_path = self.current_video if self.players else None
+        before = (self.playback_source(video_path), self.skip_frames) if video_path else None
+        self.skip_frames, self.reduced_quality = skip_frames, reduced
+        # 预先准备的媒体对象按原来的设置创建，不能再用
+        self._prepared = None
+        if video_path and (self.playback_source(video_path), self.skip_frames) != before:
+            self.set_wallpaper(video_path)
+
+    def set_governor_state(self, state):
+        """质量调节器给出的播放状态，与播放策略的状态合并后应用"""
+        self.governor_state = state
+        self.apply_playback_states()
+
+    def decode_stats(self):
+        """所有播放器累计解码和丢弃的帧数"""
+        stats = {'decoded': 0, 'dropped': 0}
+        for player in self.players.values():
+            try:
+                media = player.get_media() if player else None
+                media_stats = vlc.MediaStats()
+                if media and media.get_stats(media_stats):
+                    stats['decoded'] += media_stats.decoded_video
+                    stats['dropped'] += media_stats.lost_pictures
+            except Exception as e:
+                print(f"Error reading decode stats: {e}")
+        return stats
+
+    def playback_source(self, video_path):
+        """实际播放的文件：降低画质时优先播放低分辨率版本；
+        开启视频优化且已有匹配目标尺寸的转码版本时播放转码版本"""
+        if self.reduced_quality:
+            reduced = self.reduced_variant_path(video_path)
+            if os.path.exists(reduced):
+                return reduced
+        if self.settings.get('optimize_videos'):
+            target = self.target_size()
+            variant = variant_path(video_path, target) if target else None
+            if variant and os.path.exists(variant):
+                return variant
+        return video_path
+
+    def _take_prepared_media(self, video_path):
+        """取出为该视频预先准备的媒体对象"""
+        if self._prepared and self._prepared[0] == video_path and self._prepared[1]:
+            return self._prepared[1].pop()
+        return None
+
     def set_wallpaper(self, video_path):
         """设置视频壁纸"""
         if not os.path.exists(video_path):
@@ -224,6 +372,13 @@ class VideoWallpaper:
             
             # 更新显示器信息
             # self.update_display_info()
+
+            # 多显示器时默认只解码一次，分发到各显示器窗口
+            if self._uses_shared_decoder():
+                return self._set_shared_wallpaper(video_path)
+
+            # 有转码版本时播放转码版本
+            source = self.playback_source(video_path)
             
             # 为每个显示器创建播放器和窗口
             for monitor in self.monitors:
@@ -248,40 +403,144 @@ class VideoWallpaper:
                         #     win32con.SWP_NOMOVE | win32con.SWP_NOSIZE | win32con.SWP_SHOWWINDOW | win32con.SWP_NOACTIVATE
                         # )
                     
-                    # 加载视频
-                    media = self.instance.media_new(video_path)
-                    media.add_option('input-repeat=999999')  # 设置无限循环，这里是一个很大的数字，设置为-1无效
-                    player.set_media(media)
-                    
-                    
+                    # 加载视频（优先使用预先解析好的媒体，其跳帧级别为 skip_frames）
+                    level = self._skip_level(monitor['handle'])
+                    media = self._take_prepared_media(video_path) if level == self.skip_frames else None
+                    if media is None:
+                        media = self._new_media(source, level)
                     
                     # 设置静音
                     player.audio_set_volume(0)
                     
-                    # 设置事件管理器
-                    event_manager = player.event_manager()
-                    event_manager.event_attach(vlc.EventType.MediaPlayerEndReached, 
-                                            lambda x, p=player: self._on_end_reached(x, p))
+                    # 由媒体列表循环播放
+                    loop = LoopingPlayer(self.instance, player)
+                    loop.set_media(media)
                     
-                    # 保存播放器和事件管理器
+                    # 保存播放器和循环控制
                     self.players[monitor['handle']] = player
-                    self.event_managers[monitor['handle']] = event_manager
+                    self.loops[monitor['handle']] = loop
+                    self.player_skip[monitor['handle']] = level
                     
                     # 开始播放
-                    player.play()
+                    loop.play()
                 except Exception as e:
                     print(f"Error setting up video for monitor: {e}")
                     continue
             
             self.current_video = video_path
+            self._prepared = None
+            self.apply_playback_states()
             return True
         except Exception as e:
             print(f"Error setting video wallpaper: {e}")
             return False
 
+    def _uses_shared_decoder(self):
+        """设置项 shared_video_decoder 开启且有多个显示器时共用解码器（默认关闭）"""
+        return len(self.monitors) > 1 and self.settings.get('shared_video_decoder', False)
+
+    def _set_shared_wallpaper(self, video_path):
+        """一个播放器解码，帧分发到所有显示器窗口（跨屏时各取自己的区域，否则各显示整帧）"""
+        windows, rects = [], []
+        for monitor in self.monitors:
+            self._create_window(monitor)
+            window = self.windows.get(monitor['handle'])
+            if window:
+                windows.append(window)
+                rects.append(tuple(monitor['rect']))
+        if not windows:
+            return False
+        span = self.settings.get('monitor_layout') == 'span'
+        self.shared_output = SharedVideoOutput(self.instance, windows, rects, span)
+        player = self.shared_output.player
+
+        media = self._take_prepared_media(video_path)
+        if media is None:
+            media = self._new_media(self.playback_source(video_path))
+        player.audio_set_volume(0)
+
+        loop = LoopingPlayer(self.instance, player)
+        loop.set_media(media)
+        self.players['shared'] = player
+        self.loops['shared'] = loop
+        loop.play()
+
+        self.current_video = video_path
+        self._prepared = None
+        self.apply_playback_states()
+        return True
+
+    def set_animation(self, image_path):
+        """在视频壁纸使用的桌面窗口中播放 GIF / APNG / WebP 动画"""
+        if not os.path.exists(image_path):
+            return False
+
+        try:
+            self.stop()
+            windows = []
+            for monitor in self.monitors:
+                self._create_window(monitor)
+                window = self.windows.get(monitor['handle'])
+                if window:
+                    windows.append(window)
+            if not windows:
+                return False
+            self.animation = AnimationPlayer(image_path, windows, self.cache)
+            self.animation.start()
+            self.current_video = image_path
+            self.apply_playback_states()
+            return True
+        except Exception as e:
+            print(f"Error setting animated wallpaper: {e}")
+            return False
+
+    def apply_playback_states(self, states=None):
+        """按播放策略暂停、降低帧率或恢复各显示器的播放
+
+        播放策略和质量调节器的状态取更省的一个。
+        暂停只是让播放器停在当前帧，解码器和已缓冲的数据都保留，恢复时无需重新打开视频。
+        每个显示器单独播放时无法按帧控制显示，降低帧率的显示器改为跳帧解码（重新加载媒体，
+        从原来的位置继续）；暂停中的显示器保留原来的媒体，恢复时再切换。
+        """
+        if states is not None:
+            self.playback_states = dict(states)
+        effective = {monitor['handle']: self._effective_state(monitor['handle']) for monitor in self.monitors}
+        view_states = [state for handle, state in effective.items() if handle in self.windows]
+        try:
+            if self.animation:
+                self.animation.set_view_states(view_states)
+            if self.shared_output:
+                self.shared_output.set_view_states(view_states)
+            for handle, player in self.players.items():
+                if handle == 'shared' or not player:
+                    continue
+                frozen = effective.get(handle, self.governor_state) in FROZEN_STATES
+                level = self._skip_level(handle)
+                if not frozen and level != self.player_skip.get(handle, level):
+                    self._set_player_skip(handle, level)
+                player.set_pause(1 if frozen else 0)
+        except Exception as e:
+            print(f"Error applying playback states: {e}")
+
     def stop(self):
         """停止播放视频壁纸"""
         try:
+            # 停止动画壁纸
+            if self.animation:
+                self.animation.stop()
+                self.animation = None
+
+            # 先停止循环，播放器不会再被媒体列表重新启动
+            for loop in self.loops.values():
+                loop.stop()
+            self.loops.clear()
+
+            # 释放共用的解码器（其播放器不在下面单独释放）
+            if self.shared_output:
+                self.players.pop('shared', None)
+                self.shared_output.release()
+                self.shared_output = None
+
             # 停止所有播放器
             for player in self.players.values():
                 if player:
@@ -290,14 +549,6 @@ class VideoWallpaper:
                     except:
                         pass
             
-            # 清理事件管理器
-            for event_manager in self.event_managers.values():
-                if event_manager:
-                    try:
-                        event_manager.event_detach(vlc.EventType.MediaPlayerEndReached)
-                    except:
-                        pass
-            
             # 隐藏所有窗口
             for window in self.windows.values():
                 if window:
@@ -308,33 +559,17 @@ class VideoWallpaper:
             
             # 清理资源
             self.players.clear()
-            self.event_managers.clear()
+            self.player_skip.clear()
             self.windows.clear()
             self.current_video = None
         except Exception as e:
             print(f"Error stopping video wallpaper: {e}")
 
-    def _on_end_reached(self, event, player):
-        """视频播放结束时的回调函数，用于循环播放"""
-        try:
-            if player and player in self.players.values():
-                # print("触发回调函数")
-                # print(f"正在重置播放位置并重新播放")
-                player.set_position(0)
-                player.play()
-                
-                # 双重保险：再次设置循环选项
-                if player.get_media():
-                    player.get_media().add_option('input-repeat=-1')
-                    print("成功设置循环选项")
-                else:
-                    print("警告：无法获取媒体对象")
-        except Exception as e:
-            print(f"Error handling video end: {e}")
-
     def is_playing(self):
         """检查是否正在播放视频"""
         try:
+            if self.animation:
+                return True
             return any(player and player.is_playing() for player in self.players.values())
         except:
             return False
@@ -364,29 +599,13 @@ class VideoWallpaper:
 
     @staticmethod
     def get_video_thumbnail(video_path, size=None):
-        """获取视频的第一帧作为缩略图"""
+        """获取视频中最有代表性的一帧作为缩略图（跳过片头的黑场）"""
         try:
-            # 打开视频文件
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
+            # 不指定大小时保持原尺寸
+            frame = representative_frame(video_path, size or (1 << 16, 1 << 16))
+            if frame is None:
                 return None
             
-            # 读取第一帧
-            ret, frame = cap.read()
-            cap.release()
-            
-            if not ret:
-                return None
-            
-            # 如果指定了大小，调整图片大小
-            if size:
-                # 计算缩放比例，保持宽高比
-                h, w = frame.shape[:2]
-                target_w, target_h = size
-                scale = min(target_w/w, target_h/h)
-                new_w, new_h = int(w*scale), int(h*scale)
-                frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
-            
             # 转换颜色空间从BGR到RGB
             frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
@@ -404,9 +623,10 @@ class VideoWallpaper:
     
     def get_cached_thumbnail(self, video_path, size=None):
         """获取缓存的视频缩略图，如果没有则创建"""
-        cache_key = f"{video_path}_{size[0]}x{size[1]}" if size else video_path
-        if cache_key not in self._thumbnail_cache:
+        cache_key = (video_path, tuple(size) if size else None)
+        thumbnail = self.cache.get(VIDEO_THUMBNAIL_NAMESPACE, cache_key)
+        if thumbnail is None:
             thumbnail = self.get_video_thumbnail(video_path, size)
             if thumbnail:
-                self._thumbnail_cache[cache_key] = thumbnail
-        return self._thumbnail_cache.get(cache_key)
\ No newline at end of file
+                self.cache.put(VIDEO_THUMBNAIL_NAMESPACE, cache_key, thumbnail)
+        return thumbnail
\ No newline at end of file
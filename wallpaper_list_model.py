@@ -0,0 +1,352 @@
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QPainter, QPen, QPixmap
+from PyQt6.QtWidgets import QStyle, QStyledItemDelegate
+from cache_manager import CacheManager
+
+# 每次从数据库读取的行数和内存中保留的页数
+PAGE_SIZE = 200
+MAX_PAGES = 16
+# 合并连续新增事件的等待时间（毫秒）
+ADD_BATCH_INTERVAL = 100
+# 已解码缩略图在统一缓存中的命名空间和内存上限（字节）
+THUMBNAIL_NAMESPACE = 'thumbnails'
+THUMBNAIL_BUDGET = 32 * 1024 * 1024
+# 行号索引积累的插入、删除记录超过这个数时，下次查找时整体重建
+MAX_ROW_EDITS = 256
+
+PathRole = Qt.ItemDataRole.UserRole
+NameRole = Qt.ItemDataRole.UserRole + 1
+WallpaperRole = Qt.ItemDataRole.UserRole + 2
+CurrentRole = Qt.ItemDataRole.UserRole + 3
+
+
+class WallpaperListModel(QAbstractListModel):
+    """管理页的壁纸列表模型
+
+    只保存排好序的 id 数组，行数据按页从数据库读取并只保留最近用到的几页；
+    缩略图只为可见的行解码，已解码的缩略图放在统一缓存中按字节数上限淘汰。
+    内存占用取决于可见区域的大小，而不是壁纸库的大小。
+    订阅壁纸管理器的变更事件，只插入、删除或刷新受影响的行。
+    """
+
+    # 管理器的变更事件可能来自工作线程，经由信号排队到界面线程处理
+    _library_event = pyqtSignal(str, object)
+
+    def __init__(self, wallpaper_manager, thumbnail_service, placeholders: Dict[str, QPixmap],
+                 cache: Optional[CacheManager] = None, parent=None):
+        super().__init__(parent)
+        self.wallpaper_manager = wallpaper_manager
+        self.thumbnail_service = thumbnail_service
+        # 'loading'、'video'、'gif' 三种占位图
+        self.placeholders = placeholders
+        self.sort = 'added'
+        self.descending = False
+        self.filters: Dict = {}
+        self._ids = array('q')
+        # id -> (行号, 记录行号时的编辑数)；插入、删除只追加到编辑记录，查找时再补上之后的偏移
+        # 为 None 时表示需要重建
+        self._row_by_id: Optional[Dict[int, Tuple[int, int]]] = {}
+        # (起始行, 偏移)：起始行及之后的行号都加上偏移
+        self._row_edits: List[Tuple[int, int]] = []
+        # id -> 壁纸记录，最近用到的在后面；路径 -> id 与其同步
+        self._rows: OrderedDict = OrderedDict()
+        self._id_by_path: Dict[str, int] = {}
+        self.cache = cache or CacheManager()
+        self.cache.set_limit(THUMBNAIL_NAMESPACE, THUMBNAIL_BUDGET)
+        self._failed = set()
+        self.current_path = wallpaper_manager.config.get('current_wallpaper')
+        self.thumbnail_service.ready.connect(self._on_thumbnail_ready)
+        self.thumbnail_service.failed.connect(self._on_thumbnail_failed)
+
+        # 导入时的大量新增事件合并后一次插入
+        self._pending_added = []
+        self._add_timer = QTimer(self)
+        self._add_timer.setSingleShot(True)
+        self._add_timer.setInterval(ADD_BATCH_INTERVAL)
+        self._add_timer.timeout.connect(self._flush_added)
+        self._library_event.connect(self._on_library_event)
+        wallpaper_manager.subscribe(self._library_event.emit)
+
+    def reload(self, sort: Optional[str] = None, descending: Optional[bool] = None, **filters):
+        """重新查询 id 列表（排序和筛选条件同 query_wallpapers）"""
+        if sort is not None:
+            self.sort = sort
+        if descending is not None:
+            self.descending = descending
+        if filters:
+            self.filters = filters
+        ids = self.wallpaper_manager.query_wallpaper_ids(self.sort, self.descending, **self.filters)
+        self.beginResetModel()
+        self._ids = array('q', ids)
+        self._row_by_id = None
+        self._rows.clear()
+        self._id_by_path.clear()
+        self._pending_added.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._ids)
+
+    def wallpaper(self, row: int) -> Optional[Dict]:
+        """第 row 行的壁纸，不在内存中时从数据库读取所在的整页"""
+        if not 0 <= row < len(self._ids):
+            return None
+        wallpaper_id = self._ids[row]
+        wallpaper = self._rows.get(wallpaper_id)
+        if wallpaper is not None:
+            self._rows.move_to_end(wallpaper_id)
+            return wallpaper
+        start = row - row % PAGE_SIZE
+        fetched = self.wallpaper_manager.get_wallpapers_by_id(list(self._ids[start:start + PAGE_SIZE]))
+        for wallpaper in fetched.values():
+            self._cache_row(wallpaper)
+        while len(self._rows) > PAGE_SIZE * MAX_PAGES:
+            self._drop_row(next(iter(self._rows)))
+        return fetched.get(wallpaper_id)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        wallpaper = self.wallpaper(index.row()) if index.isValid() else None
+        if wallpaper is None:
+            return None
+        path = wallpaper['path']
+        if role == Qt.ItemDataRole.DisplayRole:
+            name = wallpaper['name']
+            if self.wallpaper_manager.is_video_file(path):
+                return f"{name}\n[视频]"
+            if path.lower().endswith('.gif'):
+                return f"{name}\n[GIF]"
+            return name
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._thumbnail(wallpaper)
+        if role == PathRole:
+            return path
+        if role == NameRole:
+            return wallpaper['name']
+        if role == WallpaperRole:
+            return wallpaper
+        if role == CurrentRole:
+            return path == self.current_path
+        return None
+
+    def _placeholder(self, path: str) -> QPixmap:
+        if path in self._failed:
+            if self.wallpaper_manager.is_video_file(path):
+                return self.placeholders['video']
+            if path.lower().endswith('.gif'):
+                return self.placeholders['gif']
+        return self.placeholders['loading']
+
+    def _decode(self, path: str, data: bytes) -> Optional[QPixmap]:
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data, 'JPEG'):
+            return None
+        self.cache.put(THUMBNAIL_NAMESPACE, path, pixmap)
+        return pixmap
+
+    def _thumbnail(self, wallpaper: Dict) -> QPixmap:
+        """已解码的缩略图，其次是缓存文件中的缩略图，都没有时返回占位图"""
+        path = wallpaper['path']
+        pixmap = self.cache.get(THUMBNAIL_NAMESPACE, path)
+        if pixmap is not None:
+            return pixmap
+        data = self.wallpaper_manager.get_thumbnail(wallpaper, create=False)
+        if data:
+            pixmap = self._decode(path, data)
+            if pixmap is not None:
+                return pixmap
+        return self._placeholder(path)
+
+    def request_thumbnails(self, rows: Iterable[int]):
+        """请求这些行（通常是可见的行）中还没有缩略图的条目，取消其他请求"""
+        wanted = []
+        for row in rows:
+            wallpaper = self.wallpaper(row)
+            if wallpaper is None:
+                continue
+            path = wallpaper['path']
+            if (THUMBNAIL_NAMESPACE, path) in self.cache or path in self._failed:
+                continue
+            if self.wallpaper_manager.get_thumbnail(wallpaper, create=False) is None:
+                wanted.append(wallpaper)
+        self.thumbnail_service.request(wanted)
+
+    def _cache_row(self, wallpaper: Dict):
+        old = self._rows.get(wallpaper['id'])
+        if old is not None and old['path'] != wallpaper['path']:
+            self._id_by_path.pop(old['path'], None)
+        self._rows[wallpaper['id']] = wallpaper
+        self._rows.move_to_end(wallpaper['id'])
+        self._id_by_path[wallpaper['path']] = wallpaper['id']
+
+    def _drop_row(self, wallpaper_id: int):
+        wallpaper = self._rows.pop(wallpaper_id, None)
+        if wallpaper is not None:
+            self._id_by_path.pop(wallpaper['path'], None)
+
+    def _shift_rows(self, start: int, delta: int):
+        """start 及之后的行号加上 delta；记录太多时改为下次查找时重建"""
+        if self._row_by_id is None:
+            return
+        if len(self._row_edits) >= MAX_ROW_EDITS:
+            self._row_by_id = None
+            return
+        self._row_edits.append((start, delta))
+
+    def _index_rows(self, start: int, count: int):
+        """记录新插入的 count 行的行号（已计入之前的所有编辑）"""
+        if self._row_by_id is not None:
+            epoch = len(self._row_edits)
+            for row in range(start, start + count):
+                self._row_by_id[self._ids[row]] = (row, epoch)
+
+    def row_of_id(self, wallpaper_id: int) -> int:
+        if self._row_by_id is None:
+            self._row_by_id = {wallpaper_id: (row, 0) for row, wallpaper_id in enumerate(self._ids)}
+            self._row_edits = []
+        entry = self._row_by_id.get(wallpaper_id)
+        if entry is None:
+            return -1
+        row, epoch = entry
+        if epoch < len(self._row_edits):
+            for start, delta in self._row_edits[epoch:]:
+                if row >= start:
+                    row += delta
+            self._row_by_id[wallpaper_id] = (row, len(self._row_edits))
+        return row
+
+    def row_of(self, path: Optional[str]) -> int:
+        """在内存中的行里查找路径对应的行，找不到时返回 -1"""
+        wallpaper_id = self._id_by_path.get(path)
+        return -1 if wallpaper_id is None else self.row_of_id(wallpaper_id)
+
+    def _refresh_row(self, row: int, roles=None):
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, roles or [])
+
+    def _on_library_event(self, event: str, wallpaper: Optional[Dict]):
+        if event == 'added' and wallpaper:
+            self._pending_added.append(wallpaper)
+            if not self._add_timer.isActive():
+                self._add_timer.start()
+        elif event == 'removed' and wallpaper:
+            self._remove(wallpaper)
+        elif event == 'updated' and wallpaper:
+            self._cache_row(wallpaper)
+            self._drop_pixmap(wallpaper['path'])
+            self._failed.discard(wallpaper['path'])
+            self._refresh_row(self.row_of_id(wallpaper['id']))
+        elif event == 'current':
+            old_row = self.row_of(self.current_path)
+            self.current_path = wallpaper['path'] if wallpaper else None
+            self._refresh_row(old_row, [CurrentRole])
+            if wallpaper:
+                self._refresh_row(self.row_of_id(wallpaper['id']), [CurrentRole])
+
+    def _flush_added(self):
+        """插入合并后的新增壁纸；按添加时间排序且没有筛选时直接追加，否则重新查询"""
+        added, self._pending_added = self._pending_added, []
+        if not added:
+            return
+        if self.sort != 'added' or self.filters:
+            self.reload()
+            return
+        ids = [wallpaper['id'] for wallpaper in added]
+        if self.descending:
+            ids.reverse()
+            self.beginInsertRows(QModelIndex(), 0, len(ids) - 1)
+            self._ids[0:0] = array('q', ids)
+            self._shift_rows(0, len(ids))
+            self._index_rows(0, len(ids))
+        else:
+            start = len(self._ids)
+            self.beginInsertRows(QModelIndex(), start, start + len(ids) - 1)
+            self._ids.extend(ids)
+            self._index_rows(start, len(ids))
+        for wallpaper in added:
+            self._cache_row(wallpaper)
+        self.endInsertRows()
+
+    def _remove(self, wallpaper: Dict):
+        # 还没插入的新增壁纸直接丢弃
+        self._pending_added = [w for w in self._pending_added if w['id'] != wallpaper['id']]
+        self.thumbnail_service.cancel(wallpaper['path'])
+        self._drop_pixmap(wallpaper['path'])
+        self._drop_row(wallpaper['id'])
+        row = self.row_of_id(wallpaper['id'])
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._ids[row]
+        del self._row_by_id[wallpaper['id']]
+        self._shift_rows(row + 1, -1)
+        self.endRemoveRows()
+
+    def _drop_pixmap(self, path: str):
+        self.cache.discard(THUMBNAIL_NAMESPACE, path)
+
+    def _on_thumbnail_ready(self, path: str, data: bytes):
+        row = self.row_of(path)
+        if row >= 0 and self._decode(path, data) is not None:
+            self._refresh_row(row, [Qt.ItemDataRole.DecorationRole])
+
+    def _on_thumbnail_failed(self, path: str):
+        self._failed.add(path)
+        self._refresh_row(self.row_of(path), [Qt.ItemDataRole.DecorationRole])
+
+
+class WallpaperItemDelegate(QStyledItemDelegate):
+    """绘制壁纸条目：圆角背景、居中的缩略图和文件名"""
+
+    ITEM_SIZE = QSize(240, 190)
+    THUMB_SIZE = QSize(200, 120)
+
+    def sizeHint(self, option, index) -> QSize:
+        return self.ITEM_SIZE
+
+    def paint(self, painter: QPainter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        rect = option.rect.adjusted(5, 5, -5, -5)
+
+        # 背景颜色与原列表样式一致
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.setPen(QColor(255, 218, 176))
+            painter.setBrush(QColor(255, 228, 196, 230))
+        elif option.state & QStyle.StateFlag.State_MouseOver:
+            painter.setPen(QColor(255, 228, 196))
+            painter.setBrush(QColor(255, 238, 216, 230))
+        else:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(255, 248, 240, 204))
+        painter.drawRoundedRect(rect, 10, 10)
+        if index.data(CurrentRole):
+            # 当前壁纸加粗边框
+            painter.setPen(QPen(QColor(204, 136, 85), 2))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawRoundedRect(rect.adjusted(1, 1, -1, -1), 10, 10)
+
+        # 缩略图保持比例居中
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        thumb_area = QRect(rect.left() + (rect.width() - self.THUMB_SIZE.width()) // 2, rect.top() + 10,
+                           self.THUMB_SIZE.width(), self.THUMB_SIZE.height())
+        if isinstance(pixmap, QPixmap) and not pixmap.isNull():
+            size = pixmap.size().scaled(thumb_area.size(), Qt.AspectRatioMode.KeepAspectRatio)
+            target = QRect(thumb_area.left() + (thumb_area.width() - size.width()) // 2,
+                           thumb_area.top() + (thumb_area.height() - size.height()) // 2,
+                           size.width(), size.height())
+            painter.drawPixmap(target, pixmap)
+
+        # 文件名（过长时省略中间部分）
+        painter.setPen(QColor('#664433'))
+        metrics = option.fontMetrics
+        text_rect = QRect(rect.left() + 5, thumb_area.bottom() + 5, rect.width() - 10,
+                          rect.bottom() - thumb_area.bottom() - 5)
+        lines = (index.data(Qt.ItemDataRole.DisplayRole) or '').split('\n')
+        text = '\n'.join(metrics.elidedText(line, Qt.TextElideMode.ElideMiddle, text_rect.width()) for line in lines)
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, text)
+        painter.restore()
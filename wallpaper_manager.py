@@ -1,12 +1,38 @@
 import os
 import json
+import atexit
 import shutil
+import time
+import threading
+import winreg
+from contextlib import contextmanager
 import win32gui
 import win32con
-from typing import List, Dict, Union
+from typing import Callable, List, Dict, Union, Optional, Tuple
+from content_store import ContentStore, ImportCancelled, ProgressCallback
+from library_db import LibraryDB
+from config_writer import DebouncedJsonWriter
+from library_watcher import LibraryWatcher
+from media_scanner import sniff_media_type, extension_for, MEDIA_EXTENSIONS, VIDEO_EXTENSIONS
+from media_metadata import extract_many, METADATA_FIELDS
+import perceptual_hash
+from wallpaper_renderer import WallpaperRenderer, DEFAULT_MODE, DEFAULT_LAYOUT
+from thumbnail_cache import ThumbnailCache, THUMB_SIZE
+import video_transcoder
+from playback_governor import background_job
+from animated_wallpaper import is_animated_file, animation_info, transcode_to_video, ANIMATION_BUDGET, ANIMATION_PIXMAP_BUDGET
+
+# 视频缩略图的生成方式版本（改变选帧方式时递增，让旧缩略图失效）
+VIDEO_THUMB_VERSION = 'v2'
+
+# 变更事件监听器：事件名（'added'、'removed'、'updated'、'current'）, 壁纸记录
+ChangeListener = Callable[[str, Optional[Dict]], None]
 
 class WallpaperManager:
     def __init__(self):
+        # 变更事件的监听器，在修改发生的线程中调用
+        self._listeners: List[ChangeListener] = []
+
         # 创建壁纸存储目录
         self.wallpaper_dir = os.path.join(os.path.expanduser('~'), '.planetboy_wallpaper')
         if not os.path.exists(self.wallpaper_dir):
@@ -17,11 +43,42 @@ class WallpaperManager:
         
         # 加载或创建配置
         self.config = self._load_config()
-        
+        self._config_writer = DebouncedJsonWriter(self.config_file, lambda: self.config)
+        atexit.register(self.flush)
+
+        # 壁纸库索引（SQLite），首次启动时从旧版配置迁移
+        self.db = LibraryDB(os.path.join(self.wallpaper_dir, 'library.db'))
+        self._migrate_config()
+
+        # 按内容寻址的存储
+        self.store = ContentStore(self.wallpaper_dir)
+
+        # 静态壁纸预渲染缓存
+        self.renderer = WallpaperRenderer(os.path.join(self.wallpaper_dir, 'rendered'))
+
+        # 管理页缩略图缓存（按内容哈希持久保存）
+        self.thumbnails = ThumbnailCache(os.path.join(self.wallpaper_dir, 'thumbnails'))
+        atexit.register(self.thumbnails.close)
+
+        # 大尺寸动画转码后的循环视频
+        self.transcode_dir = os.path.join(self.wallpaper_dir, 'transcoded')
+        self._transcoding = set()
+        # 同一时间只有一个线程生成视频的转码版本
+        self._variant_lock = threading.Lock()
+
+        # 感知哈希索引，首次查询近似重复时从数据库构建
+        self._phash_index = None
+        self._phash_lock = threading.Lock()
+
+        # 内容存储目录的快照，之后根据文件系统通知增量更新；
+        # 数据库、配置、缩略图和渲染缓存的写入不在监视范围内，存储外的旧壁纸直接检查磁盘
+        self.watcher = LibraryWatcher(self.store.root)
+        atexit.register(self.watcher.stop)
+        self._remove_missing(w['path'] for w in self.db.all() if not self.watcher.exists(w['path']))
+
     def _load_config(self) -> Dict:
         """加载配置文件"""
         default_config = {
-            'wallpapers': [],
             'current_wallpaper': None,
             'settings': {
                 'auto_change': False,
@@ -44,15 +101,108 @@ class WallpaperManager:
         return default_config
     
     def _save_config(self):
-        """保存配置文件"""
+        """标记配置已修改，由写入器延迟合并后原子写入"""
+        self._config_writer.mark_dirty()
+
+    def flush(self):
+        """立即写入未保存的配置（退出时自动调用）"""
+        self._config_writer.flush()
+
+    @property
+    def save_stats(self) -> Dict[str, int]:
+        """配置写入统计：请求次数、实际写入、合并和跳过次数"""
+        stats = dict(self._config_writer.stats)
+        stats['avoided'] = self._config_writer.writes_avoided
+        return stats
+
+    def _migrate_config(self):
+        """把旧版 config.json 中的壁纸列表迁移到数据库（只执行一次）"""
+        if 'wallpapers' not in self.config and 'sources' not in self.config:
+            return
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
+            shutil.copy2(self.config_file, self.config_file + '.bak')
+            self.db.migrate_from_config(
+                self.config.get('wallpapers', []),
+                self.config.get('sources', {})
+            )
+            self.config.pop('wallpapers', None)
+            self.config.pop('sources', None)
+            self._save_config()
+            self.flush()
         except Exception as e:
-            print(f"Error saving config: {e}")
+            print(f"Error migrating config: {e}")
+
+    def _find_duplicate(self, file_path: str, stat: os.stat_result) -> Tuple[Optional[Dict], Optional[str]]:
+        """查找内容相同的已有壁纸，返回 (已有壁纸, 已算出的哈希)
+
+        先查源文件缓存，再按大小和部分哈希排除，只有部分哈希相同时才计算完整哈希。
+        """
+        source_key = os.path.realpath(file_path)
+        cached = self.db.get_source(source_key)
+        if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+            existing = self.db.get_by_hash(cached['hash'])
+            if existing:
+                return existing, cached['hash']
+
+        candidates = self.db.find_by_size(stat.st_size)
+        if not candidates:
+            return None, None
+
+        partial = self.store.partial_hash(file_path, stat.st_size)
+        if not any(w['partial'] == partial for w in candidates):
+            return None, None
+
+        digest = self.store.full_hash(file_path)
+        return self.db.get_by_hash(digest), digest
+
+    def is_known_file(self, file_path: str, stat: Optional[os.stat_result] = None) -> bool:
+        """快速判断文件是否已在库中（只用源文件缓存和大小索引，不读取内容）"""
+        if stat is None:
+            stat = os.stat(file_path)
+        cached = self.db.get_source(os.path.realpath(file_path))
+        if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+            return self.db.get_by_hash(cached['hash']) is not None
+        return False
 
-    def add_wallpaper(self, file_path: str) -> str:
-        """添加壁纸到管理器"""
+    def subscribe(self, listener: ChangeListener):
+        """订阅壁纸库的变更事件
+
+        added / removed / updated 附带壁纸记录（含 id），current 附带新的当前壁纸（可能为 None）。
+        监听器在发生修改的线程中调用（导入时为工作线程），界面需要自行转到界面线程。
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ChangeListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event: str, wallpaper: Optional[Dict]):
+        for listener in list(self._listeners):
+            try:
+                listener(event, wallpaper)
+            except Exception as e:
+                print(f"Error notifying {event} listener: {e}")
+
+    def _set_current(self, wallpaper_path: Optional[str]):
+        if self.config['current_wallpaper'] != wallpaper_path:
+            self.config['current_wallpaper'] = wallpaper_path
+            self._save_config()
+            self._notify('current', self.db.get(wallpaper_path) if wallpaper_path else None)
+
+    @contextmanager
+    def batch(self):
+        """批量修改：期间的数据库修改和配置写入在结束时统一提交一次"""
+        with self.db.batch():
+            yield
+        self.flush()
+
+    @background_job
+    def add_wallpaper(self, file_path: str, progress: Optional[ProgressCallback] = None,
+                      cancel: Optional[threading.Event] = None) -> str:
+        """添加壁纸到管理器
+
+        progress 按字节报告复制/哈希进度，cancel 被设置时抛出 ImportCancelled。
+        """
         try:
             # 确保文件存在
             if not os.path.exists(file_path):
@@ -60,31 +210,38 @@ class WallpaperManager:
             
             # 获取文件名和扩展名
             filename = os.path.basename(file_path)
-            
-            # 创建目标路径
-            target_path = os.path.join(self.wallpaper_dir, filename)
-            
-            # 如果文件已存在，添加数字后缀
-            base, ext = os.path.splitext(filename)
-            counter = 1
-            while os.path.exists(target_path):
-                target_path = os.path.join(self.wallpaper_dir, f"{base} ({counter}){ext}")
-                counter += 1
-            
-            # 复制文件到壁纸目录
-            shutil.copy2(file_path, target_path)
-            
-            # 更新配置
-            if target_path not in [w['path'] for w in self.config['wallpapers']]:
-                self.config['wallpapers'].append({
-                    'path': target_path,
-                    'name': os.path.basename(target_path),
-                    'type': os.path.splitext(target_path)[1].lower()
-                })
-                self._save_config()
+            stat = os.stat(file_path)
+
+            # 按文件头识别类型，扩展名错误或缺失时使用规范扩展名
+            ext = extension_for(sniff_media_type(file_path))
+            if ext is None:
+                ext = os.path.splitext(filename)[1].lower()
+
+            # 内容已在库中则直接返回，不再复制
+            existing, digest = self._find_duplicate(file_path, stat)
+            if existing:
+                return existing['path']
+
+            # 存入内容寻址存储（同盘时使用链接）
+            target_path, digest = self.store.ingest(file_path, ext, digest, progress, cancel)
+            self.db.set_source(os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns, digest)
+
+            # 写入壁纸库，原始文件名作为显示名称保存
+            self.db.insert({
+                'path': target_path,
+                'name': filename,
+                'type': ext,
+                'hash': digest,
+                'partial': self.store.partial_hash(target_path, stat.st_size),
+                'size': stat.st_size,
+                'mtime': os.stat(target_path).st_mtime_ns
+            })
+            self._notify('added', self.db.get(target_path))
             
             return target_path
             
+        except ImportCancelled:
+            raise
         except Exception as e:
             print(f"Error adding wallpaper: {e}")
             raise
@@ -92,27 +249,21 @@ class WallpaperManager:
     def remove_wallpaper(self, wallpaper_path: str) -> bool:
         """从管理器中删除壁纸"""
         try:
-            # 查找壁纸
-            wallpaper = None
-            for w in self.config['wallpapers']:
-                if w['path'] == wallpaper_path:
-                    wallpaper = w
-                    break
-            
-            if wallpaper:
-                # 从配置中移除
-                self.config['wallpapers'].remove(wallpaper)
-                
+            # 从库中移除
+            wallpaper = self.db.get(wallpaper_path)
+            if self.db.delete(wallpaper_path):
+                with self._phash_lock:
+                    self._phash_index = None
+                self._notify('removed', wallpaper)
                 # 如果是当前壁纸，清除当前壁纸设置
                 if self.config['current_wallpaper'] == wallpaper_path:
-                    self.config['current_wallpaper'] = None
+                    self._set_current(None)
                 
-                # 删除文件
-                if os.path.exists(wallpaper_path):
-                    os.remove(wallpaper_path)
+                # 删除对象文件及其转码版本
+                self.store.release(wallpaper_path)
+                for variant in video_transcoder.variants_of(wallpaper_path):
+                    self.store.release(variant)
                 
-                # 保存配置
-                self._save_config()
                 return True
             
             return False
@@ -121,45 +272,299 @@ class WallpaperManager:
             print(f"Error removing wallpaper: {e}")
             return False
 
+    def _remove_missing(self, paths):
+        """从库中移除已不存在的文件"""
+        missing = list(paths)
+        if missing:
+            removed = [w for w in (self.db.get(path) for path in missing) if w]
+            self.db.delete_many(missing)
+            for wallpaper in removed:
+                self._notify('removed', wallpaper)
+            if self.config['current_wallpaper'] in missing:
+                self._set_current(None)
+
+    def _sync_with_disk(self):
+        """根据目录快照的增量变化更新库：删除丢失的文件，标记被修改的文件"""
+        missing = []
+        for path, (_old, new) in self.watcher.drain().items():
+            wallpaper = self.db.get(path)
+            if wallpaper is None:
+                continue
+            if new is None:
+                missing.append(path)
+            elif wallpaper['mtime'] is not None and (wallpaper['size'], wallpaper['mtime']) != new:
+                # 内容已变化，原有哈希不再可信
+                self.db.update(path, size=new[0], mtime=new[1], hash=None, partial=None)
+                self._notify('updated', self.db.get(path))
+        self._remove_missing(missing)
+
     def get_wallpapers(self) -> List[Dict[str, str]]:
         """获取所有壁纸列表"""
-        # 清理不存在的壁纸
-        self.config['wallpapers'] = [
-            w for w in self.config['wallpapers']
-            if os.path.exists(w['path'])
-        ]
-        self._save_config()
-        return self.config['wallpapers']
+        # 只处理自上次以来发生变化的文件，不再逐个检查是否存在
+        self._sync_with_disk()
+        return self.db.all()
+
+    def query_wallpapers(self, sort: str = 'added', descending: bool = False, limit: int = 100,
+                         cursor: Optional[str] = None, **filters) -> Tuple[List[Dict], Optional[str]]:
+        """按条件查询一页壁纸，返回 (本页壁纸, 下一页游标)
+
+        筛选条件：media_type（'image'、'video' 或扩展名）、min_width、min_height、
+        aspect（(最小, 最大) 宽高比）、orientation（'landscape'、'portrait'、'square'）、
+        tag、added_after、added_before；排序：'name'、'added'、'last_used'。
+        """
+        self._sync_with_disk()
+        return self.db.query(sort=sort, descending=descending, limit=limit, cursor=cursor, **filters)
+
+    def query_wallpaper_ids(self, sort: str = 'added', descending: bool = False, **filters) -> List[int]:
+        """按条件查询所有匹配壁纸的 id（筛选和排序同 query_wallpapers）"""
+        self._sync_with_disk()
+        return self.db.query_ids(sort=sort, descending=descending, **filters)
+
+    def get_wallpapers_by_id(self, ids: List[int]) -> Dict[int, Dict]:
+        """按 id 批量获取壁纸"""
+        return self.db.get_many(ids)
+
+    def count_wallpapers(self, **filters) -> int:
+        """满足筛选条件的壁纸数量"""
+        return self.db.count_matching(**filters)
 
     def get_current_wallpaper(self) -> Union[Dict[str, str], None]:
         """获取当前壁纸"""
         if self.config['current_wallpaper']:
-            for wallpaper in self.config['wallpapers']:
-                if wallpaper['path'] == self.config['current_wallpaper']:
-                    return wallpaper
+            return self.db.get(self.config['current_wallpaper'])
         return None
 
-    def set_wallpaper(self, wallpaper_path: str) -> bool:
-        """设置壁纸"""
+    def get_metadata(self, wallpaper_path: str) -> Optional[Dict]:
+        """获取已保存的媒体元数据（不读取媒体文件），尚未提取时返回 None"""
+        wallpaper = self.db.get(wallpaper_path)
+        if wallpaper is None or wallpaper['probed_at'] is None:
+            return None
+        return {key: wallpaper[key] for key in METADATA_FIELDS + ('size',)}
+
+    def backfill_metadata(self, paths: Optional[List[str]] = None, max_workers: Optional[int] = None) -> int:
+        """在进程池中为尚未提取元数据的壁纸提取并保存元数据，返回处理数量"""
+        count = 0
+        kwargs = {'max_workers': max_workers} if max_workers else {}
+        while True:
+            batch = paths if paths is not None else self.db.unprobed_paths()
+            if not batch:
+                break
+            with self.db.batch():
+                for path, meta in extract_many(batch, **kwargs):
+                    # 提取失败也记录时间，避免反复重试
+                    self.db.update(path, probed_at=time.time(), **(meta or {}))
+                    count += 1
+            if paths is not None:
+                break
+        return count
+
+    def backfill_phashes(self, paths: Optional[List[str]] = None, max_workers: Optional[int] = None) -> int:
+        """在进程池中为尚未计算感知哈希的壁纸计算并保存哈希，返回处理数量"""
+        count = 0
+        kwargs = {'max_workers': max_workers} if max_workers else {}
+        while True:
+            batch = paths if paths is not None else self.db.unphashed_paths()
+            if not batch:
+                break
+            with self.db.batch():
+                for path, hashes in perceptual_hash.compute_many(batch, **kwargs):
+                    # 计算失败也记录时间，避免反复重试
+                    self.db.set_phashes(path, [perceptual_hash.to_signed(h) for h in hashes or []])
+                    count += 1
+            if paths is not None:
+                break
+        if count:
+            with self._phash_lock:
+                self._phash_index = None
+        return count
+
+    @background_job
+    def backfill(self):
+        """补全新导入或旧壁纸的元数据和感知哈希，并清理已删除壁纸的缩略图"""
+        self.backfill_metadata()
+        self.backfill_phashes()
+        self.backfill_video_variants()
+        self.thumbnails.compact(self._thumbnail_key(wallpaper) for wallpaper in self.db.all() if wallpaper.get('hash'))
+
+    @background_job
+    def backfill_video_variants(self) -> List[Dict]:
+        """开启视频优化时，为分辨率、帧率或编码不适合当前显示器的视频生成转码版本
+
+        转码版本与原文件放在一起，播放时由视频壁纸处理器自动选用。
+        返回每个新转码视频转码前后的每帧解码耗时报告。
+        """
+        if not self.config['settings'].get('optimize_videos') or not hasattr(self, 'video_wallpaper'):
+            return []
+        target = self.video_wallpaper.target_size()
+        if not target or not self._variant_lock.acquire(blocking=False):
+            return []
+        reports = []
+        try:
+            for wallpaper in self.db.all():
+                path = wallpaper['path']
+                if not self.is_video_file(path) or os.path.exists(video_transcoder.variant_path(path, target)):
+                    continue
+                info = video_transcoder.probe(path)
+                if not info or not video_transcoder.needs_variant(info, target):
+                    continue
+                variant = video_transcoder.transcode(path, target, info)
+                if variant:
+                    report = video_transcoder.cost_report(path, variant)
+                    print(f"Transcoded {video_transcoder.format_report(report)}")
+                    reports.append(report)
+        finally:
+            self._variant_lock.release()
+        return reports
+
+    @classmethod
+    def _thumbnail_key(cls, wallpaper: Dict) -> str:
+        key = wallpaper.get('hash') or WallpaperRenderer.source_key(wallpaper['path'])
+        if cls.is_video_file(wallpaper['path']):
+            # 视频缩略图改为取样选帧后换用新键，旧的第一帧缩略图在压缩时清理
+            key = f"{key}-{VIDEO_THUMB_VERSION}"
+        return key
+
+    @background_job
+    def get_thumbnail(self, wallpaper: Dict, size: Tuple[int, int] = THUMB_SIZE,
+                      create: bool = True) -> Optional[bytes]:
+        """获取壁纸缩略图的 JPEG 数据，不在缓存中时生成并保存；create 为假时只读缓存"""
+        try:
+            key = self._thumbnail_key(wallpaper)
+            if not create:
+                return self.thumbnails.get(key, size)
+            return self.thumbnails.get_or_create(wallpaper['path'], key, size)
+        except OSError as e:
+            print(f"Error loading thumbnail for {wallpaper['path']}: {e}")
+            return None
+
+    def _get_phash_index(self) -> perceptual_hash.MultiIndexHash:
+        with self._phash_lock:
+            if self._phash_index is None:
+                index = perceptual_hash.MultiIndexHash()
+                for path, value in self.db.all_phashes():
+                    index.add(perceptual_hash.to_unsigned(value), path)
+                self._phash_index = index
+            return self._phash_index
+
+    def find_near_duplicates(self, wallpaper_path: str,
+                             radius: int = perceptual_hash.DEFAULT_RADIUS) -> List[Tuple[str, int]]:
+        """查找与指定壁纸视觉上近似的其他壁纸，返回 (路径, 汉明距离)，按距离排序"""
+        index = self._get_phash_index()
+        best = {}
+        for value in self.db.get_phashes(wallpaper_path):
+            for path, distance in index.query(perceptual_hash.to_unsigned(value), radius):
+                if path != wallpaper_path and distance < best.get(path, radius + 1):
+                    best[path] = distance
+        return sorted(best.items(), key=lambda item: item[1])
+
+    def find_duplicate_groups(self, radius: int = perceptual_hash.DEFAULT_RADIUS) -> List[List[str]]:
+        """把整个库中视觉上近似的壁纸分组，只返回包含多个壁纸的组"""
+        items = [(path, perceptual_hash.to_unsigned(value)) for path, value in self.db.all_phashes()]
+        return perceptual_hash.find_groups(items, radius)
+
+    def set_tags(self, wallpaper_path: str, tags: List[str]):
+        """设置壁纸标签"""
+        self.db.set_tags(wallpaper_path, tags)
+        self._notify('updated', self.db.get(wallpaper_path))
+
+    def set_setting(self, key: str, value):
+        """修改设置项"""
+        if self.config['settings'].get(key) != value:
+            self.config['settings'][key] = value
+            self._save_config()
+
+    def mark_current(self, wallpaper_path: str):
+        """记录当前壁纸和最近使用时间（视频壁纸由 VideoWallpaper 负责显示）"""
+        self.db.touch(wallpaper_path)
+        self._set_current(wallpaper_path)
+
+    def _monitor_rects(self) -> List[Tuple[int, int, int, int]]:
+        """各显示器的物理像素矩形（来自视频壁纸处理器的显示器列表），主显示器在前"""
+        monitors = getattr(self, 'video_wallpaper', None) and self.video_wallpaper.monitors
+        if not monitors:
+            return []
+        ordered = sorted(monitors, key=lambda m: not m.get('is_primary'))
+        return [tuple(m['rect']) for m in ordered]
+
+    def _digest(self, wallpaper_path: str) -> Optional[str]:
+        wallpaper = self.db.get(wallpaper_path)
+        return wallpaper['hash'] if wallpaper else None
+
+    @background_job
+    def render_wallpaper(self, wallpaper_path: Union[str, List[str]], mode: Optional[str] = None) -> Optional[str]:
+        """把静态壁纸渲染为显示器分辨率的文件，缓存命中时直接返回
+
+        单个显示器时渲染为该显示器尺寸；多个显示器时合成为覆盖整个虚拟桌面的一张图，
+        按布局设置每屏各铺一张或一张图跨屏。传入列表时按主显示器在前的顺序每屏一张。
+        """
+        rects = self._monitor_rects()
+        if not rects:
+            return None
+        settings = self.config['settings']
+        mode = mode or settings.get('fit_mode', DEFAULT_MODE)
+        paths = [wallpaper_path] if isinstance(wallpaper_path, str) else list(wallpaper_path)
+        if len(rects) == 1:
+            left, top, right, bottom = rects[0]
+            return self.renderer.render(paths[0], (right - left, bottom - top), mode,
+                                        digest=self._digest(paths[0]))
+        span = len(paths) == 1 and settings.get('monitor_layout', DEFAULT_LAYOUT) == 'span'
+        if not span:
+            # 图片数少于显示器数时循环使用
+            paths = [paths[i % len(paths)] for i in range(len(rects))]
+        return self.renderer.render_desktop(paths, rects, mode, span,
+                                            digests=[self._digest(path) for path in paths])
+
+    @staticmethod
+    def _set_wallpaper_style(style: str):
+        """设置系统壁纸的铺放方式（22 为跨屏，10 为填充）"""
+        with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r'Control Panel\Desktop', 0, winreg.KEY_SET_VALUE) as key:
+            winreg.SetValueEx(key, 'WallpaperStyle', 0, winreg.REG_SZ, style)
+            winreg.SetValueEx(key, 'TileWallpaper', 0, winreg.REG_SZ, '0')
+
+    def set_wallpaper(self, wallpaper_path: Union[str, List[str]], rendered_path: Optional[str] = None) -> bool:
+        """设置壁纸
+
+        图片先渲染为显示器分辨率再交给系统，rendered_path 为已预先渲染好的文件时直接使用；
+        传入列表时每个显示器一张图。当前壁纸记录为（第一张）原文件。
+        """
+        paths = [wallpaper_path] if isinstance(wallpaper_path, str) else list(wallpaper_path)
         try:
             # 确保文件存在
-            if not os.path.exists(wallpaper_path):
+            if not paths or not all(os.path.exists(path) for path in paths):
                 return False
+
+            # 动画交给视频壁纸处理器的桌面窗口播放
+            if len(paths) == 1 and hasattr(self, 'video_wallpaper') and is_animated_file(paths[0]):
+                return self.set_animated_wallpaper(paths[0])
             
             # 如果有视频壁纸正在播放，需要先停止
             if hasattr(self, 'video_wallpaper'):
                 self.video_wallpaper.stop()
             
+            # 预渲染到显示器分辨率，失败时退回原文件
+            if not rendered_path or not os.path.exists(rendered_path):
+                try:
+                    rendered_path = self.render_wallpaper(wallpaper_path)
+                except Exception as e:
+                    print(f"Error rendering wallpaper: {e}")
+                    rendered_path = None
+
+            if rendered_path:
+                # 渲染结果与桌面尺寸完全一致：多显示器合成图按跨屏铺放，系统不再缩放
+                try:
+                    self._set_wallpaper_style('22' if len(self._monitor_rects()) > 1 else '10')
+                except OSError as e:
+                    print(f"Error setting wallpaper style: {e}")
+
             # 设置壁纸
             win32gui.SystemParametersInfo(
                 win32con.SPI_SETDESKWALLPAPER,
-                wallpaper_path,
+                rendered_path or paths[0],
                 win32con.SPIF_UPDATEINIFILE | win32con.SPIF_SENDCHANGE
             )
             
             # 更新当前壁纸
-            self.config['current_wallpaper'] = wallpaper_path
-            self._save_config()
+            self.mark_current(paths[0])
             
             return True
             
@@ -167,13 +572,67 @@ class WallpaperManager:
             print(f"Error setting wallpaper: {e}")
             return False
 
+    def _largest_monitor(self) -> Optional[Tuple[int, int]]:
+        sizes = [(right - left, bottom - top) for left, top, right, bottom in self._monitor_rects()]
+        return max(sizes, key=lambda s: s[0] * s[1]) if sizes else None
+
+    def is_large_animation(self, wallpaper_path: str) -> bool:
+        """动画的帧放不进内存（需要边播放边解码或逐帧缩放）时适合转码为视频"""
+        bounds = self._largest_monitor()
+        info = animation_info(wallpaper_path, bounds)
+        if not info or not bounds:
+            return False
+        return (info['nbytes'] > ANIMATION_BUDGET
+                or info['frames'] * bounds[0] * bounds[1] * 4 > ANIMATION_PIXMAP_BUDGET)
+
+    def transcoded_path(self, wallpaper_path: str) -> str:
+        bounds = self._largest_monitor() or (0, 0)
+        key = self._digest(wallpaper_path) or ContentStore.full_hash(wallpaper_path)
+        return os.path.join(self.transcode_dir, f"{key}_{bounds[0]}x{bounds[1]}.mp4")
+
+    @background_job
+    def _transcode_animation(self, wallpaper_path: str, output: str):
+        try:
+            os.makedirs(self.transcode_dir, exist_ok=True)
+            transcode_to_video(wallpaper_path, output, self._largest_monitor())
+        finally:
+            self._transcoding.discard(output)
+
+    def set_animated_wallpaper(self, wallpaper_path: str) -> bool:
+        """播放 GIF / APNG / WebP 动画壁纸
+
+        开启转码设置时，大尺寸动画在后台转码一次为循环视频，之后直接播放视频；
+        转码完成前先按帧播放。
+        """
+        video = None
+        if self.config['settings'].get('transcode_animations') and self.is_large_animation(wallpaper_path):
+            output = self.transcoded_path(wallpaper_path)
+            if os.path.exists(output):
+                video = output
+            elif output not in self._transcoding:
+                self._transcoding.add(output)
+                threading.Thread(target=self._transcode_animation, args=(wallpaper_path, output),
+                                 daemon=True).start()
+        if video:
+            ok = self.video_wallpaper.set_wallpaper(video)
+        else:
+            ok = self.video_wallpaper.set_animation(wallpaper_path)
+        if ok:
+            self.mark_current(wallpaper_path)
+        return ok
+
     def set_video_wallpaper_handler(self, video_wallpaper):
-        """设置视频壁纸处理器"""
-        self.video_wallpaper = video_wallpaper 
+        """设置视频壁纸处理器（处理器读取同一份设置）"""
+        self.video_wallpaper = video_wallpaper
+        video_wallpaper.settings = self.config['settings']
 
     @staticmethod
     def is_video_file(file_path: str) -> bool:
         """判断是否为视频文件"""
         if not file_path:
             return False
-        return file_path.lower().endswith('.mp4') 
\ No newline at end of file
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext in MEDIA_EXTENSIONS:
+            return ext in VIDEO_EXTENSIONS
+        # 扩展名无法判断时读取文件头
+        return extension_for(sniff_media_type(file_path)) in VIDEO_EXTENSIONS 
\ No newline at end of file
@@ -0,0 +1,200 @@
+import os
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+
+# 可选的 HEIC/AVIF 解码插件，安装后自动注册到 Pillow
+try:
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+except ImportError:
+    pass
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+FIT_MODES = ('fill', 'fit', 'stretch', 'center')
+DEFAULT_MODE = 'fill'
+# 多显示器布局：每个显示器各自铺一张 / 一张图跨越整个虚拟桌面
+MONITOR_LAYOUTS = ('duplicate', 'span')
+DEFAULT_LAYOUT = 'duplicate'
+# 预渲染缓存保留的文件数
+MAX_CACHE_FILES = 64
+# 缩放时先用整数倍快速缩小，再做高质量重采样
+REDUCING_GAP = 3.0
+
+
+def open_rgb(path: str, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """打开图片并转为 RGB；JPEG 使用 draft 模式只解码接近目标尺寸的图像"""
+    with Image.open(path) as src:
+        if size is not None:
+            src.draft('RGB', size)
+        img = ImageOps.exif_transpose(src)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # 透明区域铺黑色
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (0, 0, 0))
+            background.paste(img, mask=img.getchannel('A'))
+            return background
+        return img.convert('RGB')
+
+
+def render_image(img: Image.Image, size: Tuple[int, int], mode: str = DEFAULT_MODE) -> Image.Image:
+    """按填充方式把图片渲染为指定尺寸"""
+    width, height = size
+    src_w, src_h = img.size
+    if mode == 'stretch':
+        return img.resize(size, Image.LANCZOS, reducing_gap=REDUCING_GAP)
+    if mode == 'fill':
+        # 等比缩放铺满，居中裁掉多余部分
+        scale = max(width / src_w, height / src_h)
+        crop_w, crop_h = width / scale, height / scale
+        left, top = (src_w - crop_w) / 2, (src_h - crop_h) / 2
+        return img.resize(size, Image.LANCZOS, box=(left, top, left + crop_w, top + crop_h),
+                          reducing_gap=REDUCING_GAP)
+    canvas = Image.new('RGB', size, (0, 0, 0))
+    if mode == 'fit':
+        # 等比缩放完整显示，四周留黑边
+        scale = min(width / src_w, height / src_h)
+        scaled = img.resize((max(1, round(src_w * scale)), max(1, round(src_h * scale))),
+                            Image.LANCZOS, reducing_gap=REDUCING_GAP)
+        canvas.paste(scaled, ((width - scaled.width) // 2, (height - scaled.height) // 2))
+        return canvas
+    # center：原尺寸居中，超出部分裁掉
+    left, top = (src_w - width) // 2, (src_h - height) // 2
+    cropped = img.crop((max(0, left), max(0, top), max(0, left) + min(width, src_w), max(0, top) + min(height, src_h)))
+    canvas.paste(cropped, (max(0, -left), max(0, -top)))
+    return canvas
+
+
+def desktop_bounds(rects: Sequence[Tuple[int, int, int, int]]) -> Tuple[int, int, int, int]:
+    """所有显示器矩形的外接矩形（虚拟桌面），副屏在主屏左侧或上方时坐标为负"""
+    return (min(r[0] for r in rects), min(r[1] for r in rects),
+            max(r[2] for r in rects), max(r[3] for r in rects))
+
+
+def compose_desktop(paths: Sequence[str], rects: Sequence[Tuple[int, int, int, int]],
+                    mode: str = DEFAULT_MODE, span: bool = False) -> Image.Image:
+    """把壁纸合成为一张覆盖整个虚拟桌面的画布
+
+    span 为真时 paths[0] 按虚拟桌面尺寸整体渲染；否则 paths 与 rects 一一对应，
+    每个显示器按自己的物理分辨率渲染（Pillow 解码缩放时释放 GIL，多线程并行），
+    再用 NumPy 切片整块写入画布。内存占用不超过画布大小加上各显示器的图块。
+    """
+    left, top, right, bottom = desktop_bounds(rects)
+    size = (right - left, bottom - top)
+    if span:
+        return render_image(open_rgb(paths[0], size), size, mode)
+
+    # 图片和分辨率都相同的显示器只渲染一次
+    positions: Dict[Tuple[str, Tuple[int, int]], List[Tuple[int, int]]] = {}
+    for path, (m_left, m_top, m_right, m_bottom) in zip(paths, rects):
+        key = (path, (m_right - m_left, m_bottom - m_top))
+        positions.setdefault(key, []).append((m_left - left, m_top - top))
+
+    def render_tile(key):
+        path, tile_size = key
+        return np.asarray(render_image(open_rgb(path, tile_size), tile_size, mode))
+
+    canvas = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    jobs = list(positions)
+    with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+        for key, tile in zip(jobs, pool.map(render_tile, jobs)):
+            height, width = tile.shape[:2]
+            for x, y in positions[key]:
+                canvas[y:y + height, x:x + width] = tile
+    return Image.fromarray(canvas)
+
+
+class WallpaperRenderer:
+    """把静态壁纸预先渲染为显示器分辨率的 JPEG，并按 (源内容, 尺寸, 填充方式) 缓存
+
+    再次应用同一壁纸时直接命中缓存，系统无需再解码和缩放原图。
+    WebP/AVIF/HEIC 等系统不一定支持的格式也在这里统一转换。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    @staticmethod
+    def source_key(path: str, digest: Optional[str] = None) -> str:
+        """源文件的缓存键：库中文件使用内容哈希，否则使用路径、大小和修改时间"""
+        if digest:
+            return digest
+        st = os.stat(path)
+        raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8')
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def cache_path(self, key: str, size: Tuple[int, int], mode: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}_{size[0]}x{size[1]}_{mode}.jpg")
+
+    def render(self, path: str, size: Tuple[int, int], mode: str = DEFAULT_MODE,
+               digest: Optional[str] = None) -> str:
+        """返回渲染好的文件路径，缓存命中时不做任何解码"""
+        if mode not in FIT_MODES:
+            mode = DEFAULT_MODE
+        output = self.cache_path(self.source_key(path, digest), size, mode)
+        if os.path.exists(output):
+            # 更新修改时间，供缓存淘汰使用
+            os.utime(output)
+            return output
+        img = open_rgb(path, size if mode != 'center' else None)
+        rendered = render_image(img, size, mode)
+        self._save(rendered, output, quality=95, subsampling=0)
+        self._prune()
+        return output
+
+    def render_desktop(self, paths: Sequence[str], rects: Sequence[Tuple[int, int, int, int]],
+                       mode: str = DEFAULT_MODE, span: bool = False,
+                       digests: Optional[Sequence[Optional[str]]] = None) -> str:
+        """渲染多显示器合成壁纸，按 (各源内容, 显示器布局, 填充方式) 缓存"""
+        if mode not in FIT_MODES:
+            mode = DEFAULT_MODE
+        digests = list(digests or [None] * len(paths))
+        keys: List[str] = [self.source_key(path, digest) for path, digest in zip(paths, digests)]
+        layout = ';'.join(','.join(map(str, rect)) for rect in rects)
+        raw = f"{'|'.join(keys)}|{layout}|{mode}|{'span' if span else 'each'}".encode('utf-8')
+        output = os.path.join(self.cache_dir, f"desktop_{hashlib.blake2b(raw, digest_size=16).hexdigest()}.jpg")
+        if os.path.exists(output):
+            os.utime(output)
+            return output
+        composite = compose_desktop(paths, rects, mode, span)
+        self._save(composite, output, quality=95)
+        self._prune()
+        return output
+
+    def _save(self, image: Image.Image, output: str, **options):
+        """写入独立的临时文件再重命名，并发渲染同一输出时互不覆盖"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, 'JPEG', **options)
+            os.replace(tmp_path, output)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _prune(self):
+        """只保留最近使用的若干个渲染结果"""
+        with self._lock:
+            try:
+                entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith('.jpg')]
+            except OSError:
+                return
+            if len(entries) <= MAX_CACHE_FILES:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+            for entry in entries[MAX_CACHE_FILES:]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass